@@ -0,0 +1,246 @@
+"""
+検索結果ページからの商品の抽出
+ページ全体を文字列に変換せず、バイト列のまま検索結果（data-component-type="s-search-result"）を先頭から調べ、
+スポンサー（広告）でない最初の結果を見つけた時点で打ち切ります
+同じ結果の中からASINと一緒にタイトル・価格・Kindle Unlimitedの表示を取り出します
+prefer_ku を指定した場合は、読み放題の結果を優先します（先頭から MAX_CANDIDATES 件までに読み放題の結果がなければ最初の結果）
+
+使い方:
+    info = extract_first(page_bytes)          # {'asin', 'path', 'title', 'price', 'ku'}（見つからない場合はNone）
+    info = extract_first(page_bytes, prefer_ku=True)
+
+    scanner = ResultScanner()                 # 受信しながら調べる場合
+    for chunk in response.iter_content(16384):
+        info = scanner.feed(chunk)
+        if info or scanner.done:
+            break
+    else:
+        info = scanner.close()
+"""
+
+import html
+import re
+
+# 検索結果1件の開始
+RESULT_MARKER = b'data-component-type="s-search-result"'
+# 検索結果の一覧（これがないページは検索結果のレイアウトではない）
+RESULTS_SLOT_MARKER = b's-main-slot'
+# 1件の検索結果として調べる最大のバイト数（次の結果が見つからない場合）
+MAX_RESULT_BYTES = 24 * 1024
+# 開始タグの先頭を探すために残すバイト数（data-asin が目印より前にある場合）
+TAG_LOOKBACK = 512
+# 読み放題の結果を優先する場合に調べるスポンサーでない結果の件数
+MAX_CANDIDATES = 8
+
+# スポンサー（広告）の結果の目印
+SPONSORED_MARKERS = (b'AdHolder', b's-sponsored-label', b'puis-sponsored-label', b'/sspa/click')
+# Kindle Unlimitedの表示（「読み放題」のバッジ・ロゴの代替テキスト）
+KU_MARKERS = (b'Kindle Unlimited', '読み放題'.encode('utf-8'), b'kindle-unlimited')
+
+ASIN_ATTR_PATTERN = re.compile(rb'data-asin="([A-Z0-9]{10})"')
+TITLE_PATTERN = re.compile(rb'<h2[^>]*>(.*?)</h2>', re.S)
+PRICE_PATTERN = re.compile(rb'class="a-offscreen">([^<]*)<')
+TAG_PATTERN = re.compile(rb'<[^>]+>')
+DIGITS_PATTERN = re.compile(rb'[0-9][0-9,]*')
+
+# 検索結果のレイアウトでないページの商品リンク（従来の抽出方法、正規表現より速い bytes.find で探す）
+LINK_PREFIX = b'href="/dp/'
+LINK_ASIN_PATTERN = re.compile(rb'[A-Z0-9]{10}')
+LINK_OVERLAP = len(LINK_PREFIX) + 10
+
+
+def parse_result(block):
+    """
+    検索結果1件（開始タグから次の結果の手前まで）から商品情報を取り出す
+
+    Returns:
+        dict: {'asin', 'path', 'title', 'price', 'ku'}（ASINがない結果・スポンサーの結果はNone）
+    """
+    tag_end = block.find(b'>')
+    match = ASIN_ATTR_PATTERN.search(block, 0, tag_end if tag_end >= 0 else len(block))
+    if not match:
+        return None
+    if any(marker in block for marker in SPONSORED_MARKERS):
+        return None
+
+    asin = match.group(1).decode('ascii')
+    title = None
+    title_match = TITLE_PATTERN.search(block)
+    if title_match:
+        text = TAG_PATTERN.sub(b'', title_match.group(1)).strip()
+        title = html.unescape(text.decode('utf-8', 'replace')).strip() or None
+
+    price = None
+    price_match = PRICE_PATTERN.search(block)
+    if price_match:
+        digits = DIGITS_PATTERN.search(price_match.group(1))
+        if digits:
+            price = int(digits.group(0).replace(b',', b''))
+
+    return {
+        'asin': asin,
+        'path': f"/dp/{asin}",
+        'title': title,
+        'price': price,
+        'ku': any(marker in block for marker in KU_MARKERS)
+    }
+
+
+class ResultScanner:
+    def __init__(self, max_result_bytes=MAX_RESULT_BYTES, prefer_ku=False, max_candidates=MAX_CANDIDATES):
+        """
+        受信しながら検索結果を調べるスキャナーの初期化
+
+        Args:
+            max_result_bytes (int): 1件の検索結果として調べる最大のバイト数
+            prefer_ku (bool): 読み放題の結果を優先するかどうか
+            max_candidates (int): 読み放題の結果を優先する場合に調べるスポンサーでない結果の件数
+        """
+        self.max_result_bytes = max_result_bytes
+        self.prefer_ku = prefer_ku
+        self.max_candidates = max_candidates
+        # スポンサーでない結果の件数と最初の結果（読み放題の結果がない場合に使う）
+        self.candidates = 0
+        self.first_organic = None
+        self.buffer = b''
+        # バッファ内の調べ終わった位置
+        self.position = 0
+        self.bytes_read = 0
+        self.results_seen = 0
+        self.slot_seen = False
+        # 検索結果のレイアウトでない場合に使う最初の商品リンクのASIN
+        self.link_asin = None
+        # 結果を返した、または最後まで調べた
+        self.done = False
+
+    def _next_result(self, final=False):
+        """
+        バッファ内で次の検索結果を調べる
+
+        Returns:
+            tuple: (商品情報, 続けて調べられるかどうか)
+        """
+        start = self.buffer.find(RESULT_MARKER, self.position)
+        if start < 0:
+            # 開始タグの途中で切れている可能性があるので末尾は残す
+            self.position = max(self.position, len(self.buffer) - len(RESULT_MARKER) - TAG_LOOKBACK)
+            return None, False
+        tag_start = self.buffer.rfind(b'<', self.position, start)
+        tag_start = tag_start if tag_start >= 0 else start
+
+        end = self.buffer.find(RESULT_MARKER, start + len(RESULT_MARKER))
+        if end >= 0:
+            end = self.buffer.rfind(b'<', start, end)
+        elif len(self.buffer) - tag_start >= self.max_result_bytes:
+            end = tag_start + self.max_result_bytes
+        elif final:
+            end = len(self.buffer)
+        else:
+            # 結果の終わりを受信するまで待つ
+            return None, False
+
+        self.results_seen += 1
+        self.position = end
+        return self._choose(parse_result(self.buffer[tag_start:end])), True
+
+    def _choose(self, info):
+        """
+        スポンサーでない結果を採用するか判定（読み放題を優先する場合は読み放題の結果まで読み進める）
+        """
+        if info is None or not self.prefer_ku or info['ku']:
+            return info
+        self.candidates += 1
+        if self.first_organic is None:
+            self.first_organic = info
+        if self.candidates >= self.max_candidates:
+            return self.first_organic
+        return None
+
+    def _find_link(self, start):
+        """
+        バッファ内で最初の /dp/ASIN リンクを探す
+        """
+        while True:
+            start = self.buffer.find(LINK_PREFIX, start)
+            if start < 0:
+                return
+            match = LINK_ASIN_PATTERN.match(self.buffer, start + len(LINK_PREFIX))
+            if match:
+                self.link_asin = match.group(0).decode('ascii')
+                return
+            start += len(LINK_PREFIX)
+
+    def feed(self, data):
+        """
+        受信したバイト列を追加して調べる
+
+        Returns:
+            dict: 最初のスポンサーでない検索結果の商品情報（まだ見つからない場合はNone）
+        """
+        if self.done:
+            return None
+        self.bytes_read += len(data)
+        search_from = max(0, len(self.buffer) - LINK_OVERLAP)
+        self.buffer += data
+        if not self.slot_seen:
+            self.slot_seen = self.buffer.find(RESULTS_SLOT_MARKER, search_from) >= 0
+            # 検索結果のレイアウトのページでは商品リンクは探さない
+            if not self.slot_seen and self.link_asin is None:
+                self._find_link(search_from)
+
+        while True:
+            info, more = self._next_result()
+            if info:
+                self.done = True
+                return info
+            if not more:
+                break
+
+        # 調べ終わった部分は捨てる（メモリ使用量を1件分に抑える）
+        keep_from = min(self.position, max(0, len(self.buffer) - LINK_OVERLAP))
+        if keep_from > 0:
+            self.buffer = self.buffer[keep_from:]
+            self.position -= keep_from
+        return None
+
+    def close(self):
+        """
+        最後まで受信した後に残りを調べる
+
+        Returns:
+            dict: 商品情報（見つからない場合はNone）
+        """
+        if self.done:
+            return None
+        self.done = True
+        while True:
+            info, more = self._next_result(final=True)
+            if info:
+                return info
+            if not more:
+                break
+        if self.first_organic:
+            return self.first_organic
+        # 検索結果のレイアウトでないページは最初の商品リンクを使う
+        if not self.results_seen and not self.slot_seen and self.link_asin:
+            return {'asin': self.link_asin, 'path': f"/dp/{self.link_asin}", 'title': None, 'price': None,
+                    'ku': False}
+        return None
+
+
+def extract_first(page, max_result_bytes=MAX_RESULT_BYTES, prefer_ku=False):
+    """
+    検索結果ページ全体から最初のスポンサーでない結果を取り出す
+
+    Args:
+        page (bytes): 検索結果ページのHTML（文字列の場合はUTF-8に変換）
+        max_result_bytes (int): 1件の検索結果として調べる最大のバイト数
+        prefer_ku (bool): 読み放題の結果を優先するかどうか
+
+    Returns:
+        dict: {'asin', 'path', 'title', 'price', 'ku'}（見つからない場合はNone）
+    """
+    if isinstance(page, str):
+        page = page.encode('utf-8')
+    scanner = ResultScanner(max_result_bytes, prefer_ku)
+    return scanner.feed(page) or scanner.close()
@@ -0,0 +1,138 @@
+"""
+スクレイピング用の非同期フェッチャー
+asyncio + httpx で接続プール（keep-alive、HTTP/2）を使い回し、
+検索結果ページは最初のスポンサーでない検索結果が見つかった時点で読み込みを打ち切ります（asin_extractor）
+"""
+
+import asyncio
+import time
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+try:
+    import h2  # noqa: F401  HTTP/2を使う場合に必要
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+from asin_extractor import ResultScanner
+
+DEFAULT_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+
+def is_available():
+    """
+    非同期フェッチャーが使用可能か（httpxがインストールされているか）
+    """
+    return httpx is not None
+
+
+class AsyncScraper:
+    def __init__(self, base_url="https://www.amazon.co.jp", pool_size=8, timeout=10,
+                 http2=True, limiter=None, user_agent=DEFAULT_USER_AGENT, prefer_ku=False):
+        """
+        非同期フェッチャーの初期化
+
+        Args:
+            base_url (str): 検索ページのベースURL（ベンチマーク時はローカルの代替サーバー）
+            pool_size (int): 同時接続数（接続プールの大きさ）
+            timeout (float): タイムアウト時間（秒）
+            http2 (bool): HTTP/2を使用するかどうか（h2がない場合はHTTP/1.1）
+            limiter (TokenBucket): スクレイピング用のレート制限
+            user_agent (str): User-Agent
+            prefer_ku (bool): 読み放題の結果を優先するかどうか（ない場合は最初のスポンサーでない結果）
+        """
+        if httpx is None:
+            raise ImportError("httpx がインストールされていません（pip install 'httpx[http2]'）")
+
+        self.base_url = base_url.rstrip('/')
+        self.pool_size = max(1, pool_size)
+        self.timeout = timeout
+        self.http2 = http2 and HTTP2_AVAILABLE
+        self.limiter = limiter
+        self.user_agent = user_agent
+        self.prefer_ku = prefer_ku
+
+    def _create_client(self):
+        """
+        接続プール付きのHTTPクライアントを作成
+        """
+        return httpx.AsyncClient(
+            http2=self.http2,
+            timeout=self.timeout,
+            headers={'User-Agent': self.user_agent},
+            limits=httpx.Limits(
+                max_connections=self.pool_size,
+                max_keepalive_connections=self.pool_size
+            )
+        )
+
+    async def fetch_first_asin(self, client, title):
+        """
+        検索結果ページを読み込み、最初のスポンサーでない検索結果（prefer_ku の場合は読み放題の結果）が見つかった時点で打ち切る
+
+        Args:
+            client (httpx.AsyncClient): HTTPクライアント
+            title (str): 検索するタイトル
+
+        Returns:
+            dict: {'asin', 'path', 'title', 'price', 'ku', 'bytes', 'elapsed'}（見つからない場合 asin, path はNone）
+        """
+        if self.limiter:
+            await self.limiter.acquire_async()
+
+        params = {
+            'k': title,
+            'i': 'digital-text',  # Kindleストア
+            'ref': 'sr_nr_i_0'
+        }
+        started = time.perf_counter()
+        scanner = ResultScanner(prefer_ku=self.prefer_ku)
+        info = None
+
+        async with client.stream('GET', f"{self.base_url}/s", params=params) as response:
+            response.raise_for_status()
+            async for chunk in response.aiter_bytes():
+                info = scanner.feed(chunk)
+                if info:
+                    # 残りの本文は読まずに接続を閉じる
+                    break
+            else:
+                info = scanner.close()
+
+        result = info or {'asin': None, 'path': None, 'title': None, 'price': None, 'ku': False}
+        result.update(bytes=scanner.bytes_read, elapsed=time.perf_counter() - started)
+        return result
+
+    async def _search_many(self, titles):
+        """
+        複数のタイトルを同時接続数の上限内で並行して検索
+        """
+        semaphore = asyncio.Semaphore(self.pool_size)
+
+        async with self._create_client() as client:
+            async def search(title):
+                async with semaphore:
+                    try:
+                        return await self.fetch_first_asin(client, title)
+                    except Exception as e:
+                        return {'asin': None, 'path': None, 'bytes': 0, 'elapsed': 0.0, 'error': e}
+
+            return await asyncio.gather(*(search(title) for title in titles))
+
+    def search_many(self, titles):
+        """
+        複数のタイトルを非同期で検索（同期コードから呼び出す）
+
+        Args:
+            titles (list): 検索するタイトルのリスト
+
+        Returns:
+            list: 入力順の検索結果（エラーの場合は 'error' キーに例外）
+        """
+        if not titles:
+            return []
+        return asyncio.run(self._search_many(titles))
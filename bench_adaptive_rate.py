@@ -0,0 +1,123 @@
+"""
+適応的なレート制限のベンチマーク
+エンドポイントごとに1秒あたりの上限がある代替サーバー（上限を超えると429）に対して、
+同じタイトルを検索・短縮し、レート制限の方式ごとに処理時間と429の回数を比較します
+
+- 固定: REQUEST_DELAY と同じ固定のレート（従来の動作）
+- 固定（速すぎる）: 代替サーバーの上限を超える固定のレート
+- 適応（学習なし）: 固定のレートから始めて応答に合わせて調整
+- 適応（学習済み）: 前の計測で学習したレート（保存ファイル）から始める
+
+使い方:
+    python bench_adaptive_rate.py --titles 60 --max-rps 8
+    python bench_adaptive_rate.py --base-rate 1 --workers 8 --latency 0.02
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+import requests
+
+from bench_link_generators import UpstreamRedirectAdapter, load_titles
+from link_engine import LinkEngine, ScrapingResolver, TinyURLShortener
+from mock_upstream_server import MockUpstreamServer
+from rate_limiter import AdaptiveRateStore
+
+AFFILIATE_TAG = "bench-22"
+
+
+def create_engine(base_url, rate, workers, rate_store=None):
+    """
+    代替サーバーに向けたリンク生成エンジン（スクレイピング → TinyURL、キャッシュなし）
+    """
+    session = requests.Session()
+    adapter = UpstreamRedirectAdapter(base_url, pool_connections=workers, pool_maxsize=workers)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return LinkEngine(
+        [ScrapingResolver(session, rate=rate)],
+        [TinyURLShortener(session, rate=rate)],
+        AFFILIATE_TAG,
+        max_workers=workers,
+        rate_store=rate_store
+    )
+
+
+def run_mode(server, titles, engine):
+    """
+    タイトルを処理して、処理時間・成功数・代替サーバーの集計を返す
+    """
+    server.reset_stats()
+    started = time.perf_counter()
+    # エンジンの検索・短縮エラーの表示は集計だけにする
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = engine.process_titles(titles)
+    elapsed = time.perf_counter() - started
+    succeeded = sum(1 for result in results
+                    if result['short_url'] and result['short_url'] != result['affiliate_url'])
+    return {'elapsed': elapsed, 'succeeded': succeeded, 'stats': server.stats()}
+
+
+def print_mode(label, titles, result, rates=None, baseline=None):
+    stats = result['stats']
+    throttled = sum(count for key, count in stats['statuses'].items() if key.endswith(':429'))
+    requests_sent = sum(stats['calls'].get(name, 0) for name in ('search', 'tinyurl'))
+    elapsed = result['elapsed']
+    line = (f"  処理時間: {elapsed:.2f}秒 ({len(titles) / elapsed:.1f}タイトル/秒), "
+            f"成功: {result['succeeded']}/{len(titles)}, リクエスト: {requests_sent}回, 429: {throttled}回")
+    if baseline:
+        line += f", 固定との比 x{baseline / elapsed:.2f}"
+    print(f"{label}:")
+    print(line)
+    if rates:
+        print("  終了時のレート: " + ", ".join(f"{name} {rate:.2f}回/秒" for name, rate in sorted(rates.items())))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="適応的なレート制限のベンチマーク")
+    parser.add_argument('--titles', type=int, default=60, help="処理するタイトル数")
+    parser.add_argument('--max-rps', type=int, default=8, help="代替サーバーのエンドポイントごとの1秒あたりの上限")
+    parser.add_argument('--base-rate', type=float, default=1.0,
+                        help="固定のレート・適応の最初のレート（1秒あたりのリクエスト数、REQUEST_DELAY=1 と同じ）")
+    parser.add_argument('--fast-rate', type=float, default=0.0,
+                        help="速すぎる固定のレート（0の場合は代替サーバーの上限の2倍）")
+    parser.add_argument('--workers', type=int, default=8, help="並列スレッド数")
+    parser.add_argument('--latency', type=float, default=0.02, help="代替サーバーの応答遅延（秒）")
+    parser.add_argument('--page-size', type=int, default=50_000, help="検索結果ページのバイト数")
+    args = parser.parse_args()
+
+    titles = load_titles(args.titles)
+    fast_rate = args.fast_rate or args.max_rps * 2
+    server = MockUpstreamServer(latency=args.latency, page_size=args.page_size, max_rps=args.max_rps).start()
+    print(f"代替サーバー: {server.base_url}, タイトル数: {len(titles)}, 1秒あたりの上限: {args.max_rps}, "
+          f"並列: {args.workers}, 最初のレート: {args.base_rate:g}回/秒")
+    print("-" * 60)
+
+    try:
+        with tempfile.TemporaryDirectory(prefix="bench_adaptive_") as workdir:
+            rate_file = os.path.join(workdir, "adaptive_rates.json")
+
+            fixed = run_mode(server, titles, create_engine(server.base_url, args.base_rate, args.workers))
+            print_mode(f"固定 {args.base_rate:g}回/秒", titles, fixed)
+
+            # 上限を超えないよう1秒待ってから計測する
+            time.sleep(1)
+            result = run_mode(server, titles, create_engine(server.base_url, fast_rate, args.workers))
+            print_mode(f"固定（速すぎる） {fast_rate:g}回/秒", titles, result, baseline=fixed['elapsed'])
+
+            for label in ("適応（学習なし）", "適応（学習済み）"):
+                time.sleep(1)
+                store = AdaptiveRateStore(rate_file)
+                result = run_mode(server, titles,
+                                  create_engine(server.base_url, args.base_rate, args.workers, rate_store=store))
+                print_mode(label, titles, result, rates=store.rates(), baseline=fixed['elapsed'])
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+検索結果ページからの商品抽出のマイクロベンチマーク
+保存した検索結果ページ（scraping_corpus/）に対して、従来の方法（ページ全体を文字列に変換して re.findall）と
+asin_extractor（バイト列のまま最初のスポンサーでない結果で打ち切り）の1ページあたりの処理時間と、
+期待する結果（expected.json）との一致を比較します
+読み放題を優先する場合は expected.json の ku_asin（読み放題の結果がないページは最初の結果）と比較します
+
+使い方:
+    python bench_asin_extractor.py
+    python bench_asin_extractor.py --corpus scraping_corpus --repeat 200
+"""
+
+import argparse
+import json
+import os
+import re
+import time
+
+from asin_extractor import ResultScanner, extract_first
+
+CORPUS_DIR = "scraping_corpus"
+EXPECTED_FILE = "expected.json"
+# 受信しながら調べる場合のチャンクの大きさ（link_engine.SCRAPING_CHUNK_SIZE と同じ）
+CHUNK_SIZE = 16 * 1024
+
+LEGACY_PATTERN = r'href="(/dp/([A-Z0-9]{10}))'
+
+
+def legacy_extract(page):
+    """
+    従来の方法: ページ全体を文字列に変換して re.findall し、最初の一致を使う
+    """
+    matches = re.findall(LEGACY_PATTERN, page.decode('utf-8', 'replace'))
+    if not matches:
+        return None
+    return {'asin': matches[0][1]}
+
+
+def streaming_extract(page, prefer_ku=False):
+    """
+    受信しながら調べる場合（チャンクごとに渡して、見つかった時点で打ち切る）
+    """
+    scanner = ResultScanner(prefer_ku=prefer_ku)
+    for start in range(0, len(page), CHUNK_SIZE):
+        info = scanner.feed(page[start:start + CHUNK_SIZE])
+        if info:
+            return info
+    return scanner.close()
+
+
+# (表示名, 抽出する関数, 読み放題を優先するかどうか)
+METHODS = [
+    ('従来（decode + re.findall）', legacy_extract, False),
+    ('asin_extractor（ページ全体）', extract_first, False),
+    ('asin_extractor（16KBずつ）', streaming_extract, False),
+    ('asin_extractor（読み放題を優先、16KBずつ）', lambda page: streaming_extract(page, prefer_ku=True), True),
+]
+
+
+def load_corpus(corpus_dir):
+    """
+    保存した検索結果ページと期待する結果を読み込み
+
+    Returns:
+        list: [(ファイル名, HTMLのバイト列, 期待する結果), ...]
+    """
+    with open(os.path.join(corpus_dir, EXPECTED_FILE), 'r', encoding='utf-8') as f:
+        expected = json.load(f)
+    pages = []
+    for name, want in sorted(expected.items()):
+        with open(os.path.join(corpus_dir, name), 'rb') as f:
+            pages.append((name, f.read(), want))
+    return pages
+
+
+def time_per_call(func, page, repeat):
+    """
+    1回あたりの処理時間（マイクロ秒、repeat回の最小値）
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(page)
+        best = min(best, time.perf_counter() - started)
+    return best * 1_000_000
+
+
+def check(result, want, prefer_ku=False):
+    """
+    期待する結果と一致するか（結果にある項目だけを比較、従来の方法はASINのみ、読み放題を優先する場合はASINのみ）
+
+    Returns:
+        bool: 一致したかどうか
+    """
+    expected_asin = want['ku_asin'] if prefer_ku else want['asin']
+    if result is None:
+        return expected_asin is None
+    if prefer_ku:
+        return result['asin'] == expected_asin
+    return all(result[key] == want[key] for key in ('asin', 'ku', 'title', 'price') if key in result)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="検索結果ページからの商品抽出のマイクロベンチマーク")
+    parser.add_argument('--corpus', default=CORPUS_DIR, help="検索結果ページのディレクトリ（expected.json を含む）")
+    parser.add_argument('--repeat', type=int, default=100, help="1ページあたりの計測回数")
+    args = parser.parse_args()
+
+    pages = load_corpus(args.corpus)
+    total_bytes = sum(len(page) for _, page, _ in pages)
+    print(f"コーパス: {args.corpus}（{len(pages)}ページ, {total_bytes / 1024:.0f}KB）, 計測回数: {args.repeat}")
+    print("-" * 60)
+
+    totals = {}
+    for name, page, want in pages:
+        print(f"{name}（{len(page) / 1024:.0f}KB, 期待: {want['asin'] or '見つからない'}）")
+        for label, func, prefer_ku in METHODS:
+            result = func(page)
+            elapsed = time_per_call(func, page, args.repeat)
+            ok = check(result, want, prefer_ku)
+            total = totals.setdefault(label, {'elapsed': 0.0, 'correct': 0})
+            total['elapsed'] += elapsed
+            total['correct'] += ok
+            found = result['asin'] if result else '-'
+            print(f"  {label}: {elapsed:9.1f}µs  {found}  {'OK' if ok else 'NG'}")
+
+    print("-" * 60)
+    baseline = totals[METHODS[0][0]]['elapsed']
+    for label, _, _ in METHODS:
+        total = totals[label]
+        print(f"{label}: 合計 {total['elapsed']:.1f}µs (x{baseline / total['elapsed']:.2f}), "
+              f"正解 {total['correct']}/{len(pages)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,357 @@
+"""
+リンク生成のベンチマーク
+4つのリンク生成クラスの通信先（amazon.co.jp の検索ページ、PA-API、TinyURL、Bitly）を
+ローカルの代替サーバーに向けて、タイトルごとの処理時間とアップストリームの呼び出し回数を比較します
+リンク生成クラスのコードは変更せず、requests のセッションと PA-API の接続プールだけを差し替えます
+
+使い方:
+    python bench_link_generators.py --titles 20 --latency 0.1
+    python bench_link_generators.py --error-rate 0.1 --throttle-rate 0.05 --max-rps 1
+    python bench_link_generators.py --no-rate-limit --passes 2          # 2回目はキャッシュの効果
+    python bench_link_generators.py --replay upstream_cassette.jsonl    # 記録した実際の応答で計測
+"""
+
+import argparse
+import contextlib
+import csv
+import io
+import os
+import statistics
+import tempfile
+import time
+from urllib.parse import urlsplit
+
+import urllib3
+from requests.adapters import HTTPAdapter
+
+from bench_scraping import percentile
+from link_cache import ShortUrlCache, TitleCache
+from mock_upstream_server import MockUpstreamServer
+from rate_limiter import TokenBucket
+
+AFFILIATE_TAG = "bench-22"
+BITLY_BENCH_TOKEN = "bench-bitly-token"
+TITLES_FILE = "kindle_unlimited_biz_10_clean.csv"
+
+# 代替サーバーに向けるアップストリームのホスト
+UPSTREAM_HOSTS = {
+    'www.amazon.co.jp',
+    'webservices.amazon.co.jp',
+    'tinyurl.com',
+    'api-ssl.bitly.com',
+}
+
+# 呼び出し回数を表示するエンドポイント（表示順）
+ENDPOINT_NAMES = (('paapi', "PA-API"), ('search', "検索ページ"), ('tinyurl', "TinyURL"), ('bitly', "Bitly"))
+
+
+def rewrite_upstream_url(url, base_url):
+    """
+    アップストリームのURLを代替サーバーのURLに書き換え（その他のURLはそのまま）
+    """
+    parts = urlsplit(url)
+    if parts.hostname not in UPSTREAM_HOSTS:
+        return url
+    return f"{base_url}{parts.path}" + (f"?{parts.query}" if parts.query else "")
+
+
+class UpstreamRedirectAdapter(HTTPAdapter):
+    """
+    requests のアダプター（アップストリームへのリクエストを代替サーバーに送る）
+    """
+    def __init__(self, base_url, **kwargs):
+        self.base_url = base_url
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        request.url = rewrite_upstream_url(request.url, self.base_url)
+        return super().send(request, **kwargs)
+
+
+class RedirectPoolManager(urllib3.PoolManager):
+    """
+    PA-APIのSDK（urllib3）の接続プール（署名はそのままで、送信先だけを代替サーバーにする）
+    """
+    def __init__(self, base_url, **kwargs):
+        self.base_url = base_url
+        super().__init__(**kwargs)
+
+    def urlopen(self, method, url, redirect=True, **kwargs):
+        return super().urlopen(method, rewrite_upstream_url(url, self.base_url), redirect=redirect, **kwargs)
+
+
+def redirect_generator(generator, base_url, pool_size):
+    """
+    リンク生成クラスの通信先を代替サーバーに向ける
+    """
+    adapter = UpstreamRedirectAdapter(base_url, pool_connections=pool_size, pool_maxsize=pool_size)
+    generator.session.mount('http://', adapter)
+    generator.session.mount('https://', adapter)
+
+    amazon = getattr(generator, 'amazon', None)
+    if amazon is not None:
+        amazon.api.api_client.rest_client.pool_manager = RedirectPoolManager(
+            base_url, num_pools=4, maxsize=pool_size)
+
+    scraper = getattr(generator, 'async_scraper', None)
+    if scraper is not None:
+        scraper.base_url = base_url
+        # 代替サーバーはHTTP/1.1のみ
+        scraper.http2 = False
+
+
+def use_cache(generator, cache_file):
+    """
+    キャッシュを一時ファイルに差し替え（キャッシュが無効な場合はそのまま）
+    """
+    engine = generator.engine
+    title_cache, short_url_cache = engine.title_cache, engine.short_url_cache
+    if title_cache is not None:
+        title_cache.close()
+        title_cache = TitleCache(cache_file, title_cache.ttl / 86400, title_cache.negative_ttl / 86400)
+    if short_url_cache is not None:
+        short_url_cache.close()
+        short_url_cache = ShortUrlCache(cache_file)
+    engine.set_caches(title_cache, short_url_cache)
+
+
+def disable_rate_limits(generator):
+    """
+    すべてのバックエンドのレート制限を外す（代替サーバーの1秒あたりの上限だけで測る）
+    """
+    for backend in generator.engine.search_backends + generator.engine.shorteners:
+        backend.limiter = TokenBucket(0)
+    for name in ('tinyurl', 'bitly'):
+        if getattr(generator, name, None) is not None:
+            getattr(generator, name).limiter = TokenBucket(0)
+    scraper = getattr(generator, 'async_scraper', None)
+    if scraper is not None:
+        scraper.limiter = None
+
+
+def load_titles(count, titles_file=TITLES_FILE):
+    """
+    ベンチマークに使うタイトル（CSVのタイトルを繰り返す場合は番号を付けて別のタイトルにする）
+    """
+    titles = []
+    try:
+        with open(titles_file, 'r', encoding='utf-8-sig', newline='') as f:
+            titles = [row['タイトル'] for row in csv.DictReader(f) if row.get('タイトル')]
+    except (OSError, KeyError):
+        pass
+    titles = titles or ["ベンチマーク用タイトル"]
+    return [titles[i % len(titles)] + (f" {i // len(titles) + 1}" if i >= len(titles) else "")
+            for i in range(count)]
+
+
+class GeneratorBench:
+    """
+    リンク生成クラスごとの作成・1タイトルの処理
+    """
+    def __init__(self, name, description, shortener):
+        self.name = name
+        self.description = description
+        self.shortener = shortener
+        self.module = None
+
+    def create(self, cache_file):
+        raise NotImplementedError
+
+    def run_title(self, generator, title):
+        raise NotImplementedError
+
+    def set_bitly_token(self):
+        # 設定ファイルのBITLY_TOKENに関係なく、選んだ短縮サービスを使う
+        self.module.BITLY_TOKEN = BITLY_BENCH_TOKEN if self.shortener == 'bitly' else None
+
+
+class BasicBench(GeneratorBench):
+    def create(self, cache_file):
+        from kindle_unlimited_link_generator import KindleUnlimitedLinkGenerator
+        return KindleUnlimitedLinkGenerator(AFFILIATE_TAG, cache_file=cache_file)
+
+    def run_title(self, generator, title):
+        affiliate_url = generator.create_affiliate_link(generator.search_kindle_unlimited(title))
+        return generator.shorten_url(affiliate_url) if affiliate_url else None
+
+
+class AdvancedBench(GeneratorBench):
+    def create(self, cache_file):
+        from kindle_unlimited_link_generator_advanced import KindleUnlimitedLinkGenerator
+        generator = KindleUnlimitedLinkGenerator(AFFILIATE_TAG, use_url_shortener=True, cache_file=cache_file)
+        if self.shortener == 'bitly':
+            # Bitlyのバックエンドを先に作成しておく（--no-rate-limit で制限を外せるように）
+            generator._shorteners(BITLY_BENCH_TOKEN)
+        return generator
+
+    def run_title(self, generator, title):
+        affiliate_url = generator.create_affiliate_link(generator.search_kindle_unlimited(title))
+        if not affiliate_url:
+            return None
+        if self.shortener == 'bitly':
+            return generator.shorten_url_bitly(affiliate_url, BITLY_BENCH_TOKEN)
+        return generator.shorten_url_tinyurl(affiliate_url)
+
+
+class ConfigBench(GeneratorBench):
+    def create(self, cache_file):
+        import kindle_unlimited_link_generator_config as module
+        self.module = module
+        self.set_bitly_token()
+        generator = module.KindleUnlimitedLinkGenerator()
+        use_cache(generator, cache_file)
+        return generator
+
+    def run_title(self, generator, title):
+        affiliate_url = generator.create_affiliate_link(generator.search_kindle_unlimited(title))
+        if not affiliate_url:
+            return None
+        if self.shortener == 'bitly':
+            return generator.shorten_url_bitly(affiliate_url)
+        return generator.shorten_url_tinyurl(affiliate_url)
+
+
+class PAAPIBench(GeneratorBench):
+    def __init__(self, name, description, shortener, pipeline=False):
+        super().__init__(name, description, shortener)
+        self.pipeline = pipeline
+
+    def create(self, cache_file):
+        import kindle_unlimited_link_generator_paapi as module
+        self.module = module
+        self.set_bitly_token()
+        generator = module.KindleUnlimitedLinkGeneratorPAAPI()
+        use_cache(generator, cache_file)
+        return generator
+
+    def run_title(self, generator, title):
+        affiliate_url = generator.create_affiliate_link(generator.search_kindle_unlimited(title))
+        return generator.shorten_url(affiliate_url) if affiliate_url else None
+
+
+def create_benches(shortener):
+    return [
+        BasicBench('basic', "kindle_unlimited_link_generator（短縮なし）", shortener),
+        AdvancedBench('advanced', "kindle_unlimited_link_generator_advanced", shortener),
+        ConfigBench('config', "kindle_unlimited_link_generator_config", shortener),
+        PAAPIBench('paapi', "kindle_unlimited_link_generator_paapi（1件ずつ）", shortener),
+        PAAPIBench('paapi[pipeline]', "kindle_unlimited_link_generator_paapi（resolve_titles）", shortener,
+                   pipeline=True),
+    ]
+
+
+def run_bench(bench, generator, titles):
+    """
+    タイトルを処理して結果を集計
+
+    Returns:
+        dict: 処理時間・タイトルごとの処理時間・成功数
+    """
+    latencies = []
+    started = time.perf_counter()
+    # リンク生成クラスの進捗表示は計測結果の表示と混ざらないようにする
+    with contextlib.redirect_stdout(io.StringIO()):
+        if getattr(bench, 'pipeline', False):
+            short_urls = generator.resolve_titles(titles)
+        else:
+            short_urls = []
+            for title in titles:
+                title_started = time.perf_counter()
+                short_urls.append(bench.run_title(generator, title))
+                latencies.append(time.perf_counter() - title_started)
+    return {
+        'elapsed': time.perf_counter() - started,
+        'latencies': latencies,
+        'succeeded': sum(1 for url in short_urls if url)
+    }
+
+
+def print_result(label, titles, result, stats):
+    calls = stats['calls']
+    elapsed = result['elapsed']
+    total_calls = sum(calls.get(name, 0) for name, _ in ENDPOINT_NAMES)
+    print(f"{label}:")
+    print(f"  処理時間: {elapsed:.2f}秒 ({len(titles) / elapsed:.1f}タイトル/秒), 成功: {result['succeeded']}/{len(titles)}")
+    breakdown = ", ".join(f"{display} {calls[name] / len(titles):.2f}" for name, display in ENDPOINT_NAMES
+                          if calls.get(name))
+    print(f"  1タイトルあたりの呼び出し: {total_calls / len(titles):.2f}回" + (f" ({breakdown})" if breakdown else ""))
+    if result['latencies']:
+        latencies = result['latencies']
+        print(f"  レイテンシ p50: {statistics.median(latencies) * 1000:.1f}ms, "
+              f"p99: {percentile(latencies, 0.99) * 1000:.1f}ms")
+    else:
+        print("  レイテンシ: -（まとめて処理するため、タイトルごとの時間は計測しない）")
+    errors = {key: count for key, count in stats['statuses'].items() if not key.endswith((':200', ':201'))}
+    if errors or calls.get('replay_misses'):
+        details = ", ".join(f"{key} {count}回" for key, count in sorted(errors.items()))
+        if calls.get('replay_misses'):
+            details += (", " if details else "") + f"記録にないリクエスト {calls['replay_misses']}回"
+        print(f"  エラー・記録外: {details}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="リンク生成のベンチマーク")
+    parser.add_argument('--titles', type=int, default=20, help="処理するタイトル数")
+    parser.add_argument('--generators', default="basic,advanced,config,paapi,paapi[pipeline]",
+                        help="計測するリンク生成クラス（カンマ区切り）")
+    parser.add_argument('--shortener', choices=('tinyurl', 'bitly'), default='tinyurl', help="短縮サービス")
+    parser.add_argument('--passes', type=int, default=1, help="同じタイトルを処理する回数（2回目以降はキャッシュあり）")
+    parser.add_argument('--no-rate-limit', action='store_true',
+                        help="バックエンドのトークンバケットによるレート制限を無効にする")
+    parser.add_argument('--pool-size', type=int, default=8, help="接続プールの大きさ")
+    parser.add_argument('--latency', type=float, default=0.05, help="代替サーバーの応答遅延（秒）")
+    parser.add_argument('--page-size', type=int, default=200_000, help="検索結果ページのバイト数")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="503エラーを返す割合（0〜1）")
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help="429を返す割合（0〜1）")
+    parser.add_argument('--max-rps', type=int, default=0, help="エンドポイントごとの1秒あたりのリクエスト数の上限")
+    parser.add_argument('--not-found-rate', type=float, default=0.1, help="検索で見つからないタイトルの割合（0〜1）")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--record', metavar='FILE', help="実際のアップストリームに中継して応答を記録（実際に通信します）")
+    group.add_argument('--replay', metavar='FILE', help="記録した応答で計測")
+    args = parser.parse_args()
+
+    titles = load_titles(args.titles)
+    names = [name.strip() for name in args.generators.split(',') if name.strip()]
+    benches = [bench for bench in create_benches(args.shortener) if bench.name in names]
+
+    server = MockUpstreamServer(latency=args.latency, page_size=args.page_size,
+                                asin_offset=min(args.page_size // 5, 120_000),
+                                error_rate=args.error_rate, throttle_rate=args.throttle_rate,
+                                max_rps=args.max_rps, not_found_rate=args.not_found_rate,
+                                record_file=args.record, replay_file=args.replay).start()
+    print(f"代替サーバー: {server.base_url}, タイトル数: {len(titles)}, 応答遅延: {args.latency * 1000:.0f}ms, "
+          f"エラー率: {args.error_rate:.0%}, 429: {args.throttle_rate:.0%}, "
+          f"1秒あたりの上限: {args.max_rps or 'なし'}, 短縮: {args.shortener}")
+    print("-" * 60)
+
+    cwd = os.getcwd()
+    try:
+        with tempfile.TemporaryDirectory(prefix="bench_links_") as workdir:
+            # 設定ファイルのキャッシュ・状態ファイルも一時ディレクトリに作成する
+            os.chdir(workdir)
+            for bench in benches:
+                cache_file = os.path.join(workdir, f"{bench.name.replace('[', '_').replace(']', '')}.db")
+                try:
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        generator = bench.create(cache_file)
+                except (ImportError, SystemExit) as e:
+                    print(f"{bench.name}: スキップ（{e or '設定ファイルがありません'}）")
+                    continue
+                redirect_generator(generator, server.base_url, args.pool_size)
+                if args.no_rate_limit:
+                    disable_rate_limits(generator)
+
+                for number in range(1, args.passes + 1):
+                    server.reset_stats()
+                    result = run_bench(bench, generator, titles)
+                    label = f"{bench.name}: {bench.description}"
+                    if args.passes > 1:
+                        label += f" {number}回目" + ("（キャッシュあり）" if number > 1 else "")
+                    print_result(label, titles, result, server.stats())
+    finally:
+        os.chdir(cwd)
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
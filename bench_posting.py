@@ -0,0 +1,373 @@
+"""
+投稿処理のベンチマーク（大きなカタログでの処理時間）
+kindle_unlimited_biz_10_with_links.csv と同じ列の合成カタログ（1千件・10万件・100万件など）と、
+投稿台帳・従来の投稿履歴（posting_history.json と同じ形式）を一時ディレクトリに作成して、
+投稿BOTの主な処理の時間を計測します
+X APIには接続せず、投稿は代替のクライアント（StubXClient）で行います
+
+結果はコミットのハッシュと一緒に bench_posting_results.jsonl に追記するので、
+コミット間で処理時間を比較できます（--compare）
+
+使い方:
+    python bench_posting.py                               # 1千件・10万件
+    python bench_posting.py --sizes 1000,100000,1000000   # 100万件も計測
+    python bench_posting.py --compare                     # 前回の結果（同じ件数）との比較も表示
+    python bench_posting.py --compare a68e56e             # 指定したコミットの結果と比較
+"""
+
+import argparse
+import contextlib
+import csv
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import catalog_index
+from bench_scraping import percentile
+from posting_ledger import PostingLedger
+from x_posting_bot_advanced import XPostingBotAdvanced
+
+RESULTS_FILE = "bench_posting_results.jsonl"
+SAMPLE_CSV_FILE = "kindle_unlimited_biz_10_with_links.csv"
+CSV_HEADER = ['No', 'タイトル', '一言紹介文', '短縮URL']
+
+# 短縮URLがない行の割合（リンク生成に失敗した本）
+NO_LINK_RATIO = 0.05
+
+# 前回より遅くなったと表示する基準（中央値の比と差、短い処理の誤差では表示しない）
+REGRESSION_RATIO = 1.2
+REGRESSION_MIN_MS = 0.1
+
+# 計測する処理（表示順）
+BENCH_PHASES = (
+    ('load_csv_data[cold]', "CSV解析・インデックス作成"),
+    ('load_csv_data[index]', "インデックスから読み込み（毎時実行の2回目以降）"),
+    ('load_csv_data[memo]', "同じプロセスで再読み込み（常駐モード）"),
+    ('history_load', "投稿台帳から今日の投稿を読み込み"),
+    ('should_post_now', "投稿判定（投稿計画）"),
+    ('get_available_posts', "今日未投稿の本の絞り込み"),
+    ('pick_from_rotation', "山札から選択"),
+    ('create_post_content', "投稿内容の作成"),
+    ('history_save', "投稿台帳に追記"),
+    ('post_to_x', "投稿（代替クライアント + 台帳に追記）"),
+)
+
+
+class StubXClient:
+    """
+    X APIの代わりのクライアント（ネットワークにはアクセスせず、ツイートIDを返すだけ）
+    """
+    def __init__(self):
+        self.identity = {'id': "0", 'username': "bench"}
+        self.posted = 0
+
+    def post(self, text):
+        self.posted += 1
+        return str(1_800_000_000_000_000_000 + self.posted), 0
+
+
+def load_sample_rows(csv_file=SAMPLE_CSV_FILE):
+    """
+    合成カタログの元にする実際のカタログの行（ない場合は仮の文章）
+    """
+    try:
+        with open(csv_file, 'r', encoding='utf-8-sig', newline='') as f:
+            rows = [(row['タイトル'], row['一言紹介文']) for row in csv.DictReader(f)]
+        if rows:
+            return rows
+    except (OSError, KeyError):
+        pass
+    return [("ベンチマーク用のビジネス書のタイトル",
+             "仕事の悩みを抱える方に、著者が実践してきた方法をわかりやすく紹介します。")]
+
+
+def write_catalog(csv_file, rows, seed=0):
+    """
+    合成カタログを作成（列・BOM・文章の長さは実際のカタログと同じ）
+    """
+    rng = random.Random(seed)
+    samples = load_sample_rows()
+    alphabet = 'abcdefghijklmnopqrstuvwxyz0123456789'
+    with open(csv_file, 'w', encoding='utf-8-sig', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(CSV_HEADER)
+        for no in range(1, rows + 1):
+            title, introduction = samples[(no - 1) % len(samples)]
+            short_url = ('' if rng.random() < NO_LINK_RATIO
+                         else "https://tinyurl.com/" + ''.join(rng.choices(alphabet, k=8)))
+            writer.writerow([no, f"{title} 第{no}版", introduction, short_url])
+
+
+def write_history(ledger_file, history_file, rows, days, posts_per_day, today_posts, seed=0):
+    """
+    合成の投稿履歴を作成
+    投稿台帳には過去の日数分（1日 posts_per_day 件）と今日の today_posts 件、
+    従来の投稿履歴（No -> 最後に投稿した日付）には同じ投稿を書き込む
+
+    Returns:
+        int: 台帳の行数
+    """
+    rng = random.Random(seed)
+    today = datetime.now().replace(hour=9, minute=0, second=0, microsecond=0)
+    legacy = {}
+    entries = 0
+    with open(ledger_file, 'w', encoding='utf-8') as f:
+        for days_ago in range(days, -1, -1):
+            day = today - timedelta(days=days_ago)
+            count = today_posts if days_ago == 0 else posts_per_day
+            for position, no in enumerate(rng.sample(range(1, rows + 1), min(count, rows))):
+                when = day + timedelta(minutes=90 * position)
+                entry = {
+                    'ts': when.isoformat(timespec='seconds'),
+                    'date': when.strftime('%Y-%m-%d'),
+                    'no': no,
+                    'tweet_id': str(1_700_000_000_000_000_000 + entries),
+                    'template': rng.randrange(5)
+                }
+                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+                legacy[str(no)] = entry['date']
+                entries += 1
+    with open(history_file, 'w', encoding='utf-8') as f:
+        json.dump(legacy, f, ensure_ascii=False, indent=2)
+    return entries
+
+
+def measure(func, repeats, warmup=True, before=None):
+    """
+    処理時間を計測（最初の1回は読み込みなどを除くため計測しない）
+
+    Args:
+        func: 計測する処理（引数なし）
+        repeats (int): 計測する回数
+        warmup (bool): 計測前に1回実行するかどうか
+        before: 毎回の計測前に実行する準備（計測に含めない）
+
+    Returns:
+        list: 処理時間（秒）
+    """
+    if warmup:
+        if before:
+            before()
+        func()
+    timings = []
+    for _ in range(repeats):
+        if before:
+            before()
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def summarize(timings):
+    return {
+        'runs': len(timings),
+        'median_ms': round(statistics.median(timings) * 1000, 4),
+        'p95_ms': round(percentile(timings, 0.95) * 1000, 4)
+    }
+
+
+def bench_size(rows, args, workdir):
+    """
+    1つのカタログの大きさで計測
+
+    Returns:
+        dict: 処理 -> 計測結果
+    """
+    csv_file = os.path.join(workdir, f"catalog_{rows}.csv")
+    ledger_file = os.path.join(workdir, f"posting_ledger_{rows}.jsonl")
+    history_file = os.path.join(workdir, f"posting_history_{rows}.json")
+
+    started = time.perf_counter()
+    write_catalog(csv_file, rows, args.seed)
+    entries = write_history(ledger_file, history_file, rows, args.history_days,
+                            args.posts_per_day, args.today_posts, args.seed)
+    print(f"  合成データ作成: {time.perf_counter() - started:.1f}秒 "
+          f"(カタログ {os.path.getsize(csv_file) / 1024 / 1024:.1f}MB, 投稿台帳 {entries}行)")
+
+    profile = {
+        'CSV_FILE': csv_file,
+        'POSTING_HISTORY_FILE': history_file,
+        'POSTING_LEDGER_FILE': ledger_file,
+        'POSTING_PLAN_FILE': os.path.join(workdir, f"posting_plan_{rows}.json"),
+        'ROTATION_DECK_FILE': os.path.join(workdir, f"rotation_deck_{rows}.bin"),
+        'ROTATION_STATE_FILE': os.path.join(workdir, f"rotation_state_{rows}.json"),
+        'POSTS_PER_DAY': args.posts_per_day,
+        'USE_POSTING_PLAN': True,
+        'USE_ROTATION_DECK': True,
+        'TEST_MODE': False,
+    }
+    results = {}
+
+    # 投稿判定・投稿のターミナル出力は計測結果の表示と混ざらないようにする
+    with contextlib.redirect_stdout(io.StringIO()):
+        bot = XPostingBotAdvanced(profile)
+        bot.x_client = StubXClient()
+
+        def forget_catalog():
+            catalog_index._loaded_catalogs.clear()
+
+        def remove_index():
+            forget_catalog()
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(catalog_index.default_index_file(csv_file))
+
+        results['load_csv_data[cold]'] = measure(bot.load_csv_data, args.load_repeats,
+                                                 warmup=False, before=remove_index)
+        results['load_csv_data[index]'] = measure(bot.load_csv_data, args.load_repeats,
+                                                  before=forget_catalog)
+        results['load_csv_data[memo]'] = measure(bot.load_csv_data, args.repeats)
+        available_posts = bot.load_csv_data()
+
+        def reopen_ledger():
+            bot.ledger = PostingLedger(ledger_file, history_file)
+
+        results['history_load'] = measure(bot.load_posting_history, args.load_repeats, before=reopen_ledger)
+        results['should_post_now'] = measure(bot.should_post_now, args.repeats)
+        results['get_available_posts'] = measure(lambda: bot.get_available_posts(available_posts), args.repeats)
+
+        # 山札は最初の選択で作成されるので、2回目以降を計測する（投稿しないので同じ本が選ばれる）
+        results['pick_from_rotation'] = measure(bot.pick_from_rotation, args.repeats)
+
+        post_data = available_posts[0]
+        results['create_post_content'] = measure(lambda: bot.create_post_content(post_data), args.repeats)
+
+        # 台帳への追記は今日未投稿の本で行う（重複投稿の判定で書き込まれなくなるため）
+        unposted = iter(bot.get_available_posts(available_posts))
+        results['history_save'] = measure(lambda: bot.add_to_posting_history(next(unposted), template=0),
+                                          args.repeats)
+
+        def post_next():
+            post_data = next(unposted)
+            bot.post_to_x(bot.create_post_content(post_data), post_data)
+
+        results['post_to_x'] = measure(post_next, args.repeats)
+
+    return {phase: summarize(timings) for phase, timings in results.items()}
+
+
+def git_commit():
+    """
+    計測したコミット（gitがない場合はNone、未コミットの変更がある場合は末尾に +dirty）
+    """
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'diff', '--quiet', 'HEAD', '--', '*.py'], capture_output=True).returncode
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return f"{commit}+dirty" if dirty else commit
+
+
+def load_results(results_file):
+    """
+    保存済みの計測結果（古い順）
+    """
+    records = []
+    if os.path.exists(results_file):
+        with open(results_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                with contextlib.suppress(ValueError):
+                    records.append(json.loads(line))
+    return records
+
+
+def append_result(results_file, record):
+    with open(results_file, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+
+def find_baseline(records, rows, commit=None):
+    """
+    比較する計測結果（同じ件数で、指定したコミットまたは直近のもの）
+    """
+    for record in reversed(records):
+        if record.get('rows') != rows:
+            continue
+        if commit is None or (record.get('commit') or '').startswith(commit):
+            return record
+    return None
+
+
+def print_results(results, baseline=None):
+    header = f"  {'処理':<24}{'中央値(ms)':>12}{'p95(ms)':>12}"
+    if baseline:
+        header += f"{'前回(ms)':>12}{'比':>8}"
+    print(header)
+    for phase, description in BENCH_PHASES:
+        result = results.get(phase)
+        if result is None:
+            continue
+        line = f"  {phase:<24}{result['median_ms']:>12.3f}{result['p95_ms']:>12.3f}"
+        previous = baseline['results'].get(phase) if baseline else None
+        if previous:
+            ratio = result['median_ms'] / previous['median_ms'] if previous['median_ms'] else 0.0
+            slower = result['median_ms'] - previous['median_ms'] > REGRESSION_MIN_MS
+            mark = " ⚠️" if ratio > REGRESSION_RATIO and slower else ""
+            line += f"{previous['median_ms']:>12.3f}{ratio:>7.2f}x{mark}"
+        print(f"{line}  {description}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="投稿処理のベンチマーク")
+    parser.add_argument('--sizes', default="1000,100000", help="カタログの件数（カンマ区切り）")
+    parser.add_argument('--repeats', type=int, default=50, help="各処理の計測回数")
+    parser.add_argument('--load-repeats', type=int, default=3, help="CSV・投稿台帳の読み込みの計測回数")
+    parser.add_argument('--history-days', type=int, default=365, help="投稿台帳の日数")
+    parser.add_argument('--posts-per-day', type=int, default=9, help="1日の投稿数")
+    parser.add_argument('--today-posts', type=int, default=3, help="今日投稿済みの件数")
+    parser.add_argument('--seed', type=int, default=0, help="合成データの乱数のシード")
+    parser.add_argument('--results', default=RESULTS_FILE, help="計測結果の保存先（JSON Lines）")
+    parser.add_argument('--no-save', action='store_true', help="計測結果を保存しない")
+    parser.add_argument('--compare', nargs='?', const='', default=None, metavar='COMMIT',
+                        help="保存済みの結果と比較（コミットを省略した場合は直近の結果）")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(',') if size.strip()]
+    # 合成データのみで計測する（環境変数のテストモードでは投稿時間・投稿先が変わるため無効にする）
+    os.environ.pop('TEST_MODE', None)
+    commit = git_commit()
+    records = load_results(args.results)
+    results_file = os.path.abspath(args.results)
+
+    print(f"コミット: {commit or '不明'}, Python {platform.python_version()}, "
+          f"投稿台帳: {args.history_days}日分 x {args.posts_per_day}件")
+    print("-" * 60)
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="bench_posting_") as workdir:
+        # ログ・計測ファイルも一時ディレクトリに書き込む
+        os.chdir(workdir)
+        try:
+            for rows in sizes:
+                print(f"カタログ {rows:,}件:")
+                results = bench_size(rows, args, workdir)
+                baseline = (find_baseline(records, rows, args.compare or None)
+                            if args.compare is not None else None)
+                print_results(results, baseline)
+                if not args.no_save:
+                    append_result(results_file, {
+                        'commit': commit,
+                        'recorded_at': datetime.now().isoformat(timespec='seconds'),
+                        'python': platform.python_version(),
+                        'rows': rows,
+                        'history_days': args.history_days,
+                        'posts_per_day': args.posts_per_day,
+                        'results': results
+                    })
+                print("-" * 60)
+        finally:
+            os.chdir(cwd)
+    if not args.no_save:
+        print(f"計測結果を保存しました: {args.results}")
+
+
+if __name__ == "__main__":
+    main()
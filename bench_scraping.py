@@ -0,0 +1,99 @@
+"""
+スクレイピングのベンチマーク
+ローカルの代替サーバーに対して、従来の同期処理（ページ全体を取得して re.findall）と
+非同期フェッチャー（接続プール + 最初のリンクで読み込みを打ち切り）を比較します
+
+使い方:
+    python bench_scraping.py --titles 50 --latency 0.05
+"""
+
+import argparse
+import re
+import statistics
+import time
+
+import requests
+
+from async_scraper import AsyncScraper
+from mock_upstream_server import MockUpstreamServer
+
+
+def percentile(values, ratio):
+    """
+    パーセンタイル値を計算
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * ratio))]
+
+
+def bench_sync(base_url, titles):
+    """
+    従来の同期処理（kindle_unlimited_link_generator_paapi.py の _search_scraping と同じ手順）
+    """
+    session = requests.Session()
+    latencies = []
+    total_bytes = 0
+    found = 0
+
+    for title in titles:
+        started = time.perf_counter()
+        response = session.get(f"{base_url}/s", params={'k': title, 'i': 'digital-text', 'ref': 'sr_nr_i_0'}, timeout=10)
+        response.raise_for_status()
+        matches = re.findall(r'href="(/dp/([A-Z0-9]{10}))', response.text)
+        latencies.append(time.perf_counter() - started)
+        total_bytes += len(response.content)
+        found += bool(matches)
+
+    return latencies, total_bytes, found
+
+
+def bench_async(base_url, titles, pool_size):
+    """
+    非同期フェッチャー
+    """
+    scraper = AsyncScraper(base_url, pool_size=pool_size, http2=False)
+    results = scraper.search_many(titles)
+    latencies = [result['elapsed'] for result in results]
+    total_bytes = sum(result['bytes'] for result in results)
+    found = sum(1 for result in results if result['asin'])
+    return latencies, total_bytes, found
+
+
+def print_result(name, titles, elapsed, latencies, total_bytes, found):
+    print(f"{name}:")
+    print(f"  処理時間: {elapsed:.2f}秒 ({len(titles) / elapsed:.1f}件/秒)")
+    print(f"  1件あたりの転送量: {total_bytes / len(titles) / 1024:.1f}KB")
+    print(f"  レイテンシ p50: {statistics.median(latencies) * 1000:.1f}ms, p99: {percentile(latencies, 0.99) * 1000:.1f}ms")
+    print(f"  商品リンク発見: {found}/{len(titles)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="スクレイピングのベンチマーク")
+    parser.add_argument('--titles', type=int, default=50, help="検索するタイトル数")
+    parser.add_argument('--pool-size', type=int, default=8, help="非同期フェッチャーの同時接続数")
+    parser.add_argument('--latency', type=float, default=0.05, help="代替サーバーの応答遅延（秒）")
+    parser.add_argument('--chunk-delay', type=float, default=0.002, help="代替サーバーの16KBごとの送信遅延（秒）")
+    args = parser.parse_args()
+
+    titles = [f"ベンチマーク用タイトル {i}" for i in range(args.titles)]
+    server = MockUpstreamServer(latency=args.latency, chunk_delay=args.chunk_delay).start()
+    print(f"代替サーバー: {server.base_url}")
+    print("-" * 50)
+
+    try:
+        started = time.perf_counter()
+        sync_result = bench_sync(server.base_url, titles)
+        print_result("同期（ページ全体を取得）", titles, time.perf_counter() - started, *sync_result)
+
+        started = time.perf_counter()
+        async_result = bench_async(server.base_url, titles, args.pool_size)
+        print_result(f"非同期（同時接続{args.pool_size}、最初のリンクで打ち切り）", titles,
+                     time.perf_counter() - started, *async_result)
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+X投稿クライアントのベンチマーク
+ローカルの代替X APIサーバーに遅延・5xxエラー・レート制限を設定して、
+再試行なし（従来の create_tweet と同じく1回で失敗扱い）と再試行ありの投稿結果を比較します
+レート制限に達した場合は、従来の wait_on_rate_limit=True で待機する時間も表示します
+
+使い方:
+    python bench_x_posting.py --posts 200 --error-rate 0.2 --latency 0.02
+    python bench_x_posting.py --posts 60 --rate-limit 50
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from bench_scraping import percentile
+from fake_x_api_server import FakeXAPIServer
+from x_post_client import PostDeferred, XPostClient, XPostError
+
+BENCH_CREDENTIALS = ("bench-key", "bench-secret", "bench-token", "bench-token-secret", None)
+
+
+async def run_posts(client, posts, label):
+    """
+    1件ずつ投稿（毎時実行・常駐モードと同じく1スロット1投稿）
+
+    Returns:
+        dict: 投稿結果の集計
+    """
+    result = {'posted': 0, 'deferred': 0, 'failed': 0, 'retries': 0, 'latencies': [], 'blocked': 0.0}
+    async with client._create_client() as http:
+        for number in range(posts):
+            started = time.perf_counter()
+            try:
+                _, retries = await client.create_tweet_async(f"{label} ベンチマーク投稿 {number}", http)
+                result['posted'] += 1
+            except PostDeferred as e:
+                retries = e.retries
+                result['deferred'] += 1
+                if e.retry_at:
+                    # wait_on_rate_limit=True の場合はリセットまで待機していた時間
+                    result['blocked'] = max(result['blocked'], e.retry_at - time.time())
+            except XPostError as e:
+                retries = e.retries
+                result['failed'] += 1
+            result['retries'] += retries
+            result['latencies'].append(time.perf_counter() - started)
+    return result
+
+
+def print_result(name, posts, elapsed, result):
+    latencies = result['latencies']
+    print(f"{name}:")
+    print(f"  処理時間: {elapsed:.2f}秒")
+    print(f"  投稿成功: {result['posted']}/{posts}, 次のスロットへ延期: {result['deferred']}, 失敗: {result['failed']}")
+    print(f"  再試行: {result['retries']}回")
+    print(f"  レイテンシ p50: {statistics.median(latencies) * 1000:.1f}ms, p99: {percentile(latencies, 0.99) * 1000:.1f}ms")
+    if result['blocked']:
+        print(f"  レート制限: 待機せずに延期（wait_on_rate_limit=True では約{result['blocked']:.0f}秒待機）")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="X投稿クライアントのベンチマーク")
+    parser.add_argument('--posts', type=int, default=200, help="投稿数")
+    parser.add_argument('--latency', type=float, default=0.02, help="代替サーバーの応答遅延（秒）")
+    parser.add_argument('--error-rate', type=float, default=0.2, help="代替サーバーが503エラーを返す割合")
+    parser.add_argument('--rate-limit', type=int, default=0, help="代替サーバーの15分あたりのリクエスト数の上限")
+    parser.add_argument('--retries', type=int, default=3, help="再試行ありの場合の再試行回数")
+    parser.add_argument('--backoff', type=float, default=0.05, help="再試行の待機時間の基準（秒）")
+    args = parser.parse_args()
+
+    print(f"投稿数: {args.posts}, 応答遅延: {args.latency * 1000:.0f}ms, "
+          f"エラー率: {args.error_rate:.0%}, レート制限: {args.rate_limit or 'なし'}")
+    print("-" * 60)
+
+    for name, retries in (("再試行なし", 0), (f"再試行あり（{args.retries}回、ジッター付きバックオフ）", args.retries)):
+        # 同じ条件で比較するため、毎回新しいサーバー（同じ乱数のシード）を使う
+        server = FakeXAPIServer(latency=args.latency, error_rate=args.error_rate,
+                                rate_limit=args.rate_limit).start()
+        try:
+            client = XPostClient(BENCH_CREDENTIALS, base_url=server.base_url,
+                                 max_retries=retries, backoff_seconds=args.backoff)
+            started = time.perf_counter()
+            result = asyncio.run(run_posts(client, args.posts, name))
+            print_result(name, args.posts, time.perf_counter() - started, result)
+        finally:
+            server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+投稿BOTのログ出力
+ログはキュー（QueueHandler）に積むだけにして、ファイル・ターミナルへの書き込みは別スレッド（QueueListener）で行います
+
+- ファイル: 1行1件のJSON（JSON Lines）、サイズの上限でローテーション
+- ターミナル: 従来と同じテキスト形式（投稿の判定・結果は print で表示しているので、既定では警告以上のみ）
+
+使い方:
+    logger = setup_bot_logging("x_bot.log")
+    logger.info("投稿成功: %s", title)   # 出力しないレベルのメッセージは文字列に変換されない
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+from datetime import datetime
+
+# ターミナル出力の形式（従来の basicConfig と同じ）
+TEXT_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+# 設定済みのリスナー（同じプロセスで複数回呼ばれても1つだけ起動する）
+_listener = None
+
+
+class JsonLineFormatter(logging.Formatter):
+    """
+    ログを1行のJSONにする（アカウント名などの extra は項目として出力）
+    """
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage()
+        }
+        account = getattr(record, 'account', None)
+        if account:
+            entry['account'] = account
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    """
+    従来のテキスト形式（アカウント名がある場合は先頭に付ける）
+    """
+    def formatMessage(self, record):
+        account = getattr(record, 'account', None)
+        if account:
+            record.message = f"[{account}] {record.message}"
+        return super().formatMessage(record)
+
+
+class AccountLogAdapter(logging.LoggerAdapter):
+    """
+    ログにアカウント名を付ける（JSONでは 'account' 項目、ターミナルではメッセージの先頭）
+    """
+    def process(self, msg, kwargs):
+        kwargs['extra'] = {**self.extra, **kwargs.get('extra', {})}
+        return msg, kwargs
+
+
+def parse_level(level):
+    """
+    ログレベル（'INFO' などの文字列または数値）を数値に変換（不明な場合はINFO）
+    """
+    if isinstance(level, int):
+        return level
+    value = logging.getLevelName(str(level).upper())
+    return value if isinstance(value, int) else logging.INFO
+
+
+def setup_bot_logging(log_file, level='INFO', console_level='WARNING', max_bytes=1_000_000,
+                      backup_count=3, json_lines=True):
+    """
+    キューを使ったログ出力を設定（2回目以降の呼び出しでは何もしない）
+
+    Args:
+        log_file (str): ログファイル
+        level (str): ログに出力するレベル
+        console_level (str): ターミナルに出力するレベル
+        max_bytes (int): ログファイルの上限（バイト、超えたら x_bot.log.1 などに移動）
+        backup_count (int): 残す古いログファイルの数
+        json_lines (bool): ファイルをJSON Linesで出力するかどうか（Falseの場合はテキスト形式）
+
+    Returns:
+        logging.Logger: ルートロガー
+    """
+    global _listener
+    root = logging.getLogger()
+    if _listener is not None:
+        return root
+
+    file_handler = logging.handlers.RotatingFileHandler(
+        log_file, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8', delay=True)
+    file_handler.setFormatter(JsonLineFormatter() if json_lines else TextFormatter(TEXT_FORMAT))
+    file_handler.setLevel(parse_level(level))
+
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(TextFormatter(TEXT_FORMAT))
+    console_handler.setLevel(parse_level(console_level))
+
+    log_queue = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(log_queue, file_handler, console_handler,
+                                               respect_handler_level=True)
+    _listener.start()
+    # 終了時にキューに残ったログを書き出す
+    atexit.register(stop_bot_logging)
+
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(min(file_handler.level, console_handler.level))
+    return root
+
+
+def stop_bot_logging():
+    """
+    キューに残ったログを書き出してリスナーを停止
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
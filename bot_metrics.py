@@ -0,0 +1,226 @@
+"""
+投稿BOTの計測（処理ごとの時間・投稿数などのカウンター）
+実行中はメモリ上に記録し、終了時に保存済みの値に加算して保存します（毎時実行でも累計が残る）
+
+- JSON: 累計のカウンター・処理時間のヒストグラムと、直近の実行の処理時間（CIでアップロードする）
+- Prometheus: node_exporter の textfile collector などで読み込めるテキスト形式
+
+使い方:
+    python bot_metrics.py                 # 累計と直近の実行の概要を表示
+    python bot_metrics.py --prometheus    # Prometheusのテキスト形式で表示
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+# 処理時間のヒストグラムの区切り（秒）
+PHASE_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# 計測する処理（表示順）
+PHASES = ('import', 'config_load', 'csv_load', 'history_load', 'decision',
+          'template_render', 'api_call', 'history_save')
+
+METRIC_PREFIX = 'x_bot'
+
+
+def empty_histogram():
+    return {'buckets': list(PHASE_BUCKETS), 'counts': [0] * (len(PHASE_BUCKETS) + 1), 'sum': 0.0, 'count': 0}
+
+
+def observe(histogram, value):
+    """
+    ヒストグラムに値を追加（counts の最後は区切りの最大値を超えた件数）
+    """
+    for position, bound in enumerate(histogram['buckets']):
+        if value <= bound:
+            break
+    else:
+        position = len(histogram['buckets'])
+    histogram['counts'][position] += 1
+    histogram['sum'] += value
+    histogram['count'] += 1
+
+
+def merge_histogram(total, run):
+    """
+    今回の実行のヒストグラムを累計に加算（区切りが変わった場合は累計を作り直す）
+    """
+    if total is None or total.get('buckets') != run['buckets']:
+        total = empty_histogram()
+    total['counts'] = [a + b for a, b in zip(total['counts'], run['counts'])]
+    total['sum'] += run['sum']
+    total['count'] += run['count']
+    return total
+
+
+class BotMetrics:
+    def __init__(self, metrics_file, prometheus_file=None):
+        """
+        計測の初期化（ファイルは save() まで読み込まない）
+
+        Args:
+            metrics_file (str): JSONの保存先（累計と直近の実行）
+            prometheus_file (str): Prometheusのテキスト形式の保存先（Noneの場合は保存しない）
+        """
+        self.metrics_file = metrics_file
+        self.prometheus_file = prometheus_file
+        self.lock = threading.Lock()
+        self.started_at = datetime.now().isoformat(timespec='seconds')
+        # 実行回数はプロセスごとに1回だけ数える（常駐モードでは投稿ごとに保存するため）
+        self.run_counted = False
+        self.reset_run()
+
+    def reset_run(self):
+        """
+        今回の実行の記録を空にする
+        """
+        self.counters = {}
+        self.histograms = {}
+        self.phases = {}
+
+    def record(self, phase, seconds):
+        """
+        処理時間を記録
+        """
+        with self.lock:
+            observe(self.histograms.setdefault(phase, empty_histogram()), seconds)
+            self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    @contextmanager
+    def timer(self, phase):
+        """
+        with ブロックの処理時間を記録
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(phase, time.perf_counter() - started)
+
+    def inc(self, name, value=1):
+        """
+        カウンターを加算（posts / failures / skips / deferrals / retries など）
+        """
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def load(self):
+        """
+        保存済みの累計を読み込み
+        """
+        if os.path.exists(self.metrics_file):
+            try:
+                with open(self.metrics_file, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except Exception:
+                pass
+        return {'runs': 0, 'counters': {}, 'histograms': {}}
+
+    def save(self):
+        """
+        今回の実行の記録を累計に加算して保存（一時ファイルに書いてから置き換え）
+
+        Returns:
+            dict: 保存した内容
+        """
+        with self.lock:
+            data = self.load()
+            data['runs'] = data.get('runs', 0) + (0 if self.run_counted else 1)
+            self.run_counted = True
+            counters = data.setdefault('counters', {})
+            for name, value in self.counters.items():
+                counters[name] = counters.get(name, 0) + value
+            histograms = data.setdefault('histograms', {})
+            for phase, histogram in self.histograms.items():
+                histograms[phase] = merge_histogram(histograms.get(phase), histogram)
+            data['last_run'] = {
+                'started_at': self.started_at,
+                'phases': {phase: round(seconds, 6) for phase, seconds in self.phases.items()},
+                'counters': dict(self.counters)
+            }
+            data['updated_at'] = datetime.now().isoformat(timespec='seconds')
+
+            tmp_file = f"{self.metrics_file}.tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_file, self.metrics_file)
+
+            if self.prometheus_file:
+                tmp_file = f"{self.prometheus_file}.tmp"
+                with open(tmp_file, 'w', encoding='utf-8') as f:
+                    f.write(to_prometheus(data))
+                os.replace(tmp_file, self.prometheus_file)
+
+            # 常駐モードで続けて保存しても二重に加算しないようにする
+            self.reset_run()
+        return data
+
+
+def to_prometheus(data):
+    """
+    保存した累計をPrometheusのテキスト形式に変換
+    """
+    lines = [
+        f"# HELP {METRIC_PREFIX}_runs_total 計測を保存した実行回数",
+        f"# TYPE {METRIC_PREFIX}_runs_total counter",
+        f"{METRIC_PREFIX}_runs_total {data.get('runs', 0)}"
+    ]
+    for name, value in sorted(data.get('counters', {}).items()):
+        metric = f"{METRIC_PREFIX}_{name}_total"
+        lines += [f"# TYPE {metric} counter", f"{metric} {value}"]
+
+    metric = f"{METRIC_PREFIX}_phase_seconds"
+    lines += [f"# HELP {metric} 処理ごとの時間（秒）", f"# TYPE {metric} histogram"]
+    for phase, histogram in sorted(data.get('histograms', {}).items()):
+        cumulative = 0
+        for bound, count in zip(histogram['buckets'], histogram['counts']):
+            cumulative += count
+            lines.append(f'{metric}_bucket{{phase="{phase}",le="{bound}"}} {cumulative}')
+        lines.append(f'{metric}_bucket{{phase="{phase}",le="+Inf"}} {histogram["count"]}')
+        lines.append(f'{metric}_sum{{phase="{phase}"}} {histogram["sum"]:.6f}')
+        lines.append(f'{metric}_count{{phase="{phase}"}} {histogram["count"]}')
+
+    last_run = data.get('last_run', {})
+    metric = f"{METRIC_PREFIX}_last_run_phase_seconds"
+    lines += [f"# HELP {metric} 直近の実行の処理時間（秒）", f"# TYPE {metric} gauge"]
+    for phase, seconds in sorted(last_run.get('phases', {}).items()):
+        lines.append(f'{metric}{{phase="{phase}"}} {seconds}')
+    return '\n'.join(lines) + '\n'
+
+
+def main():
+    parser = argparse.ArgumentParser(description="投稿BOTの計測")
+    parser.add_argument('--file', default="bot_metrics.json", help="計測ファイル")
+    parser.add_argument('--prometheus', action='store_true', help="Prometheusのテキスト形式で表示")
+    args = parser.parse_args()
+
+    data = BotMetrics(args.file).load()
+    if args.prometheus:
+        print(to_prometheus(data), end='')
+        return
+
+    print(f"計測: {args.file}（{data.get('runs', 0)}回分、更新 {data.get('updated_at', 'なし')}）")
+    print("-" * 60)
+    for name, value in sorted(data.get('counters', {}).items()):
+        print(f"{name}: {value}")
+
+    last_phases = data.get('last_run', {}).get('phases', {})
+    print("-" * 60)
+    print(f"{'処理':<16}{'回数':>8}{'平均(ms)':>12}{'直近(ms)':>12}")
+    histograms = data.get('histograms', {})
+    for phase in list(PHASES) + sorted(set(histograms) - set(PHASES)):
+        histogram = histograms.get(phase)
+        if not histogram or not histogram['count']:
+            continue
+        average = histogram['sum'] / histogram['count'] * 1000
+        last = f"{last_phases[phase] * 1000:.1f}" if phase in last_phases else "-"
+        print(f"{phase:<16}{histogram['count']:>8}{average:>12.1f}{last:>12}")
+
+
+if __name__ == "__main__":
+    main()
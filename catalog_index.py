@@ -0,0 +1,235 @@
+"""
+投稿カタログのインデックス
+投稿用CSVを一度だけ解析してコンパクトなレコードに変換し、ファイルに保存します
+CSVの更新日時・サイズ（一致しない場合は内容のハッシュ）が変わったときだけ作り直します
+"""
+
+import csv
+import hashlib
+import marshal
+import os
+
+# インデックスファイルの形式が変わったら上げる
+INDEX_VERSION = 2
+
+# インデックスファイルの先頭（識別子 + 本体のSHA-1、本体は marshal 形式）
+INDEX_MAGIC = b'XBOTIDX\n'
+CHECKSUM_SIZE = hashlib.sha1().digest_size
+
+# 同じプロセス内で読み込んだカタログ（CSVパス -> ((更新日時, サイズ), CatalogIndex)）
+_loaded_catalogs = {}
+
+CSV_COLUMNS = ('No', 'タイトル', '一言紹介文', '短縮URL')
+
+
+class CatalogRecord:
+    """
+    投稿データ1件（post_data['title'] のように辞書と同じ書き方で参照できる）
+    """
+    __slots__ = ('index', 'title', 'introduction', 'short_url')
+
+    def __init__(self, index, title, introduction, short_url):
+        self.index = index
+        self.title = title
+        self.introduction = introduction
+        self.short_url = short_url
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except (AttributeError, TypeError):
+            raise KeyError(key)
+
+    def get(self, key, default=None):
+        return getattr(self, key, default) if isinstance(key, str) else default
+
+    def __contains__(self, key):
+        return key in self.__slots__
+
+    def __eq__(self, other):
+        if not isinstance(other, CatalogRecord):
+            return NotImplemented
+        return self.as_tuple() == other.as_tuple()
+
+    def __hash__(self):
+        return hash(self.as_tuple())
+
+    def __repr__(self):
+        return f"CatalogRecord(index={self.index!r}, title={self.title!r})"
+
+    def as_tuple(self):
+        return (self.index, self.title, self.introduction, self.short_url)
+
+    def to_dict(self):
+        return {key: getattr(self, key) for key in self.__slots__}
+
+
+class CatalogIndex:
+    def __init__(self, records, digest=None):
+        """
+        カタログの初期化
+
+        Args:
+            records (list): CatalogRecord のリスト（CSVの行順）
+            digest (str): 元のCSVの内容のハッシュ（カタログが変わったかどうかの判定に使う）
+        """
+        self.records = records
+        self.digest = digest
+        # No -> レコード（O(1)で参照）
+        self.by_no = {record.index: record for record in records}
+        # 短縮URLがある（投稿できる）レコード
+        self.postable = [record for record in records if record.short_url]
+
+    def __len__(self):
+        return len(self.records)
+
+    def get(self, no):
+        """
+        Noからレコードを取得（存在しない場合はNone）
+        """
+        return self.by_no.get(no)
+
+
+def _parse_no(value):
+    """
+    No列の値を整数に変換（'12' や '12.0' を許容）
+    """
+    value = (value or '').strip()
+    try:
+        return int(value)
+    except ValueError:
+        return int(float(value))
+
+
+def parse_catalog_csv(csv_file):
+    """
+    投稿用CSVを解析してレコードのリストを作成
+
+    Args:
+        csv_file (str): CSVファイルパス
+
+    Returns:
+        list: CatalogRecord のリスト
+    """
+    records = []
+    # Excelで保存したCSVのBOMを読み飛ばす
+    with open(csv_file, 'r', encoding='utf-8-sig', newline='') as f:
+        reader = csv.DictReader(f)
+        missing = [column for column in CSV_COLUMNS if column not in (reader.fieldnames or [])]
+        if missing:
+            raise ValueError(f"必要な列がありません: {', '.join(missing)}")
+
+        for row in reader:
+            if not (row['No'] or '').strip():
+                continue
+            records.append(CatalogRecord(
+                _parse_no(row['No']),
+                row['タイトル'] or '',
+                row['一言紹介文'] or '',
+                (row['短縮URL'] or '').strip()
+            ))
+    return records
+
+
+def file_digest(path):
+    """
+    ファイル内容のハッシュを計算
+    """
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _read_index_file(index_file):
+    """
+    インデックスファイルを読み込み（ない・途中で切れている・壊れている・形式が古い場合はNone）
+    """
+    try:
+        with open(index_file, 'rb') as f:
+            content = f.read()
+        header_size = len(INDEX_MAGIC) + CHECKSUM_SIZE
+        if not content.startswith(INDEX_MAGIC) or \
+                hashlib.sha1(content[header_size:]).digest() != content[len(INDEX_MAGIC):header_size]:
+            return None
+        data = marshal.loads(content[header_size:])
+        if not isinstance(data, dict) or data.get('version') != INDEX_VERSION or \
+                any(key not in data for key in ('mtime_ns', 'size', 'sha1', 'rows')):
+            return None
+        # レコードに変換できることまで確認する
+        data['records'] = [CatalogRecord(*row) for row in data['rows']]
+    except Exception:
+        return None
+    return data
+
+
+def _write_index_file(index_file, data):
+    """
+    インデックスファイルを保存（一時ファイルに書いてから置き換え）
+    """
+    payload = marshal.dumps(data)
+    tmp_file = f"{index_file}.tmp"
+    with open(tmp_file, 'wb') as f:
+        f.write(INDEX_MAGIC + hashlib.sha1(payload).digest() + payload)
+    os.replace(tmp_file, index_file)
+
+
+def default_index_file(csv_file):
+    """
+    CSVに対応するインデックスファイル名（例: posts.csv -> posts.csv.idx）
+    """
+    return f"{csv_file}.idx"
+
+
+def load_catalog(csv_file, index_file=None, logger=None):
+    """
+    投稿カタログを読み込み（インデックスが最新ならCSVは解析しない）
+
+    Args:
+        csv_file (str): CSVファイルパス
+        index_file (str): インデックスファイルパス（Noneの場合は CSV名 + .idx）
+        logger (logging.Logger): 作り直した場合のログ出力先
+
+    Returns:
+        CatalogIndex: カタログ
+    """
+    index_file = index_file or default_index_file(csv_file)
+    stat = os.stat(csv_file)
+    signature = (stat.st_mtime_ns, stat.st_size)
+
+    loaded = _loaded_catalogs.get(csv_file)
+    if loaded and loaded[0] == signature:
+        return loaded[1]
+
+    data = _read_index_file(index_file)
+    if data and (data['mtime_ns'], data['size']) == signature:
+        catalog = CatalogIndex(data['records'], data['sha1'])
+        _loaded_catalogs[csv_file] = (signature, catalog)
+        return catalog
+
+    # 更新日時が違っても内容が同じなら解析しない（git checkout 直後など）
+    digest = file_digest(csv_file)
+    if data and data['sha1'] == digest:
+        rows = data['rows']
+    else:
+        rows = [record.as_tuple() for record in parse_catalog_csv(csv_file)]
+        if logger:
+            logger.info("カタログインデックスを作成しました: %s (%s件)", index_file, len(rows))
+
+    try:
+        _write_index_file(index_file, {
+            'version': INDEX_VERSION,
+            'mtime_ns': stat.st_mtime_ns,
+            'size': stat.st_size,
+            'sha1': digest,
+            'rows': rows
+        })
+    except OSError as e:
+        # 書き込めない環境でもCSVから読み込んだ結果は使う
+        if logger:
+            logger.warning("カタログインデックス保存エラー: %s", e)
+
+    catalog = CatalogIndex([CatalogRecord(*row) for row in rows], digest)
+    _loaded_catalogs[csv_file] = (signature, catalog)
+    return catalog
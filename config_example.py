@@ -18,6 +18,7 @@ PAAPI_REGION = "us-west-2"  # リージョン（日本の場合は固定）
 
 # URL短縮機能の設定
 USE_URL_SHORTENER = True  # True: 短縮機能を使用, False: 使用しない
+BULK_SHORTEN = False  # True: 検索完了後に未短縮のURLだけをまとめて短縮
 
 # Bitly API設定（オプション）
 # Bitlyを使用する場合は、有効なAPIトークンを設定してください
@@ -27,11 +28,50 @@ BITLY_TOKEN = None  # 例: "your-bitly-token"
 INPUT_FILE = "kindle_unlimited_biz_10_clean.csv"
 OUTPUT_FILE = "kindle_unlimited_biz_10_with_links.csv"
 
+# 差分モード設定
+INCREMENTAL_MODE = True  # True: 追加・変更・失敗した行だけを処理し、公開済みのNoを維持
+STATE_FILE = "link_generation_state.json"  # 差分モードの状態ファイル（次のNo、失敗したタイトル）
+
+# ストリーミングモード設定（--stream で実行した場合）
+STREAM_CHUNK_SIZE = 500  # 1回に読み込んで処理する入力行数
+CHECKPOINT_FILE = "link_generation_checkpoint.json"  # 再開用のチェックポイント（完了すると削除）
+
+# ジャーナル設定（--full / --resume / --retry-failed で実行した場合）
+JOURNAL_FILE = "link_generation_journal.jsonl"  # 1タイトルごとの処理結果（ASIN・短縮URL・失敗の理由と試行回数）
+RETRY_COOLDOWN_MINUTES = 60  # --retry-failed で失敗した行を再試行するまでの時間（分）
+
 # レート制限設定
 REQUEST_DELAY = 1  # リクエスト間の待機時間（秒）
 
+# 並列処理設定
+MAX_WORKERS = 4  # 検索・URL短縮を並列実行するスレッド数
+
+# アップストリームごとのレート制限（1秒あたりのリクエスト数）
+PAAPI_RATE_LIMIT = 1.0  # PA-API（TPS上限は1）
+SCRAPING_RATE_LIMIT = 1.0  # amazon.co.jp スクレイピング
+TINYURL_RATE_LIMIT = 2.0  # TinyURL
+BITLY_RATE_LIMIT = 2.0  # Bitly
+
+# 適応的なレート制限（応答に合わせて上のレートとREQUEST_DELAYから調整）
+ADAPTIVE_RATE_LIMIT = True  # True: 成功が続いたら上げ、429/503・商品リンクのないページで半分に下げる
+ADAPTIVE_RATE_FILE = "adaptive_rates.json"  # 学習したレートの保存先（次の実行で引き継ぐ）
+ADAPTIVE_MAX_RATE_MULTIPLIER = 10.0  # 設定したレートの何倍まで上げるか
+
+# キャッシュ設定
+USE_CACHE = True  # True: 検索結果をキャッシュして再検索を省略
+CACHE_FILE = "link_cache.db"  # キャッシュファイル（SQLite）
+CACHE_TTL_DAYS = 30  # 見つかった結果の有効期間（日）
+CACHE_NEGATIVE_TTL_DAYS = 1  # 見つからなかった結果の有効期間（日）
+
 # 検索設定
 SEARCH_TIMEOUT = 10  # 検索リクエストのタイムアウト時間（秒）
 
+# スクレイピング設定
+USE_ASYNC_SCRAPING = True  # True: 非同期フェッチャーでまとめてスクレイピング（httpxが必要）
+SCRAPING_POOL_SIZE = 8  # 同時接続数（keep-aliveで接続を使い回す）
+SCRAPING_HTTP2 = True  # True: HTTP/2を使用（h2が必要、ない場合はHTTP/1.1）
+AMAZON_BASE_URL = "https://www.amazon.co.jp"  # 検索ページのベースURL（ベンチマーク時はローカルの代替サーバー）
+SCRAPING_PREFER_KU = False  # True: 読み放題の結果を優先（先頭の8件まで読み進めるため、最初の結果で打ち切るより転送量が増える）
+
 # デバッグ設定
 DEBUG_MODE = False  # True: デバッグ情報を表示, False: 最小限の情報のみ表示 
\ No newline at end of file
@@ -0,0 +1,217 @@
+"""
+ローカルの代替X APIサーバー（ベンチマーク・動作確認用）
+POST /2/tweets と GET /2/users/me に応答し、遅延・5xxエラー・レート制限を模擬します
+
+使い方:
+    python fake_x_api_server.py --port 8766 --error-rate 0.2 --rate-limit 50
+    （設定ファイルの X_API_BASE_URL を "http://127.0.0.1:8766" に変更して実行）
+"""
+
+import argparse
+import itertools
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+
+from mock_upstream_server import MockHTTPServer
+
+# X APIのレート制限の単位（15分）
+RATE_LIMIT_WINDOW = 15 * 60
+
+
+class FakeXAPIHandler(BaseHTTPRequestHandler):
+    # keep-aliveで接続を使い回せるようにする
+    protocol_version = 'HTTP/1.1'
+    # ヘッダーと本文を別々に送るので、Nagleアルゴリズムによる遅延を避ける
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        # ベンチマークの出力を汚さないようにアクセスログは出さない
+        pass
+
+    def do_GET(self):
+        if self.path.split('?')[0] == '/2/users/me':
+            self.handle_api('GET /2/users/me', lambda: (200, {
+                'data': {'id': '1', 'name': 'Fake User', 'username': 'fake_user'}
+            }))
+        else:
+            self.send_json(404, {'title': 'Not Found'})
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        if self.path.split('?')[0] != '/2/tweets':
+            self.send_json(404, {'title': 'Not Found'})
+            return
+        try:
+            text = json.loads(body)['text']
+        except (ValueError, KeyError, TypeError):
+            self.send_json(400, {'title': 'Invalid Request'})
+            return
+        self.handle_api('POST /2/tweets', lambda: self.server.create_tweet(text))
+
+    def handle_api(self, endpoint, respond):
+        """
+        遅延・エラー・レート制限を適用して応答
+        """
+        server = self.server
+        authorization = self.headers.get('Authorization', '')
+        if not authorization.startswith('OAuth ') or \
+                any(f'oauth_token="{token}"' in authorization for token in server.settings['revoked_tokens']):
+            self.send_json(401, {'title': 'Unauthorized'})
+            return
+
+        if server.settings['latency']:
+            time.sleep(server.settings['latency'])
+
+        headers, allowed = server.consume(endpoint)
+        if not allowed:
+            self.send_json(429, {'title': 'Too Many Requests'}, headers)
+            return
+        if server.inject_error():
+            self.send_json(503, {'title': 'Service Unavailable'}, headers)
+            return
+
+        status, payload = respond()
+        self.send_json(status, payload, headers)
+
+    def send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, str(value))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class FakeXAPIHTTPServer(MockHTTPServer):
+    def create_tweet(self, text):
+        """
+        投稿を記録（同じ本文の連続投稿は実際のX APIと同じく403）
+        """
+        with self.lock:
+            if text in self.texts:
+                return 403, {'title': 'Forbidden', 'detail': 'You are not allowed to create a Tweet with duplicate content.'}
+            self.texts.add(text)
+            tweet_id = str(next(self.tweet_ids))
+            self.tweets.append({'id': tweet_id, 'text': text})
+        return 201, {'data': {'id': tweet_id, 'text': text}}
+
+    def consume(self, endpoint):
+        """
+        エンドポイントのレート制限を1回分消費
+
+        Returns:
+            tuple: (レート制限のヘッダー, 許可されたかどうか)
+        """
+        limit = self.settings['rate_limit']
+        if not limit:
+            return {}, True
+        now = time.time()
+        with self.lock:
+            window = self.windows.get(endpoint)
+            if window is None or window['reset'] <= now:
+                window = self.windows[endpoint] = {'remaining': limit, 'reset': int(now + self.settings['window'])}
+            allowed = window['remaining'] > 0
+            if allowed:
+                window['remaining'] -= 1
+            headers = {
+                'x-rate-limit-limit': limit,
+                'x-rate-limit-remaining': window['remaining'],
+                'x-rate-limit-reset': window['reset']
+            }
+        return headers, allowed
+
+    def inject_error(self):
+        """
+        設定した割合で5xxエラーにする
+        """
+        with self.lock:
+            return self.rng.random() < self.settings['error_rate']
+
+
+class FakeXAPIServer:
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, error_rate=0.0,
+                 rate_limit=0, window=RATE_LIMIT_WINDOW, seed=0, revoked_tokens=()):
+        """
+        代替X APIサーバーの初期化
+
+        Args:
+            host (str): 待ち受けアドレス
+            port (int): 待ち受けポート（0の場合は空いているポート）
+            latency (float): 応答までの遅延（秒）
+            error_rate (float): 503エラーを返す割合（0〜1）
+            rate_limit (int): エンドポイントごとの期間内のリクエスト数の上限（0の場合は制限なし）
+            window (int): レート制限の期間（秒）
+            seed: エラーの乱数のシード
+            revoked_tokens (list): 401を返すアクセストークン（取り消された認証情報の模擬）
+        """
+        self.httpd = FakeXAPIHTTPServer((host, port), FakeXAPIHandler)
+        self.httpd.settings = {
+            'latency': latency,
+            'error_rate': error_rate,
+            'rate_limit': rate_limit,
+            'window': window,
+            'revoked_tokens': set(revoked_tokens)
+        }
+        self.httpd.lock = threading.Lock()
+        self.httpd.rng = random.Random(seed)
+        self.httpd.windows = {}
+        self.httpd.texts = set()
+        self.httpd.tweets = []
+        self.httpd.tweet_ids = itertools.count(1_000_000_000_000_000_000)
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def tweets(self):
+        return self.httpd.tweets
+
+    def start(self):
+        """
+        バックグラウンドのスレッドでサーバーを起動
+        """
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """
+        サーバーを停止
+        """
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ローカルの代替X APIサーバー（ベンチマーク用）")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--latency', type=float, default=0.0, help="応答までの遅延（秒）")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="503エラーを返す割合（0〜1）")
+    parser.add_argument('--rate-limit', type=int, default=0, help="15分あたりのリクエスト数の上限（0の場合は制限なし）")
+    parser.add_argument('--window', type=int, default=RATE_LIMIT_WINDOW, help="レート制限の期間（秒）")
+    parser.add_argument('--revoke', action='append', default=[], metavar='TOKEN', help="401を返すアクセストークン")
+    args = parser.parse_args()
+
+    server = FakeXAPIServer(args.host, args.port, args.latency, args.error_rate,
+                            args.rate_limit, args.window, revoked_tokens=args.revoke)
+    print(f"代替X APIサーバー起動: {server.base_url}（Ctrl+Cで停止）")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        print("\n代替X APIサーバーを停止します")
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
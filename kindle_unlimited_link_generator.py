@@ -1,23 +1,29 @@
 import pandas as pd
 import requests
-import time
-import re
-from urllib.parse import quote
-import json
+from link_cache import TitleCache
+from link_engine import LinkEngine, ScrapingResolver, NoShortener
 
 class KindleUnlimitedLinkGenerator:
-    def __init__(self, affiliate_tag):
+    def __init__(self, affiliate_tag, cache_file="link_cache.db"):
         """
         Kindle Unlimitedリンク生成器の初期化
         
         Args:
             affiliate_tag (str): Amazonアソシエイトタグ
+            cache_file (str): 検索結果のキャッシュファイル（Noneでキャッシュ無効）
         """
         self.affiliate_tag = affiliate_tag
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         })
+        # スクレイピングは1秒に1回まで（レート制限を避けるため）
+        self.engine = LinkEngine(
+            [ScrapingResolver(self.session, timeout=10, rate=1.0)],
+            [NoShortener()],
+            affiliate_tag,
+            title_cache=TitleCache(cache_file) if cache_file else None
+        )
     
     def search_kindle_unlimited(self, title):
         """
@@ -29,32 +35,8 @@ class KindleUnlimitedLinkGenerator:
         Returns:
             str: 商品URL（見つからない場合はNone）
         """
-        try:
-            # Kindle Unlimitedの検索URL
-            search_url = "https://www.amazon.co.jp/s"
-            params = {
-                'k': title,
-                'i': 'digital-text',  # Kindleストア
-                'ref': 'sr_nr_i_0'
-            }
-            
-            response = self.session.get(search_url, params=params, timeout=10)
-            response.raise_for_status()
-            
-            # 最初の商品リンクを探す
-            # 商品リンクのパターンを検索
-            product_pattern = r'href="(/dp/[A-Z0-9]{10})'
-            matches = re.findall(product_pattern, response.text)
-            
-            if matches:
-                product_id = matches[0]
-                return f"https://www.amazon.co.jp{product_id}"
-            
-            return None
-            
-        except Exception as e:
-            print(f"検索エラー ({title}): {e}")
-            return None
+        product_info, _ = self.engine.resolve(title)
+        return product_info['url'] if product_info else None
     
     def create_affiliate_link(self, product_url):
         """
@@ -66,14 +48,7 @@ class KindleUnlimitedLinkGenerator:
         Returns:
             str: アソシエイトリンク
         """
-        if not product_url:
-            return None
-        
-        # アソシエイトパラメータを追加
-        separator = '&' if '?' in product_url else '?'
-        affiliate_url = f"{product_url}{separator}tag={self.affiliate_tag}"
-        
-        return affiliate_url
+        return self.engine.affiliate_link(product_url)
     
     def shorten_url(self, url):
         """
@@ -87,9 +62,8 @@ class KindleUnlimitedLinkGenerator:
             str: 短縮URL（この実装では元のURLを返す）
         """
         # 注意: 実際の短縮サービスを使用する場合は、
-        # TinyURL、Bitly、Google URL ShortenerなどのAPIを使用してください
-        # ここでは簡易的に元のURLを返します
-        return url
+        # kindle_unlimited_link_generator_advanced.py（TinyURL、Bitly）を使用してください
+        return self.engine.shorten(url)
     
     def process_csv(self, input_file, output_file):
         """
@@ -102,43 +76,27 @@ class KindleUnlimitedLinkGenerator:
         try:
             # CSVファイルを読み込み
             df = pd.read_csv(input_file)
-            
-            # 新しい列を追加
-            df['商品URL'] = ''
-            df['アソシエイトリンク'] = ''
-            df['短縮URL'] = ''
+            titles = df['タイトル'].astype(str).tolist()
             
             print(f"合計 {len(df)} 件のタイトルを処理します...")
             
-            for index, row in df.iterrows():
-                title = row['タイトル']
-                print(f"処理中 ({index + 1}/{len(df)}): {title[:50]}...")
-                
-                # Kindle Unlimitedで検索
-                product_url = self.search_kindle_unlimited(title)
-                df.at[index, '商品URL'] = product_url if product_url else ''
-                
-                # アソシエイトリンクを作成
-                if product_url:
-                    affiliate_url = self.create_affiliate_link(product_url)
-                    df.at[index, 'アソシエイトリンク'] = affiliate_url if affiliate_url else ''
-                    
-                    # URLを短縮
-                    short_url = self.shorten_url(affiliate_url)
-                    df.at[index, '短縮URL'] = short_url if short_url else ''
-                else:
-                    df.at[index, 'アソシエイトリンク'] = ''
-                    df.at[index, '短縮URL'] = ''
-                
-                # レート制限を避けるため少し待機
-                time.sleep(1)
+            # 検索・リンク作成（待機はバックエンドのレート制限で行う）
+            results = self.engine.process_titles(
+                titles,
+                on_result=lambda index, result: print(f"処理中 ({index + 1}/{len(df)}): {result['title'][:50]}...")
+            )
+            
+            # 新しい列を追加
+            df['商品URL'] = [result['product_info']['url'] if result['product_info'] else '' for result in results]
+            df['アソシエイトリンク'] = [result['affiliate_url'] or '' for result in results]
+            df['短縮URL'] = [result['short_url'] or '' for result in results]
             
             # 結果をCSVファイルに保存
             df.to_csv(output_file, index=False, encoding='utf-8-sig')
             print(f"処理完了！結果を {output_file} に保存しました。")
             
             # 統計情報を表示
-            success_count = df['商品URL'].notna().sum()
+            success_count = sum(1 for result in results if result['product_info'])
             print(f"成功: {success_count}/{len(df)} 件")
             
         except Exception as e:
@@ -1,18 +1,19 @@
 import pandas as pd
 import requests
-import time
-import re
-from urllib.parse import quote
-import json
+from link_cache import TitleCache, ShortUrlCache
+from link_engine import LinkEngine, ScrapingResolver, TinyURLShortener, BitlyShortener, NoShortener
+from rate_limiter import AdaptiveRateStore
 
 class KindleUnlimitedLinkGenerator:
-    def __init__(self, affiliate_tag, use_url_shortener=True):
+    def __init__(self, affiliate_tag, use_url_shortener=True, cache_file="link_cache.db", rate_file=None):
         """
         Kindle Unlimitedリンク生成器の初期化
         
         Args:
             affiliate_tag (str): Amazonアソシエイトタグ
             use_url_shortener (bool): URL短縮機能を使用するかどうか
+            cache_file (str): 検索結果のキャッシュファイル（Noneでキャッシュ無効）
+            rate_file (str): 学習したレートの保存先（指定した場合は1秒に1回から応答に合わせて調整）
         """
         self.affiliate_tag = affiliate_tag
         self.use_url_shortener = use_url_shortener
@@ -20,6 +21,30 @@ class KindleUnlimitedLinkGenerator:
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         })
+        self.tinyurl = TinyURLShortener(self.session, timeout=10)
+        # Bitlyはトークンを指定されたときに作成する（同じトークンでは使い回す）
+        self.bitly = None
+        # スクレイピングは1秒に1回まで（レート制限を避けるため）
+        self.engine = LinkEngine(
+            [ScrapingResolver(self.session, timeout=10, rate=1.0)],
+            [self.tinyurl] if use_url_shortener else [NoShortener()],
+            affiliate_tag,
+            title_cache=TitleCache(cache_file) if cache_file else None,
+            short_url_cache=ShortUrlCache(cache_file) if cache_file else None,
+            rate_store=AdaptiveRateStore(rate_file) if rate_file else None
+        )
+    
+    def _shorteners(self, bitly_token=None):
+        """
+        使用する短縮のバックエンド（Bitlyのトークンがある場合はBitly、ない場合はTinyURL）
+        """
+        if not self.use_url_shortener:
+            return [NoShortener()]
+        if bitly_token:
+            if self.bitly is None or self.bitly.token != bitly_token:
+                self.bitly = self.engine.adapt(BitlyShortener(self.session, bitly_token, timeout=10))
+            return [self.bitly]
+        return [self.tinyurl]
     
     def search_kindle_unlimited(self, title):
         """
@@ -31,32 +56,8 @@ class KindleUnlimitedLinkGenerator:
         Returns:
             str: 商品URL（見つからない場合はNone）
         """
-        try:
-            # Kindle Unlimitedの検索URL
-            search_url = "https://www.amazon.co.jp/s"
-            params = {
-                'k': title,
-                'i': 'digital-text',  # Kindleストア
-                'ref': 'sr_nr_i_0'
-            }
-            
-            response = self.session.get(search_url, params=params, timeout=10)
-            response.raise_for_status()
-            
-            # 最初の商品リンクを探す
-            # 商品リンクのパターンを検索
-            product_pattern = r'href="(/dp/[A-Z0-9]{10})'
-            matches = re.findall(product_pattern, response.text)
-            
-            if matches:
-                product_id = matches[0]
-                return f"https://www.amazon.co.jp{product_id}"
-            
-            return None
-            
-        except Exception as e:
-            print(f"検索エラー ({title}): {e}")
-            return None
+        product_info, _ = self.engine.resolve(title)
+        return product_info['url'] if product_info else None
     
     def create_affiliate_link(self, product_url):
         """
@@ -68,14 +69,7 @@ class KindleUnlimitedLinkGenerator:
         Returns:
             str: アソシエイトリンク
         """
-        if not product_url:
-            return None
-        
-        # アソシエイトパラメータを追加
-        separator = '&' if '?' in product_url else '?'
-        affiliate_url = f"{product_url}{separator}tag={self.affiliate_tag}"
-        
-        return affiliate_url
+        return self.engine.affiliate_link(product_url)
     
     def shorten_url_tinyurl(self, url):
         """
@@ -87,21 +81,7 @@ class KindleUnlimitedLinkGenerator:
         Returns:
             str: 短縮URL（エラーの場合は元のURL）
         """
-        if not self.use_url_shortener:
-            return url
-            
-        try:
-            tinyurl_api = "http://tinyurl.com/api-create.php"
-            params = {'url': url}
-            
-            response = self.session.get(tinyurl_api, params=params, timeout=10)
-            response.raise_for_status()
-            
-            return response.text
-            
-        except Exception as e:
-            print(f"URL短縮エラー: {e}")
-            return url
+        return self.engine.shorten(url, self._shorteners())
     
     def shorten_url_bitly(self, url, bitly_token):
         """
@@ -114,26 +94,9 @@ class KindleUnlimitedLinkGenerator:
         Returns:
             str: 短縮URL（エラーの場合は元のURL）
         """
-        if not self.use_url_shortener or not bitly_token:
-            return url
-            
-        try:
-            bitly_api = "https://api-ssl.bitly.com/v4/shorten"
-            headers = {
-                'Authorization': f'Bearer {bitly_token}',
-                'Content-Type': 'application/json'
-            }
-            data = {'long_url': url}
-            
-            response = self.session.post(bitly_api, headers=headers, json=data, timeout=10)
-            response.raise_for_status()
-            
-            result = response.json()
-            return result.get('link', url)
-            
-        except Exception as e:
-            print(f"Bitly短縮エラー: {e}")
+        if not bitly_token:
             return url
+        return self.engine.shorten(url, self._shorteners(bitly_token))
     
     def process_csv(self, input_file, output_file, bitly_token=None):
         """
@@ -145,49 +108,37 @@ class KindleUnlimitedLinkGenerator:
             bitly_token (str): Bitly APIトークン（オプション）
         """
         try:
+            # 既存の出力CSVから短縮URLの対応表を作成
+            if self.engine.short_url_cache:
+                seeded = self.engine.short_url_cache.seed_from_csv(output_file, self.engine.title_cache, self.affiliate_tag)
+                if seeded:
+                    print(f"既存の短縮URLを {seeded} 件読み込みました")
+            
             # CSVファイルを読み込み
             df = pd.read_csv(input_file)
-            
-            # 新しい列を追加
-            df['商品URL'] = ''
-            df['アソシエイトリンク'] = ''
-            df['短縮URL'] = ''
+            titles = df['タイトル'].astype(str).tolist()
             
             print(f"合計 {len(df)} 件のタイトルを処理します...")
             print(f"URL短縮機能: {'有効' if self.use_url_shortener else '無効'}")
             
-            for index, row in df.iterrows():
-                title = row['タイトル']
-                print(f"処理中 ({index + 1}/{len(df)}): {title[:50]}...")
-                
-                # Kindle Unlimitedで検索
-                product_url = self.search_kindle_unlimited(title)
-                df.at[index, '商品URL'] = product_url if product_url else ''
-                
-                # アソシエイトリンクを作成
-                if product_url:
-                    affiliate_url = self.create_affiliate_link(product_url)
-                    df.at[index, 'アソシエイトリンク'] = affiliate_url if affiliate_url else ''
-                    
-                    # URLを短縮
-                    if bitly_token:
-                        short_url = self.shorten_url_bitly(affiliate_url, bitly_token)
-                    else:
-                        short_url = self.shorten_url_tinyurl(affiliate_url)
-                    df.at[index, '短縮URL'] = short_url if short_url else ''
-                else:
-                    df.at[index, 'アソシエイトリンク'] = ''
-                    df.at[index, '短縮URL'] = ''
-                
-                # レート制限を避けるため少し待機
-                time.sleep(1)
+            # 検索・リンク作成・URL短縮（待機はバックエンドのレート制限で行う）
+            results = self.engine.process_titles(
+                titles,
+                on_result=lambda index, result: print(f"処理中 ({index + 1}/{len(df)}): {result['title'][:50]}..."),
+                shorteners=self._shorteners(bitly_token)
+            )
+            
+            # 新しい列を追加
+            df['商品URL'] = [result['product_info']['url'] if result['product_info'] else '' for result in results]
+            df['アソシエイトリンク'] = [result['affiliate_url'] or '' for result in results]
+            df['短縮URL'] = [result['short_url'] or '' for result in results]
             
             # 結果をCSVファイルに保存
             df.to_csv(output_file, index=False, encoding='utf-8-sig')
             print(f"処理完了！結果を {output_file} に保存しました。")
             
             # 統計情報を表示
-            success_count = df['商品URL'].notna().sum()
+            success_count = sum(1 for result in results if result['product_info'])
             print(f"成功: {success_count}/{len(df)} 件")
             
             # 結果のサマリーを表示
@@ -211,7 +162,8 @@ def main():
     # リンク生成器を作成
     generator = KindleUnlimitedLinkGenerator(
         affiliate_tag=affiliate_tag,
-        use_url_shortener=True  # URL短縮機能を有効にする
+        use_url_shortener=True,  # URL短縮機能を有効にする
+        rate_file="adaptive_rates.json"  # 応答に合わせてリクエスト間隔を調整する
     )
     
     # ファイル名を設定
@@ -1,10 +1,11 @@
 import pandas as pd
 import requests
-import time
-import re
-from urllib.parse import quote
-import json
 import os
+import argparse
+from link_cache import TitleCache, ShortUrlCache
+from link_engine import LinkEngine, ScrapingResolver, TinyURLShortener, BitlyShortener, NoShortener
+from link_stream import stream_csv, read_columns
+from rate_limiter import AdaptiveRateStore
 
 # 設定ファイルの読み込み
 try:
@@ -14,6 +15,35 @@ except ImportError:
     print("config_example.py を config.py にコピーして、実際の値に変更してください。")
     exit(1)
 
+# キャッシュ設定のインポート（未設定の場合はデフォルト値）
+try:
+    from config import USE_CACHE, CACHE_FILE, CACHE_TTL_DAYS, CACHE_NEGATIVE_TTL_DAYS
+except ImportError:
+    USE_CACHE = True
+    CACHE_FILE = "link_cache.db"
+    CACHE_TTL_DAYS = 30
+    CACHE_NEGATIVE_TTL_DAYS = 1
+
+# ストリーミングモード設定のインポート（未設定の場合はデフォルト値）
+try:
+    from config import STREAM_CHUNK_SIZE, CHECKPOINT_FILE
+except ImportError:
+    STREAM_CHUNK_SIZE = 500
+    CHECKPOINT_FILE = "link_generation_checkpoint.json"
+
+# 適応的なレート制限の設定のインポート（未設定の場合はデフォルト値）
+try:
+    from config import ADAPTIVE_RATE_LIMIT, ADAPTIVE_RATE_FILE, ADAPTIVE_MAX_RATE_MULTIPLIER
+except ImportError:
+    ADAPTIVE_RATE_LIMIT = True
+    ADAPTIVE_RATE_FILE = "adaptive_rates.json"
+    ADAPTIVE_MAX_RATE_MULTIPLIER = 10.0
+
+try:
+    from config import SCRAPING_PREFER_KU
+except ImportError:
+    SCRAPING_PREFER_KU = False
+
 class KindleUnlimitedLinkGenerator:
     def __init__(self):
         """
@@ -31,12 +61,42 @@ class KindleUnlimitedLinkGenerator:
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         })
         
+        # 短縮のバックエンド（BITLY_TOKENがある場合はBitly、ない場合はTinyURL）
+        self.tinyurl = TinyURLShortener(self.session, timeout=self.search_timeout)
+        self.bitly = BitlyShortener(self.session, BITLY_TOKEN, timeout=self.search_timeout)
+        
+        # リクエスト間隔はスクレイピングのレート制限（適応的な場合は最初のレート）として扱う
+        self.engine = LinkEngine(
+            [ScrapingResolver(self.session, timeout=self.search_timeout,
+                              rate=1.0 / self.request_delay if self.request_delay > 0 else 0,
+                              prefer_ku=SCRAPING_PREFER_KU, debug=self.debug_mode)],
+            self._shorteners(),
+            self.affiliate_tag,
+            title_cache=TitleCache(CACHE_FILE, CACHE_TTL_DAYS, CACHE_NEGATIVE_TTL_DAYS) if USE_CACHE else None,
+            short_url_cache=ShortUrlCache(CACHE_FILE) if USE_CACHE else None,
+            # 学習したレートから始め、応答に合わせて調整する
+            rate_store=AdaptiveRateStore(ADAPTIVE_RATE_FILE, ADAPTIVE_MAX_RATE_MULTIPLIER) if ADAPTIVE_RATE_LIMIT else None,
+            debug=self.debug_mode
+        )
+        # 呼び出しごとに指定する短縮のバックエンドも学習したレートを使う
+        for shortener in (self.tinyurl, self.bitly):
+            self.engine.adapt(shortener)
+        
         if self.debug_mode:
             print(f"設定読み込み完了:")
             print(f"  アソシエイトタグ: {self.affiliate_tag}")
             print(f"  URL短縮機能: {self.use_url_shortener}")
             print(f"  リクエスト間隔: {self.request_delay}秒")
             print(f"  タイムアウト: {self.search_timeout}秒")
+            print(f"  {self.engine.describe_plan()}")
+    
+    def _shorteners(self):
+        """
+        使用する短縮のバックエンド
+        """
+        if not self.use_url_shortener:
+            return [NoShortener()]
+        return [self.bitly] if BITLY_TOKEN else [self.tinyurl]
     
     def search_kindle_unlimited(self, title):
         """
@@ -48,43 +108,10 @@ class KindleUnlimitedLinkGenerator:
         Returns:
             str: 商品URL（見つからない場合はNone）
         """
-        try:
-            # Kindle Unlimitedの検索URL
-            search_url = "https://www.amazon.co.jp/s"
-            params = {
-                'k': title,
-                'i': 'digital-text',  # Kindleストア
-                'ref': 'sr_nr_i_0'
-            }
-            
-            if self.debug_mode:
-                print(f"  検索URL: {search_url}")
-                print(f"  検索パラメータ: {params}")
-            
-            response = self.session.get(search_url, params=params, timeout=self.search_timeout)
-            response.raise_for_status()
-            
-            # 最初の商品リンクを探す
-            product_pattern = r'href="(/dp/[A-Z0-9]{10})'
-            matches = re.findall(product_pattern, response.text)
-            
-            if matches:
-                product_id = matches[0]
-                product_url = f"https://www.amazon.co.jp{product_id}"
-                
-                if self.debug_mode:
-                    print(f"  商品URL発見: {product_url}")
-                
-                return product_url
-            
-            if self.debug_mode:
-                print(f"  商品URLが見つかりませんでした")
-            
-            return None
-            
-        except Exception as e:
-            print(f"検索エラー ({title}): {e}")
-            return None
+        product_info, _ = self.engine.resolve(title)
+        if not product_info and self.debug_mode:
+            print(f"  商品URLが見つかりませんでした")
+        return product_info['url'] if product_info else None
     
     def create_affiliate_link(self, product_url):
         """
@@ -96,14 +123,9 @@ class KindleUnlimitedLinkGenerator:
         Returns:
             str: アソシエイトリンク
         """
-        if not product_url:
-            return None
+        affiliate_url = self.engine.affiliate_link(product_url)
         
-        # アソシエイトパラメータを追加
-        separator = '&' if '?' in product_url else '?'
-        affiliate_url = f"{product_url}{separator}tag={self.affiliate_tag}"
-        
-        if self.debug_mode:
+        if affiliate_url and self.debug_mode:
             print(f"  アソシエイトリンク作成: {affiliate_url}")
         
         return affiliate_url
@@ -120,24 +142,7 @@ class KindleUnlimitedLinkGenerator:
         """
         if not self.use_url_shortener:
             return url
-            
-        try:
-            tinyurl_api = "http://tinyurl.com/api-create.php"
-            params = {'url': url}
-            
-            response = self.session.get(tinyurl_api, params=params, timeout=self.search_timeout)
-            response.raise_for_status()
-            
-            short_url = response.text
-            
-            if self.debug_mode:
-                print(f"  TinyURL短縮: {short_url}")
-            
-            return short_url
-            
-        except Exception as e:
-            print(f"TinyURL短縮エラー: {e}")
-            return url
+        return self.engine.shorten(url, [self.tinyurl])
     
     def shorten_url_bitly(self, url):
         """
@@ -151,34 +156,63 @@ class KindleUnlimitedLinkGenerator:
         """
         if not self.use_url_shortener or not BITLY_TOKEN:
             return url
-            
-        try:
-            bitly_api = "https://api-ssl.bitly.com/v4/shorten"
-            headers = {
-                'Authorization': f'Bearer {BITLY_TOKEN}',
-                'Content-Type': 'application/json'
-            }
-            data = {'long_url': url}
-            
-            response = self.session.post(bitly_api, headers=headers, json=data, timeout=self.search_timeout)
-            response.raise_for_status()
-            
-            result = response.json()
-            short_url = result.get('link', url)
-            
-            if self.debug_mode:
-                print(f"  Bitly短縮: {short_url}")
-            
-            return short_url
-            
-        except Exception as e:
-            print(f"Bitly短縮エラー: {e}")
-            return url
+        return self.engine.shorten(url, [self.bitly])
+    
+    def _link_columns(self, results):
+        """
+        検索結果から追加する列（商品URL・アソシエイトリンク・短縮URL）を作成
+        """
+        return {
+            '商品URL': [result['product_info']['url'] if result['product_info'] else '' for result in results],
+            'アソシエイトリンク': [result['affiliate_url'] or '' for result in results],
+            '短縮URL': [result['short_url'] or '' for result in results]
+        }
     
-    def process_csv(self):
+    def process_csv_stream(self, resume=True):
+        """
+        ストリーミングモードでCSVを処理
+        入力を STREAM_CHUNK_SIZE 行ずつ読み込み、処理した行をすぐに出力CSVに追記します
+        停止した場合は次の実行でチェックポイントから再開します
+        
+        Args:
+            resume (bool): チェックポイントがあれば続きから再開するかどうか
+        """
+        def process_chunk(rows, state):
+            results = self.engine.process_titles(
+                [row['タイトル'] for row in rows],
+                on_result=lambda index, result: print(f"処理中 ({state['done'] + index + 1}行目): {result['title'][:50]}...")
+            )
+            state['done'] += len(rows)
+            state['success'] += sum(1 for result in results if result['product_info'])
+            link_columns = self._link_columns(results)
+            return [dict(row, **{name: values[index] for name, values in link_columns.items()})
+                    for index, row in enumerate(rows)]
+        
+        columns = read_columns(INPUT_FILE) + ['商品URL', 'アソシエイトリンク', '短縮URL']
+        print(f"ストリーミングモード: {STREAM_CHUNK_SIZE}行ずつ処理（チェックポイント: {CHECKPOINT_FILE}）")
+        print("-" * 50)
+        summary = stream_csv(INPUT_FILE, OUTPUT_FILE, columns, process_chunk, CHECKPOINT_FILE,
+                             chunk_size=STREAM_CHUNK_SIZE, initial_state={'done': 0, 'success': 0}, resume=resume)
+        
+        print("-" * 50)
+        print(f"処理完了！結果を '{OUTPUT_FILE}' に保存しました。")
+        print(f"\n=== 処理結果サマリー ===")
+        print(f"総件数: {summary['input_rows']}")
+        if summary['resumed_from']:
+            print(f"再開前に処理済み: {summary['resumed_from']}")
+        success_count = summary['state']['success']
+        print(f"商品URL取得成功: {success_count}")
+        if summary['input_rows']:
+            print(f"成功率: {success_count/summary['input_rows']*100:.1f}%")
+    
+    def process_csv(self, stream=False, resume=True):
         """
         CSVファイルを処理してアソシエイトリンクを追加
         設定ファイルからファイル名を読み込みます
+        
+        Args:
+            stream (bool): ストリーミングモードで処理するかどうか（停止してもチェックポイントから再開できる）
+            resume (bool): ストリーミングモードでチェックポイントから再開するかどうか
         """
         try:
             # 入力ファイルの存在確認
@@ -186,49 +220,37 @@ class KindleUnlimitedLinkGenerator:
                 print(f"エラー: 入力ファイル '{INPUT_FILE}' が見つかりません。")
                 return
             
+            # 既存の出力CSVから短縮URLの対応表を作成
+            if self.engine.short_url_cache:
+                seeded = self.engine.short_url_cache.seed_from_csv(OUTPUT_FILE, self.engine.title_cache, self.affiliate_tag)
+                if seeded:
+                    print(f"既存の短縮URLを {seeded} 件読み込みました")
+            
+            if stream:
+                print(f"URL短縮機能: {'有効' if self.use_url_shortener else '無効'}")
+                print(f"リクエスト間隔: {self.request_delay}秒")
+                self.process_csv_stream(resume=resume)
+                return
+            
             # CSVファイルを読み込み
             df = pd.read_csv(INPUT_FILE)
-            
-            # 新しい列を追加
-            df['商品URL'] = ''
-            df['アソシエイトリンク'] = ''
-            df['短縮URL'] = ''
+            titles = df['タイトル'].astype(str).tolist()
             
             print(f"合計 {len(df)} 件のタイトルを処理します...")
             print(f"URL短縮機能: {'有効' if self.use_url_shortener else '無効'}")
             print(f"リクエスト間隔: {self.request_delay}秒")
             print("-" * 50)
             
-            success_count = 0
+            # 検索・リンク作成・URL短縮（リクエスト間隔はバックエンドのレート制限で守る）
+            results = self.engine.process_titles(
+                titles,
+                on_result=lambda index, result: print(f"処理中 ({index + 1}/{len(df)}): {result['title'][:50]}...")
+            )
             
-            for index, row in df.iterrows():
-                title = row['タイトル']
-                print(f"処理中 ({index + 1}/{len(df)}): {title[:50]}...")
-                
-                # Kindle Unlimitedで検索
-                product_url = self.search_kindle_unlimited(title)
-                df.at[index, '商品URL'] = product_url if product_url else ''
-                
-                # アソシエイトリンクを作成
-                if product_url:
-                    affiliate_url = self.create_affiliate_link(product_url)
-                    df.at[index, 'アソシエイトリンク'] = affiliate_url if affiliate_url else ''
-                    
-                    # URLを短縮
-                    if BITLY_TOKEN:
-                        short_url = self.shorten_url_bitly(affiliate_url)
-                    else:
-                        short_url = self.shorten_url_tinyurl(affiliate_url)
-                    df.at[index, '短縮URL'] = short_url if short_url else ''
-                    
-                    success_count += 1
-                else:
-                    df.at[index, 'アソシエイトリンク'] = ''
-                    df.at[index, '短縮URL'] = ''
-                
-                # レート制限を避けるため待機
-                if index < len(df) - 1:  # 最後のリクエストでは待機しない
-                    time.sleep(self.request_delay)
+            # 新しい列を追加
+            for name, values in self._link_columns(results).items():
+                df[name] = values
+            success_count = sum(1 for result in results if result['product_info'])
             
             # 結果をCSVファイルに保存
             df.to_csv(OUTPUT_FILE, index=False, encoding='utf-8-sig')
@@ -252,6 +274,12 @@ class KindleUnlimitedLinkGenerator:
             print(f"CSV処理エラー: {e}")
 
 def main():
+    parser = argparse.ArgumentParser(description="Kindle Unlimited アソシエイトリンク生成スクリプト")
+    parser.add_argument('--stream', action='store_true',
+                        help="入力をチャンクごとに処理して出力に追記する（停止してもチェックポイントから再開できる）")
+    parser.add_argument('--restart', action='store_true', help="ストリーミングモードでチェックポイントを使わず最初から処理する")
+    args = parser.parse_args()
+    
     print("Kindle Unlimited アソシエイトリンク生成スクリプト")
     print("=" * 50)
     
@@ -268,7 +296,7 @@ def main():
     generator = KindleUnlimitedLinkGenerator()
     
     # CSVファイルを処理
-    generator.process_csv()
+    generator.process_csv(stream=args.stream, resume=not args.restart)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -1,11 +1,19 @@
 import pandas as pd
 import requests
-import time
-import re
-from urllib.parse import quote
-import json
 import os
+import argparse
+from collections import Counter
+from datetime import timedelta
+from requests.adapters import HTTPAdapter
 from amazon_paapi import AmazonApi
+from link_engine import (LinkEngine, PAAPIResolver, ScrapingResolver, TinyURLShortener, BitlyShortener,
+                         NoShortener, summarize_usage)
+from rate_limiter import AdaptiveRateStore
+from async_scraper import AsyncScraper, is_available as async_scraper_available
+from link_cache import TitleCache, ShortUrlCache
+from link_delta import title_hash, diff_catalog, load_generation_state, save_generation_state, record_failures
+from link_stream import stream_csv
+from link_journal import LinkJournal
 
 # 設定ファイルの読み込み
 try:
@@ -15,6 +23,76 @@ except ImportError:
     print("config_example.py を config.py にコピーして、実際の値に変更してください。")
     exit(1)
 
+# 並列処理設定のインポート（未設定の場合はREQUEST_DELAYから算出）
+try:
+    from config import MAX_WORKERS
+except ImportError:
+    MAX_WORKERS = 4
+
+try:
+    from config import PAAPI_RATE_LIMIT, SCRAPING_RATE_LIMIT, TINYURL_RATE_LIMIT, BITLY_RATE_LIMIT
+except ImportError:
+    PAAPI_RATE_LIMIT = SCRAPING_RATE_LIMIT = TINYURL_RATE_LIMIT = BITLY_RATE_LIMIT = (
+        1.0 / REQUEST_DELAY if REQUEST_DELAY > 0 else 0
+    )
+
+# 適応的なレート制限の設定のインポート（未設定の場合はデフォルト値）
+try:
+    from config import ADAPTIVE_RATE_LIMIT, ADAPTIVE_RATE_FILE, ADAPTIVE_MAX_RATE_MULTIPLIER
+except ImportError:
+    ADAPTIVE_RATE_LIMIT = True
+    ADAPTIVE_RATE_FILE = "adaptive_rates.json"
+    ADAPTIVE_MAX_RATE_MULTIPLIER = 10.0
+
+# キャッシュ設定のインポート（未設定の場合はデフォルト値）
+try:
+    from config import USE_CACHE, CACHE_FILE, CACHE_TTL_DAYS, CACHE_NEGATIVE_TTL_DAYS
+except ImportError:
+    USE_CACHE = True
+    CACHE_FILE = "link_cache.db"
+    CACHE_TTL_DAYS = 30
+    CACHE_NEGATIVE_TTL_DAYS = 1
+
+try:
+    from config import BULK_SHORTEN
+except ImportError:
+    BULK_SHORTEN = False
+
+# スクレイピング設定のインポート（未設定の場合はデフォルト値）
+try:
+    from config import USE_ASYNC_SCRAPING, SCRAPING_POOL_SIZE, SCRAPING_HTTP2, AMAZON_BASE_URL
+except ImportError:
+    USE_ASYNC_SCRAPING = True
+    SCRAPING_POOL_SIZE = 8
+    SCRAPING_HTTP2 = True
+    AMAZON_BASE_URL = "https://www.amazon.co.jp"
+
+try:
+    from config import SCRAPING_PREFER_KU
+except ImportError:
+    SCRAPING_PREFER_KU = False
+
+# 差分モード設定のインポート（未設定の場合はデフォルト値）
+try:
+    from config import INCREMENTAL_MODE, STATE_FILE
+except ImportError:
+    INCREMENTAL_MODE = True
+    STATE_FILE = "link_generation_state.json"
+
+# ストリーミングモード設定のインポート（未設定の場合はデフォルト値）
+try:
+    from config import STREAM_CHUNK_SIZE, CHECKPOINT_FILE
+except ImportError:
+    STREAM_CHUNK_SIZE = 500
+    CHECKPOINT_FILE = "link_generation_checkpoint.json"
+
+# ジャーナル設定のインポート（未設定の場合はデフォルト値）
+try:
+    from config import JOURNAL_FILE, RETRY_COOLDOWN_MINUTES
+except ImportError:
+    JOURNAL_FILE = "link_generation_journal.jsonl"
+    RETRY_COOLDOWN_MINUTES = 60
+
 class KindleUnlimitedLinkGeneratorPAAPI:
     def __init__(self):
         """
@@ -27,15 +105,18 @@ class KindleUnlimitedLinkGeneratorPAAPI:
         self.search_timeout = SEARCH_TIMEOUT
         self.debug_mode = DEBUG_MODE
         self.use_paapi = USE_PAAPI
+        self.max_workers = max(1, MAX_WORKERS)
         
         # PA-APIクライアントの初期化
+        self.amazon = None
         if self.use_paapi:
             try:
                 self.amazon = AmazonApi(
                     PAAPI_ACCESS_KEY,
                     PAAPI_SECRET_KEY,
                     PAAPI_PARTNER_TAG,
-                    "JP"  # 日本の場合は"JP"
+                    "JP",  # 日本の場合は"JP"
+                    throttling=0  # 待機はバックエンドのトークンバケットで行う
                 )
                 if self.debug_mode:
                     print("PA-APIクライアント初期化完了")
@@ -49,71 +130,70 @@ class KindleUnlimitedLinkGeneratorPAAPI:
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         })
+        # 並列実行するスレッド数に合わせて接続プールを拡張
+        adapter = HTTPAdapter(pool_connections=self.max_workers, pool_maxsize=self.max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        
+        # 非同期スクレイピング（httpxがない場合は従来の同期処理、レート制限はスクレイピングのバックエンドと共有）
+        self.async_scraper = None
+        if USE_ASYNC_SCRAPING and async_scraper_available():
+            self.async_scraper = AsyncScraper(
+                AMAZON_BASE_URL,
+                pool_size=SCRAPING_POOL_SIZE,
+                timeout=self.search_timeout,
+                http2=SCRAPING_HTTP2
+            )
+        
+        # 検索・短縮のバックエンド（アップストリームごとのレート制限を持つ）
+        self.paapi = PAAPIResolver(self.amazon if self.use_paapi else None, rate=PAAPI_RATE_LIMIT,
+                                   debug=self.debug_mode)
+        self.scraping = ScrapingResolver(self.session, AMAZON_BASE_URL, timeout=self.search_timeout,
+                                         rate=SCRAPING_RATE_LIMIT, async_scraper=self.async_scraper,
+                                         prefer_ku=SCRAPING_PREFER_KU, debug=self.debug_mode)
+        self.tinyurl = TinyURLShortener(self.session, timeout=self.search_timeout, rate=TINYURL_RATE_LIMIT)
+        self.bitly = BitlyShortener(self.session, BITLY_TOKEN, timeout=self.search_timeout, rate=BITLY_RATE_LIMIT)
+        
+        self.engine = LinkEngine(
+            [self.paapi, self.scraping],
+            self._shorteners(),
+            self.affiliate_tag,
+            # タイトル→ASINキャッシュと長いURL→短縮URLの対応表
+            title_cache=TitleCache(CACHE_FILE, CACHE_TTL_DAYS, CACHE_NEGATIVE_TTL_DAYS) if USE_CACHE else None,
+            short_url_cache=ShortUrlCache(CACHE_FILE) if USE_CACHE else None,
+            max_workers=self.max_workers,
+            bulk_shorten=BULK_SHORTEN,
+            # 学習したレートから始め、応答に合わせて調整する
+            rate_store=AdaptiveRateStore(ADAPTIVE_RATE_FILE, ADAPTIVE_MAX_RATE_MULTIPLIER) if ADAPTIVE_RATE_LIMIT else None,
+            debug=self.debug_mode
+        )
+        # 呼び出しごとに指定する短縮のバックエンドも学習したレートを使う
+        for shortener in (self.tinyurl, self.bitly):
+            self.engine.adapt(shortener)
         
         if self.debug_mode:
             print(f"設定読み込み完了:")
             print(f"  アソシエイトタグ: {self.affiliate_tag}")
             print(f"  PA-API使用: {self.use_paapi}")
             print(f"  URL短縮機能: {self.use_url_shortener}")
-            print(f"  リクエスト間隔: {self.request_delay}秒")
+            print(f"  並列スレッド数: {self.max_workers}")
             print(f"  タイムアウト: {self.search_timeout}秒")
+            print(f"  {self.engine.describe_plan()}")
+    
+    def _shorteners(self):
+        """
+        使用する短縮のバックエンド（BITLY_TOKENがある場合はBitly、ない場合はTinyURL）
+        """
+        if not self.use_url_shortener:
+            return [NoShortener()]
+        return [self.bitly] if BITLY_TOKEN else [self.tinyurl]
     
     def search_kindle_unlimited_paapi(self, title):
         """
         Amazon PA-APIを使用してKindle Unlimitedで商品を検索
         """
         try:
-            if self.debug_mode:
-                print(f"  PA-API検索: {title}")
-            # 1回目: 通常検索
-            search_result = self.amazon.search_items(
-                keywords=title,
-                search_index="KindleStore",
-                item_count=1
-            )
-            if search_result and search_result.items:
-                item = search_result.items[0]
-                return {
-                    'asin': item.asin,
-                    'title': getattr(item.item_info.title, 'display_value', title) if hasattr(item, 'item_info') and hasattr(item.item_info, 'title') else title,
-                    'url': f"https://www.amazon.co.jp/dp/{item.asin}",
-                    'price': item.offers.listings[0].price.amount if hasattr(item, 'offers') and item.offers and hasattr(item.offers, 'listings') and item.offers.listings else None
-                }
-            # 2回目: タイトル短縮で再検索
-            short_title = title.split('：')[0].split(':')[0].split('、')[0].split('，')[0][:20]
-            if short_title != title:
-                if self.debug_mode:
-                    print(f"  タイトル短縮再検索: {short_title}")
-                search_result = self.amazon.search_items(
-                    keywords=short_title,
-                    search_index="KindleStore",
-                    item_count=1
-                )
-                if search_result and search_result.items:
-                    item = search_result.items[0]
-                    return {
-                        'asin': item.asin,
-                        'title': getattr(item.item_info.title, 'display_value', short_title) if hasattr(item, 'item_info') and hasattr(item.item_info, 'title') else short_title,
-                        'url': f"https://www.amazon.co.jp/dp/{item.asin}",
-                        'price': item.offers.listings[0].price.amount if hasattr(item, 'offers') and item.offers and hasattr(item.offers, 'listings') and item.offers.listings else None
-                    }
-            # 3回目: search_indexをAllにして再検索
-            if self.debug_mode:
-                print(f"  search_index=Allで再検索: {title}")
-            search_result = self.amazon.search_items(
-                keywords=title,
-                search_index="All",
-                item_count=1
-            )
-            if search_result and search_result.items:
-                item = search_result.items[0]
-                return {
-                    'asin': item.asin,
-                    'title': getattr(item.item_info.title, 'display_value', title) if hasattr(item, 'item_info') and hasattr(item.item_info, 'title') else title,
-                    'url': f"https://www.amazon.co.jp/dp/{item.asin}",
-                    'price': item.offers.listings[0].price.amount if hasattr(item, 'offers') and item.offers and hasattr(item.offers, 'listings') and item.offers.listings else None
-                }
-            return None
+            return self.paapi.lookup(title, Counter())
         except Exception as e:
             print(f"PA-API検索エラー ({title}): {e}")
             return None
@@ -129,48 +209,14 @@ class KindleUnlimitedLinkGeneratorPAAPI:
             dict: 商品情報（見つからない場合はNone）
         """
         try:
-            if self.debug_mode:
-                print(f"  スクレイピング検索: {title}")
-            
-            # Kindle Unlimitedの検索URL
-            search_url = "https://www.amazon.co.jp/s"
-            params = {
-                'k': title,
-                'i': 'digital-text',  # Kindleストア
-                'ref': 'sr_nr_i_0'
-            }
-            
-            response = self.session.get(search_url, params=params, timeout=self.search_timeout)
-            response.raise_for_status()
-            
-            # 最初の商品リンクを探す
-            product_pattern = r'href="(/dp/([A-Z0-9]{10}))'
-            matches = re.findall(product_pattern, response.text)
-            
-            if matches:
-                product_path, asin = matches[0]
-                product_url = f"https://www.amazon.co.jp{product_path}"
-                
-                if self.debug_mode:
-                    print(f"  商品URL発見: {product_url}")
-                    print(f"  ASIN: {asin}")
-                
-                return {
-                    'asin': asin,
-                    'title': title,
-                    'url': product_url,
-                    'price': None
-                }
-            
-            return None
-            
+            return self.scraping.lookup(title, Counter())
         except Exception as e:
             print(f"スクレイピング検索エラー ({title}): {e}")
             return None
     
     def search_kindle_unlimited(self, title):
         """
-        Kindle Unlimitedで商品を検索（PA-API優先、フォールバックでスクレイピング）
+        Kindle Unlimitedで商品を検索（キャッシュ優先、次にPA-API、フォールバックでスクレイピング）
         
         Args:
             title (str): 検索するタイトル
@@ -178,13 +224,7 @@ class KindleUnlimitedLinkGeneratorPAAPI:
         Returns:
             dict: 商品情報（見つからない場合はNone）
         """
-        if self.use_paapi:
-            result = self.search_kindle_unlimited_paapi(title)
-            if result:
-                return result
-        
-        # PA-APIが失敗した場合や無効な場合はスクレイピングを使用
-        return self.search_kindle_unlimited_scraping(title)
+        return self.engine.resolve(title)[0]
     
     def create_affiliate_link(self, product_info):
         """
@@ -196,16 +236,9 @@ class KindleUnlimitedLinkGeneratorPAAPI:
         Returns:
             str: アソシエイトリンク
         """
-        if not product_info or not product_info.get('url'):
-            return None
+        affiliate_url = self.engine.affiliate_link(product_info) if product_info else None
         
-        product_url = product_info['url']
-        
-        # アソシエイトパラメータを追加
-        separator = '&' if '?' in product_url else '?'
-        affiliate_url = f"{product_url}{separator}tag={self.affiliate_tag}"
-        
-        if self.debug_mode:
+        if affiliate_url and self.debug_mode:
             print(f"  アソシエイトリンク作成: {affiliate_url}")
         
         return affiliate_url
@@ -222,24 +255,7 @@ class KindleUnlimitedLinkGeneratorPAAPI:
         """
         if not self.use_url_shortener:
             return url
-            
-        try:
-            tinyurl_api = "http://tinyurl.com/api-create.php"
-            params = {'url': url}
-            
-            response = self.session.get(tinyurl_api, params=params, timeout=self.search_timeout)
-            response.raise_for_status()
-            
-            short_url = response.text
-            
-            if self.debug_mode:
-                print(f"  TinyURL短縮: {short_url}")
-            
-            return short_url
-            
-        except Exception as e:
-            print(f"TinyURL短縮エラー: {e}")
-            return url
+        return self.engine.shorten(url, [self.tinyurl])
     
     def shorten_url_bitly(self, url):
         """
@@ -253,88 +269,353 @@ class KindleUnlimitedLinkGeneratorPAAPI:
         """
         if not self.use_url_shortener or not BITLY_TOKEN:
             return url
+        return self.engine.shorten(url, [self.bitly])
+    
+    def shorten_url(self, url):
+        """
+        設定に応じてBitlyまたはTinyURLでURLを短縮
+        
+        Args:
+            url (str): 短縮するURL
             
-        try:
-            bitly_api = "https://api-ssl.bitly.com/v4/shorten"
-            headers = {
-                'Authorization': f'Bearer {BITLY_TOKEN}',
-                'Content-Type': 'application/json'
-            }
-            data = {'long_url': url}
+        Returns:
+            str: 短縮URL（エラーの場合は元のURL）
+        """
+        return self.engine.shorten(url)
+    
+    def shorten_urls_bulk(self, urls):
+        """
+        複数のURLをまとめて短縮
+        対応表にないURLだけを重複を除いて1回のバッチで短縮します
+        
+        Args:
+            urls (list): 短縮するURLのリスト
             
-            response = self.session.post(bitly_api, headers=headers, json=data, timeout=self.search_timeout)
-            response.raise_for_status()
+        Returns:
+            dict: 長いURL -> 短縮URL
+        """
+        return self.engine.shorten_many(urls)
+    
+    def resolve_titles(self, titles, on_done=None):
+        """
+        タイトル一覧を並列パイプラインで処理（検索・アソシエイトリンク作成・URL短縮はエンジンで実行）
+        
+        Args:
+            titles (list): 検索するタイトルのリスト
+            on_done: 1タイトルの処理が終わるたびに呼び出す関数 (インデックス, 結果の辞書)
             
-            result = response.json()
-            short_url = result.get('link', url)
+        Returns:
+            list: 入力順に並んだ短縮URL（失敗した行はNone）
+        """
+        total = len(titles)
+        done_count = 0
+        
+        def on_result(index, result):
+            nonlocal done_count
+            done_count += 1
+            usage = result['usage']
+            print(f"検索完了 ({done_count}/{total}): {titles[index][:50]}... "
+                  f"(PA-API {usage['paapi']}回, スクレイピング {usage['scraping']}回)")
+        
+        results = self.engine.process_titles(titles, on_result=on_result, on_done=on_done)
+        
+        # 1行あたりのAPI呼び出し回数
+        usage = summarize_usage(results)
+        if total:
+            print(f"API呼び出し: PA-API {usage['paapi']}回, スクレイピング {usage['scraping']}回 "
+                  f"(1行あたり {(usage['paapi'] + usage['scraping']) / total:.2f}回)")
+        
+        return [result['short_url'] for result in results]
+    
+    def process_csv_incremental(self, df):
+        """
+        差分モードでCSVを処理
+        既存の出力CSVとタイトルのハッシュで比較し、追加された行と前回失敗した行だけを検索します
+        公開済みの行のNoは変更せず、新しい行には未使用のNoを割り当てます
+        
+        Args:
+            df (DataFrame): 入力CSVのデータ
+        """
+        input_rows = df[['タイトル', '一言紹介文']].to_dict('records')
+        output_rows = []
+        if os.path.exists(OUTPUT_FILE):
+            output_rows = pd.read_csv(OUTPUT_FILE, keep_default_na=False).to_dict('records')
+        
+        delta = diff_catalog(input_rows, output_rows)
+        state = load_generation_state(STATE_FILE)
+        
+        # 削除された行のNoも再利用しない（投稿履歴がNoをキーにしているため）
+        max_no = max((int(row['No']) for row in output_rows), default=0)
+        next_no = max(state['next_no'], max_no + 1)
+        
+        retry_count = sum(1 for row in delta['added'] if title_hash(row['タイトル']) in state['failed'])
+        print(f"差分モード: 変更なし {len(delta['unchanged'])}件, 紹介文の変更 {len(delta['changed'])}件, "
+              f"追加 {len(delta['added']) - retry_count}件, 失敗行の再試行 {retry_count}件, 削除 {len(delta['removed'])}件")
+        if delta['duplicates']:
+            print(f"重複したタイトル {len(delta['duplicates'])}件は1件として処理します")
+        print("-" * 50)
+        
+        titles = [row['タイトル'] for row in delta['added']]
+        # 1タイトルごとにジャーナルに記録し、前回の実行が途中で止まった場合は成功した行を再検索しない
+        journal = LinkJournal(JOURNAL_FILE)
+        journal.load()
+        missing, retry, _ = journal.pending(titles, retry_failed=True)
+        if len(missing) < len(titles):
+            print(f"ジャーナル: 前回の実行で成功済み {len(titles) - len(missing) - len(retry)}件, 再試行 {len(retry)}件")
+        short_urls = self._resolve_journaled(journal, titles, sorted(missing + retry))
+        
+        new_rows = []
+        failed_titles = []
+        for row, short_url in zip(delta['added'], short_urls):
+            if short_url:
+                new_rows.append({
+                    'No': next_no,
+                    'タイトル': row['タイトル'],
+                    '一言紹介文': row['一言紹介文'],
+                    '短縮URL': short_url
+                })
+                next_no += 1
+                state['failed'].pop(title_hash(row['タイトル']), None)
+            else:
+                failed_titles.append(row['タイトル'])
+        
+        # 入力から削除されたタイトルは失敗記録からも外す
+        input_keys = {title_hash(row['タイトル']) for row in input_rows}
+        state['failed'] = {key: entry for key, entry in state['failed'].items() if key in input_keys}
+        record_failures(state, failed_titles)
+        state['next_no'] = next_no
+        
+        result_rows = sorted(delta['unchanged'] + delta['changed'] + new_rows, key=lambda row: int(row['No']))
+        result_df = pd.DataFrame(result_rows, columns=['No', 'タイトル', '一言紹介文', '短縮URL'])
+        result_df.to_csv(OUTPUT_FILE, index=False, encoding='utf-8-sig')
+        save_generation_state(STATE_FILE, state)
+        # 結果は出力CSVと状態ファイルに保存したので、ジャーナルは空にする
+        journal.reset()
+        
+        print("-" * 50)
+        print(f"処理完了！結果を '{OUTPUT_FILE}' に保存しました。")
+        
+        # 統計情報を表示
+        print(f"\n=== 処理結果サマリー ===")
+        print(f"総件数: {len(df)}")
+        print(f"検索件数: {len(titles)}")
+        print(f"新規に追加: {len(new_rows)}")
+        print(f"出力件数: {len(result_rows)}")
+        if failed_titles:
+            print(f"\n失敗したタイトル数: {len(failed_titles)}件（次回の実行で再試行します）")
+    
+    def process_csv_stream(self, resume=True):
+        """
+        ストリーミングモードでCSVを処理
+        入力を STREAM_CHUNK_SIZE 行ずつ読み込み、成功した行をすぐに出力CSVに追記します
+        停止した場合は次の実行でチェックポイントから再開します（Noは成功行の連番）
+        
+        Args:
+            resume (bool): チェックポイントがあれば続きから再開するかどうか
+        """
+        def process_chunk(rows, state):
+            short_urls = self.resolve_titles([row['タイトル'] for row in rows])
+            output_rows = []
+            for row, short_url in zip(rows, short_urls):
+                if short_url:
+                    output_rows.append({
+                        'No': state['next_no'],
+                        'タイトル': row['タイトル'],
+                        '一言紹介文': row['一言紹介文'],
+                        '短縮URL': short_url
+                    })
+                    state['next_no'] += 1
+            return output_rows
+        
+        print(f"ストリーミングモード: {STREAM_CHUNK_SIZE}行ずつ処理（チェックポイント: {CHECKPOINT_FILE}）")
+        print("-" * 50)
+        summary = stream_csv(INPUT_FILE, OUTPUT_FILE, ['No', 'タイトル', '一言紹介文', '短縮URL'], process_chunk,
+                             CHECKPOINT_FILE, chunk_size=STREAM_CHUNK_SIZE, initial_state={'next_no': 1},
+                             resume=resume)
+        
+        print("-" * 50)
+        print(f"処理完了！結果を '{OUTPUT_FILE}' に保存しました。")
+        
+        # 統計情報を表示
+        print(f"\n=== 処理結果サマリー ===")
+        print(f"総件数: {summary['input_rows']}")
+        if summary['resumed_from']:
+            print(f"再開前に処理済み: {summary['resumed_from']}")
+        print(f"出力件数: {summary['output_rows']}")
+        failed_count = summary['input_rows'] - summary['output_rows']
+        if failed_count > 0:
+            print(f"\n失敗したタイトル数: {failed_count}件")
+    
+    def resolve_titles_journaled(self, titles, resume=False, retry_failed=False):
+        """
+        ジャーナルに記録しながらタイトル一覧を処理
+        1タイトルの処理が終わるたびに結果を追記するので、途中で止まっても処理済みの行は失われません
+        
+        Args:
+            titles (list): 検索するタイトルのリスト
+            resume (bool): ジャーナルを読み直して、記録のないタイトルだけを処理するかどうか
+            retry_failed (bool): 失敗したタイトルを RETRY_COOLDOWN_MINUTES 経過後に再試行するかどうか
             
-            if self.debug_mode:
-                print(f"  Bitly短縮: {short_url}")
+        Returns:
+            list: 入力順に並んだ短縮URL（失敗した行はNone）
+        """
+        journal = LinkJournal(JOURNAL_FILE)
+        if resume or retry_failed:
+            journal.load()
+        else:
+            journal.reset()
+        
+        missing, retry, cooling = journal.pending(titles, retry_failed, timedelta(minutes=RETRY_COOLDOWN_MINUTES))
+        # --retry-failed のみの場合は失敗したタイトルだけを再試行する
+        targets = sorted((missing if resume or not retry_failed else []) + retry)
+        if resume or retry_failed:
+            print(f"ジャーナル: 記録済み {len(titles) - len(missing)}件, 未処理 {len(missing)}件, "
+                  f"再試行 {len(retry)}件, 待機中の失敗 {cooling}件")
+        return self._resolve_journaled(journal, titles, targets)
+    
+    def _resolve_journaled(self, journal, titles, targets):
+        """
+        指定したインデックスのタイトルを処理してジャーナルに記録し、すべてのタイトルの短縮URLをジャーナルから返す
+        
+        Args:
+            journal (LinkJournal): 読み込み済みのジャーナル
+            titles (list): タイトルのリスト
+            targets (list): 処理するタイトルのインデックス
             
-            return short_url
+        Returns:
+            list: 入力順に並んだ短縮URL（失敗した行はNone）
+        """
+        if targets:
+            target_titles = [titles[index] for index in targets]
+            self.resolve_titles(target_titles,
+                                on_done=lambda index, result: journal.record(target_titles[index], result))
+        
+        short_urls = []
+        for title in titles:
+            entry = journal.get(title)
+            short_urls.append(entry['short_url'] if entry and entry['status'] == 'ok' else None)
+        return short_urls
+    
+    def merge_journaled_output(self, input_rows, short_urls):
+        """
+        ジャーナルから再開・再試行した結果を既存の出力CSVの行に反映
+        出力にあるタイトルはNoを変更せずに紹介文と短縮URLを更新し、出力にないタイトルには未使用のNoを割り当てます
+        成功しなかった行・処理しなかった行は既存の出力の行をそのまま残します
+        
+        Args:
+            input_rows (list): 入力CSVの行（'タイトル', '一言紹介文'）
+            short_urls (list): 入力順に並んだ短縮URL（失敗した行はNone）
             
-        except Exception as e:
-            print(f"Bitly短縮エラー: {e}")
-            return url
+        Returns:
+            list: No順に並んだ出力する行
+        """
+        output_rows = []
+        if os.path.exists(OUTPUT_FILE):
+            output_rows = pd.read_csv(OUTPUT_FILE, keep_default_na=False).to_dict('records')
+        existing = {}
+        for row in output_rows:
+            existing.setdefault(title_hash(row['タイトル']), row)
+        
+        # 差分モードと同じく、削除された行のNoも再利用しない
+        state = load_generation_state(STATE_FILE)
+        max_no = max((int(row['No']) for row in output_rows), default=0)
+        next_no = max(state['next_no'], max_no + 1)
+        
+        for row, short_url in zip(input_rows, short_urls):
+            if not short_url:
+                continue
+            key = title_hash(row['タイトル'])
+            if key in existing:
+                existing[key]['一言紹介文'] = row['一言紹介文']
+                existing[key]['短縮URL'] = short_url
+            else:
+                existing[key] = {
+                    'No': next_no,
+                    'タイトル': row['タイトル'],
+                    '一言紹介文': row['一言紹介文'],
+                    '短縮URL': short_url
+                }
+                output_rows.append(existing[key])
+                next_no += 1
+            state['failed'].pop(key, None)
+        
+        state['next_no'] = next_no
+        save_generation_state(STATE_FILE, state)
+        return sorted(output_rows, key=lambda row: int(row['No']))
     
-    def process_csv(self):
+    def process_csv(self, incremental=None, stream=False, resume=True, journal_resume=False, retry_failed=False):
         """
         CSVファイルを処理してアソシエイトリンクを追加
         設定ファイルからファイル名を読み込みます
+        
+        Args:
+            incremental (bool): 差分モードで処理するかどうか（省略時は設定ファイルの INCREMENTAL_MODE）
+            stream (bool): ストリーミングモードで処理するかどうか（すべての行を処理し、停止しても再開できる）
+            resume (bool): ストリーミングモードでチェックポイントから再開するかどうか
+            journal_resume (bool): ジャーナルから再開し、記録のない行だけを処理するかどうか（差分モードは使わず、結果は既存の出力CSVに反映）
+            retry_failed (bool): ジャーナルで失敗した行だけを再試行するかどうか（差分モードは使わず、結果は既存の出力CSVに反映）
         """
+        if journal_resume or retry_failed:
+            incremental = False
+        elif incremental is None:
+            incremental = INCREMENTAL_MODE
+        
         try:
             # 入力ファイルの存在確認
             if not os.path.exists(INPUT_FILE):
                 print(f"エラー: 入力ファイル '{INPUT_FILE}' が見つかりません。")
                 return
             
+            # 既存の出力CSVから短縮URLの対応表を作成
+            if self.engine.short_url_cache:
+                seeded = self.engine.short_url_cache.seed_from_csv(OUTPUT_FILE, self.engine.title_cache, self.affiliate_tag)
+                if seeded:
+                    print(f"既存の短縮URLを {seeded} 件読み込みました")
+            
+            if stream:
+                print(f"PA-API使用: {'有効' if self.use_paapi else '無効'}")
+                print(f"URL短縮機能: {'有効' if self.use_url_shortener else '無効'}")
+                print(f"並列スレッド数: {self.max_workers}")
+                self.process_csv_stream(resume=resume)
+                return
+            
             # CSVファイルを読み込み
             df = pd.read_csv(INPUT_FILE)
             
             print(f"合計 {len(df)} 件のタイトルを処理します...")
             print(f"PA-API使用: {'有効' if self.use_paapi else '無効'}")
             print(f"URL短縮機能: {'有効' if self.use_url_shortener else '無効'}")
-            print(f"リクエスト間隔: {self.request_delay}秒")
-            print("-" * 50)
+            print(f"並列スレッド数: {self.max_workers}")
             
-            success_count = 0
-            successful_data = []  # 成功したデータのみを格納
+            if incremental:
+                self.process_csv_incremental(df)
+                return
+            
+            print("-" * 50)
             
-            for index, row in df.iterrows():
-                title = row['タイトル']
-                introduction = row['一言紹介文']
-                print(f"処理中 ({index + 1}/{len(df)}): {title[:50]}...")
-                
-                # Kindle Unlimitedで検索
-                product_info = self.search_kindle_unlimited(title)
-                
-                if product_info:
-                    # アソシエイトリンクを作成
-                    affiliate_url = self.create_affiliate_link(product_info)
-                    
-                    if affiliate_url:
-                        # URLを短縮
-                        if BITLY_TOKEN:
-                            short_url = self.shorten_url_bitly(affiliate_url)
-                        else:
-                            short_url = self.shorten_url_tinyurl(affiliate_url)
-                        
-                        # 成功したデータのみをリストに追加
+            titles = df['タイトル'].tolist()
+            introductions = df['一言紹介文'].tolist()
+            short_urls = self.resolve_titles_journaled(titles, resume=journal_resume, retry_failed=retry_failed)
+            
+            if journal_resume or retry_failed:
+                # 再開・再試行した結果は既存の出力CSVに反映する（既存の行のNoは変更しない）
+                successful_data = self.merge_journaled_output(df[['タイトル', '一言紹介文']].to_dict('records'),
+                                                              short_urls)
+            else:
+                # 入力順を保ったまま成功したデータのみを格納（Noは成功行の連番）
+                successful_data = []
+                for title, introduction, short_url in zip(titles, introductions, short_urls):
+                    if short_url:
                         successful_data.append({
                             'No': len(successful_data) + 1,
                             'タイトル': title,
                             '一言紹介文': introduction,
                             '短縮URL': short_url
                         })
-                        
-                        success_count += 1
-                
-                # レート制限を避けるため待機
-                if index < len(df) - 1:  # 最後のリクエストでは待機しない
-                    time.sleep(self.request_delay)
+            success_count = sum(1 for short_url in short_urls if short_url)
             
             # 成功したデータのみでDataFrameを作成
-            result_df = pd.DataFrame(successful_data)
+            result_df = pd.DataFrame(successful_data, columns=['No', 'タイトル', '一言紹介文', '短縮URL'])
             
             # 結果をCSVファイルに保存
             result_df.to_csv(OUTPUT_FILE, index=False, encoding='utf-8-sig')
@@ -357,6 +638,18 @@ class KindleUnlimitedLinkGeneratorPAAPI:
             print(f"CSV処理エラー: {e}")
 
 def main():
+    parser = argparse.ArgumentParser(description="Kindle Unlimited アソシエイトリンク生成スクリプト（PA-API対応）")
+    parser.add_argument('--full', action='store_true', help="差分モードを使わず、すべての行を処理して出力を作り直す")
+    parser.add_argument('--stream', action='store_true',
+                        help="入力をチャンクごとに処理して出力に追記する（停止してもチェックポイントから再開できる）")
+    parser.add_argument('--restart', action='store_true', help="ストリーミングモードでチェックポイントを使わず最初から処理する")
+    parser.add_argument('--resume', action='store_true',
+                        help="--full の実行をジャーナルから再開し、記録のない行だけを処理する"
+                             "（差分モードは指定しなくても前回の実行で成功した行を再検索しない）")
+    parser.add_argument('--retry-failed', action='store_true',
+                        help="--full の実行でジャーナルの失敗した行だけを再試行する（RETRY_COOLDOWN_MINUTES 経過したもののみ）")
+    args = parser.parse_args()
+    
     print("Kindle Unlimited アソシエイトリンク生成スクリプト（PA-API対応）")
     print("=" * 60)
     
@@ -382,7 +675,8 @@ def main():
     generator = KindleUnlimitedLinkGeneratorPAAPI()
     
     # CSVファイルを処理
-    generator.process_csv()
+    generator.process_csv(incremental=False if args.full else None, stream=args.stream, resume=not args.restart,
+                          journal_resume=args.resume, retry_failed=args.retry_failed)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,327 @@
+"""
+リンク生成用の永続キャッシュ
+タイトル→ASINの検索結果と長いURL→短縮URLの対応をSQLiteに保存し、
+再実行時のアップストリーム呼び出しを省略します
+"""
+
+import csv
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+
+DEFAULT_CACHE_FILE = "link_cache.db"
+
+
+def normalize_title(title):
+    """
+    キャッシュキー用にタイトルを正規化
+    全角・半角の揺れ、大文字・小文字、連続する空白を吸収します
+
+    Args:
+        title (str): タイトル
+
+    Returns:
+        str: 正規化したタイトル
+    """
+    normalized = unicodedata.normalize('NFKC', str(title))
+    normalized = re.sub(r'\s+', ' ', normalized).strip()
+    return normalized.lower()
+
+
+class TitleCache:
+    def __init__(self, db_file=DEFAULT_CACHE_FILE, ttl_days=30, negative_ttl_days=1):
+        """
+        タイトル→ASINキャッシュの初期化
+
+        Args:
+            db_file (str): SQLiteファイル
+            ttl_days (float): 見つかった結果の有効期間（日）
+            negative_ttl_days (float): 見つからなかった結果の有効期間（日）
+        """
+        self.db_file = db_file
+        self.ttl = ttl_days * 86400
+        self.negative_ttl = negative_ttl_days * 86400
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_file, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS title_cache (
+                title_key TEXT PRIMARY KEY,
+                title TEXT NOT NULL,
+                asin TEXT,
+                matched_title TEXT,
+                price REAL,
+                strategy TEXT,
+                cached_at REAL NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        """)
+        self.conn.commit()
+
+    def lookup(self, title):
+        """
+        キャッシュを検索
+
+        Args:
+            title (str): 検索するタイトル
+
+        Returns:
+            tuple: (キャッシュにあるか, 商品情報)
+                   見つからなかった結果がキャッシュされている場合は (True, None)
+        """
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT asin, matched_title, price, strategy, expires_at FROM title_cache WHERE title_key = ?",
+                (normalize_title(title),)
+            ).fetchone()
+
+        if not row:
+            return False, None
+
+        asin, matched_title, price, strategy, expires_at = row
+        if expires_at < time.time():
+            return False, None
+
+        if asin is None:
+            return True, None
+
+        return True, {
+            'asin': asin,
+            'title': matched_title or title,
+            'url': f"https://www.amazon.co.jp/dp/{asin}",
+            'price': price,
+            'strategy': strategy
+        }
+
+    def lookup_stale(self, title):
+        """
+        有効期限に関係なく、見つかった検索結果を取得
+        ASINが分かっているタイトルを検索せずに再取得するために使用します
+
+        Args:
+            title (str): 検索するタイトル
+
+        Returns:
+            dict: 商品情報（見つかった結果がない場合はNone）
+        """
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT asin, matched_title, price, strategy FROM title_cache WHERE title_key = ? AND asin IS NOT NULL",
+                (normalize_title(title),)
+            ).fetchone()
+
+        if not row:
+            return None
+
+        asin, matched_title, price, strategy = row
+        return {
+            'asin': asin,
+            'title': matched_title or title,
+            'url': f"https://www.amazon.co.jp/dp/{asin}",
+            'price': price,
+            'strategy': strategy
+        }
+
+    def store(self, title, product_info, strategy=None):
+        """
+        検索結果を保存
+
+        Args:
+            title (str): 検索したタイトル
+            product_info (dict): 商品情報（asin, title, price）
+            strategy (str): ヒットした検索方法（省略時は product_info['strategy']）
+        """
+        now = time.time()
+        strategy = strategy or product_info.get('strategy')
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO title_cache VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (normalize_title(title), title, product_info['asin'], product_info.get('title'),
+                 product_info.get('price'), strategy, now, now + self.ttl)
+            )
+            self.conn.commit()
+
+    def store_negative(self, title):
+        """
+        見つからなかった結果を保存（negative_ttl_days の間は再検索しない）
+
+        Args:
+            title (str): 検索したタイトル
+        """
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO title_cache VALUES (?, ?, NULL, NULL, NULL, NULL, ?, ?)",
+                (normalize_title(title), title, now, now + self.negative_ttl)
+            )
+            self.conn.commit()
+
+    def close(self):
+        """
+        データベース接続を閉じる
+        """
+        with self.lock:
+            self.conn.close()
+
+
+class ShortUrlCache:
+    def __init__(self, db_file=DEFAULT_CACHE_FILE):
+        """
+        長いURL→短縮URLの対応表の初期化
+        TinyURL・Bitlyの呼び出しはアソシエイトURLごとに1回だけになります
+
+        Args:
+            db_file (str): SQLiteファイル（TitleCacheと同じファイルを使用可能）
+        """
+        self.db_file = db_file
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_file, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS short_urls (
+                long_url TEXT PRIMARY KEY,
+                short_url TEXT NOT NULL,
+                service TEXT,
+                created_at REAL NOT NULL
+            )
+        """)
+        self.conn.commit()
+        # 長いURLがまだ分からない既存の短縮URL（正規化したタイトル -> 短縮URL、タイトルの検索後に登録する）
+        self.title_seeds = {}
+
+    def get(self, long_url):
+        """
+        短縮URLを取得
+
+        Args:
+            long_url (str): 長いURL
+
+        Returns:
+            str: 短縮URL（未登録の場合はNone）
+        """
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT short_url FROM short_urls WHERE long_url = ?", (long_url,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def get_many(self, long_urls):
+        """
+        複数の短縮URLをまとめて取得
+
+        Args:
+            long_urls (list): 長いURLのリスト
+
+        Returns:
+            dict: 長いURL -> 短縮URL（登録済みのもののみ）
+        """
+        found = {}
+        unique_urls = list(dict.fromkeys(long_urls))
+        with self.lock:
+            # SQLiteのパラメータ数上限を避けるため分割して検索
+            for start in range(0, len(unique_urls), 500):
+                chunk = unique_urls[start:start + 500]
+                placeholders = ','.join('?' * len(chunk))
+                rows = self.conn.execute(
+                    f"SELECT long_url, short_url FROM short_urls WHERE long_url IN ({placeholders})", chunk
+                ).fetchall()
+                found.update(rows)
+        return found
+
+    def store(self, long_url, short_url, service=None):
+        """
+        短縮結果を保存（短縮に失敗して元のURLが返された場合は保存しない）
+
+        Args:
+            long_url (str): 長いURL
+            short_url (str): 短縮URL
+            service (str): 短縮サービス名
+        """
+        self.store_many([(long_url, short_url)], service)
+
+    def store_many(self, pairs, service=None, replace=True):
+        """
+        短縮結果をまとめて保存（1トランザクション）
+
+        Args:
+            pairs (list): (長いURL, 短縮URL) のリスト
+            service (str): 短縮サービス名
+            replace (bool): 登録済みの長いURLを上書きするかどうか
+
+        Returns:
+            int: 保存した件数
+        """
+        now = time.time()
+        rows = [(long_url, short_url, service, now) for long_url, short_url in pairs
+                if short_url and short_url != long_url]
+        verb = "INSERT OR REPLACE" if replace else "INSERT OR IGNORE"
+        with self.lock:
+            before = self.conn.total_changes
+            self.conn.executemany(f"{verb} INTO short_urls VALUES (?, ?, ?, ?)", rows)
+            self.conn.commit()
+            return self.conn.total_changes - before
+
+    def seed_from_csv(self, csv_file, title_cache=None, affiliate_tag=None):
+        """
+        既存の出力CSVの「短縮URL」列から対応表を作成
+        「アソシエイトリンク」列があればそれを使い、なければタイトルキャッシュのASINから
+        アソシエイトリンクを組み立てます
+        どちらもない行（タイトルキャッシュが空の初回など）はタイトルと短縮URLを覚えておき、
+        タイトルを検索した後に seed_title() で登録します
+
+        Args:
+            csv_file (str): 既存の出力CSVファイル
+            title_cache (TitleCache): タイトル→ASINキャッシュ
+            affiliate_tag (str): アソシエイトタグ
+
+        Returns:
+            int: 読み込んだ件数（新たに登録した件数 + 検索後に登録するタイトルの件数）
+        """
+        if not os.path.exists(csv_file):
+            return 0
+
+        pairs = []
+        with open(csv_file, 'r', encoding='utf-8-sig', newline='') as f:
+            for row in csv.DictReader(f):
+                short_url = row.get('短縮URL')
+                if not short_url:
+                    continue
+                long_url = row.get('アソシエイトリンク')
+                if not long_url and title_cache and affiliate_tag:
+                    cached, product_info = title_cache.lookup(row.get('タイトル', ''))
+                    if cached and product_info:
+                        long_url = f"{product_info['url']}?tag={affiliate_tag}"
+                if long_url:
+                    pairs.append((long_url, short_url))
+                elif row.get('タイトル'):
+                    self.title_seeds.setdefault(normalize_title(row['タイトル']), short_url)
+
+        return self.store_many(pairs, service='seed', replace=False) + len(self.title_seeds)
+
+    def seed_title(self, title, long_url):
+        """
+        seed_from_csv() で覚えておいたタイトルの短縮URLを、検索して分かった長いURLで登録
+
+        Args:
+            title (str): タイトル
+            long_url (str): タイトルのアソシエイトリンク
+
+        Returns:
+            bool: 登録した場合True
+        """
+        if not self.title_seeds:
+            return False
+        short_url = self.title_seeds.pop(normalize_title(title), None)
+        if not short_url:
+            return False
+        return self.store_many([(long_url, short_url)], service='seed', replace=False) > 0
+
+    def close(self):
+        """
+        データベース接続を閉じる
+        """
+        with self.lock:
+            self.conn.close()
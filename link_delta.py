@@ -0,0 +1,104 @@
+"""
+リンク生成の差分処理ユーティリティ
+入力CSVと既存の出力CSVをタイトルのハッシュで比較し、
+追加・変更・削除・失敗した行を判定します
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime
+
+from link_cache import normalize_title
+
+
+def title_hash(title):
+    """
+    正規化したタイトルのハッシュを作成
+
+    Args:
+        title (str): タイトル
+
+    Returns:
+        str: ハッシュ値（16桁の16進数）
+    """
+    return hashlib.sha1(normalize_title(title).encode('utf-8')).hexdigest()[:16]
+
+
+def load_generation_state(state_file):
+    """
+    差分処理の状態ファイルを読み込み
+
+    Returns:
+        dict: {'next_no': 次に割り当てるNo, 'failed': タイトルハッシュ -> 失敗情報}
+    """
+    state = {'next_no': 1, 'failed': {}}
+    if os.path.exists(state_file):
+        try:
+            with open(state_file, 'r', encoding='utf-8') as f:
+                state.update(json.load(f))
+        except Exception as e:
+            print(f"状態ファイル読み込みエラー: {e}")
+    return state
+
+
+def save_generation_state(state_file, state):
+    """
+    差分処理の状態ファイルを保存（一時ファイルに書いてから置き換え）
+    """
+    tmp_file = f"{state_file}.tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_file, state_file)
+
+
+def diff_catalog(input_rows, output_rows):
+    """
+    入力CSVと既存の出力CSVを比較
+
+    Args:
+        input_rows (list): 入力行（'タイトル', '一言紹介文' を持つ辞書）のリスト
+        output_rows (list): 既存の出力行（'No', 'タイトル', '一言紹介文', '短縮URL' を持つ辞書）のリスト
+
+    Returns:
+        dict: 判定結果
+            'unchanged': 変更のない出力行
+            'changed': 紹介文のみ変更された出力行（紹介文は入力の値に更新済み）
+            'added': 出力にない入力行（新規または前回失敗した行）
+            'removed': 入力から削除された出力行
+            'duplicates': 入力内で重複したタイトル
+    """
+    published = {title_hash(row['タイトル']): row for row in output_rows}
+    result = {'unchanged': [], 'changed': [], 'added': [], 'removed': [], 'duplicates': []}
+    seen = set()
+
+    for row in input_rows:
+        key = title_hash(row['タイトル'])
+        if key in seen:
+            result['duplicates'].append(row)
+            continue
+        seen.add(key)
+
+        existing = published.get(key)
+        if existing is None:
+            result['added'].append(row)
+        elif existing['一言紹介文'] != row['一言紹介文']:
+            result['changed'].append(dict(existing, 一言紹介文=row['一言紹介文']))
+        else:
+            result['unchanged'].append(existing)
+
+    result['removed'] = [row for key, row in published.items() if key not in seen]
+    return result
+
+
+def record_failures(state, failed_titles):
+    """
+    失敗したタイトルを状態に記録（試行回数を加算）
+    """
+    now = datetime.now().isoformat(timespec='seconds')
+    for title in failed_titles:
+        key = title_hash(title)
+        entry = state['failed'].get(key, {'title': title, 'attempts': 0})
+        entry['attempts'] += 1
+        entry['last_attempt'] = now
+        state['failed'][key] = entry
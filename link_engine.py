@@ -0,0 +1,809 @@
+"""
+リンク生成エンジン
+タイトルの検索（商品のASIN）→ アソシエイトリンクの作成 → URL短縮を1か所にまとめ、
+4つのリンク生成スクリプトから共通で使います
+
+- 検索のバックエンド: キャッシュ（TitleCacheResolver）、PA-API（PAAPIResolver）、スクレイピング（ScrapingResolver）
+- 短縮のバックエンド: TinyURL（TinyURLShortener）、Bitly（BitlyShortener）、短縮なし（NoShortener）
+
+各バックエンドは1回の呼び出しのコスト（cost）と1秒あたりの上限（rate）を持ち、
+plan_backends() がコストの低い順に並べます（キャッシュ → PA-API → スクレイピング）
+キャッシュ・並列実行・まとめて実行（GetItems・非同期スクレイピング・一括短縮）はエンジンで行うので、
+どのスクリプトから実行しても同じように効きます
+
+使い方:
+    engine = LinkEngine([PAAPIResolver(amazon), ScrapingResolver(session)], [TinyURLShortener(session)],
+                        affiliate_tag, title_cache=TitleCache(), short_url_cache=ShortUrlCache(), max_workers=4)
+    for result in engine.process_titles(titles):
+        print(result['title'], result['short_url'])
+"""
+
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from asin_extractor import ResultScanner
+from rate_limiter import TokenBucket
+
+try:
+    from amazon_paapi.errors import ItemsNotFound, TooManyRequests
+except ImportError:
+    # PA-APIを使わない場合（python-amazon-paapi がない環境）
+    class ItemsNotFound(Exception):
+        pass
+
+    class TooManyRequests(Exception):
+        pass
+
+AMAZON_BASE_URL = "https://www.amazon.co.jp"
+
+# 検索結果ページの読み込みの単位（最初の商品が見つかった時点で打ち切る）
+SCRAPING_CHUNK_SIZE = 16 * 1024
+
+# PA-APIのGetItemsは1回あたり最大10件のASINを指定できる
+GET_ITEMS_BATCH_SIZE = 10
+
+# アップストリームの制限を示すHTTPステータス
+THROTTLE_STATUSES = (429, 503)
+
+# 見つからないことが分かっている（キャッシュ済み）場合の検索結果（以降のバックエンドは呼び出さない）
+NOT_FOUND = object()
+
+
+def product_url(asin):
+    return f"{AMAZON_BASE_URL}/dp/{asin}"
+
+
+def is_throttled(error):
+    """
+    アップストリームの制限（429/503、PA-APIのTooManyRequests）によるエラーかどうか
+    PA-APIのSDKは元の例外（status を持つ）を __context__ に残します
+    """
+    if isinstance(error, TooManyRequests):
+        return True
+    for exc in (error, error.__cause__, error.__context__):
+        if exc is None:
+            continue
+        status = getattr(getattr(exc, 'response', None), 'status_code', None) or getattr(exc, 'status', None)
+        if status in THROTTLE_STATUSES:
+            return True
+    return False
+
+
+def plan_backends(backends):
+    """
+    利用できるバックエンドをコストの低い順に並べる
+    同じコストの場合は1秒あたりの上限が高い順（上限なしを優先）
+
+    Args:
+        backends (list): バックエンドのリスト
+
+    Returns:
+        list: 呼び出す順のバックエンド
+    """
+    return sorted((backend for backend in backends if backend.available()),
+                  key=lambda backend: (backend.cost, -(backend.rate or float('inf'))))
+
+
+class Backend:
+    """
+    検索・短縮のバックエンドの共通部分（コストとレート制限）
+    """
+    # 識別名（呼び出し回数の集計のキー）と表示名
+    name = 'backend'
+    label = 'バックエンド'
+    # 1回の呼び出しの相対的なコスト（APIの割り当て・転送量・ブロックされる危険）
+    cost = 1.0
+    # 1秒あたりのリクエスト数の上限の既定値（0の場合は制限なし）
+    default_rate = 0.0
+    # 結果が空の場合もアップストリームの制限とみなすかどうか（CAPTCHAページなど）
+    empty_is_throttle = False
+
+    def __init__(self, rate=None):
+        self.rate = self.default_rate if rate is None else float(rate)
+        self.limiter = TokenBucket(self.rate)
+
+    def available(self):
+        return True
+
+    def use_limiter(self, limiter):
+        """
+        レート制限を差し替え（学習したレートを使う場合など）
+        """
+        self.limiter = limiter
+
+    def report(self, result=None, error=None):
+        """
+        呼び出しの結果をレート制限に伝える（制限に当たったら下げ、成功が続いたら上げる）
+        """
+        if error is not None:
+            if is_throttled(error):
+                self.limiter.record_throttle()
+        elif result is None and self.empty_is_throttle:
+            self.limiter.record_throttle()
+        else:
+            self.limiter.record_success()
+
+    def acquire(self, usage=None):
+        """
+        レート制限の範囲で1回分の呼び出しを待ち、呼び出し回数を加算
+        """
+        self.limiter.acquire()
+        if usage is not None:
+            usage[self.name] += 1
+
+
+def count_empty(backend, usage):
+    """
+    空の結果がアップストリームの制限とみなされる場合（CAPTCHAページなど）に制限の回数を加算
+    """
+    if backend.empty_is_throttle:
+        usage['throttled'] += 1
+
+
+class TitleCacheResolver(Backend):
+    name = 'cache'
+    label = 'キャッシュ'
+    cost = 0.0
+
+    def __init__(self, title_cache):
+        """
+        タイトル→ASINキャッシュ（link_cache.TitleCache）
+        """
+        super().__init__(0)
+        self.title_cache = title_cache
+
+    def lookup(self, title, usage):
+        """
+        Returns:
+            dict: キャッシュ済みの商品情報（見つからない結果がキャッシュされている場合は NOT_FOUND、未キャッシュはNone）
+        """
+        cached, product_info = self.title_cache.lookup(title)
+        if not cached:
+            return None
+        usage['cache_hits'] += 1
+        return product_info or NOT_FOUND
+
+    def store(self, title, product_info, had_errors):
+        """
+        検索結果を保存（通信エラー・制限があった場合は「見つからない」としてキャッシュしない）
+        """
+        if product_info:
+            self.title_cache.store(title, product_info)
+        elif not had_errors:
+            self.title_cache.store_negative(title)
+
+
+def item_to_product_info(item, fallback_title, strategy):
+    """
+    PA-APIの商品データを商品情報の辞書に変換
+    """
+    return {
+        'asin': item.asin,
+        'title': getattr(item.item_info.title, 'display_value', fallback_title) if hasattr(item, 'item_info') and hasattr(item.item_info, 'title') else fallback_title,
+        'url': product_url(item.asin),
+        'price': item.offers.listings[0].price.amount if hasattr(item, 'offers') and item.offers and hasattr(item.offers, 'listings') and item.offers.listings else None,
+        'strategy': strategy
+    }
+
+
+class PAAPIResolver(Backend):
+    name = 'paapi'
+    label = 'PA-API'
+    cost = 1.0
+    default_rate = 1.0  # PA-APIのTPS上限は1
+
+    def __init__(self, amazon, rate=None, debug=False):
+        """
+        PA-APIで検索（3段階: タイトル → 短縮したタイトル → search_index=All）
+
+        Args:
+            amazon (AmazonApi): PA-APIクライアント（Noneの場合は使用しない）
+            rate (float): 1秒あたりのリクエスト数の上限
+            debug (bool): 検索の経過を表示するかどうか
+        """
+        super().__init__(rate)
+        self.amazon = amazon
+        self.debug = debug
+
+    def available(self):
+        return self.amazon is not None
+
+    def search_first(self, keywords, search_index, usage):
+        """
+        検索して最初の商品を返す（該当なしの場合はNone、その他のエラーは例外）
+        """
+        self.acquire(usage)
+        try:
+            search_result = self.amazon.search_items(keywords=keywords, search_index=search_index, item_count=1)
+        except ItemsNotFound:
+            return None
+        if search_result and search_result.items:
+            return search_result.items[0]
+        return None
+
+    def lookup(self, title, usage):
+        if self.debug:
+            print(f"  PA-API検索: {title}")
+        # 1回目: 通常検索
+        item = self.search_first(title, "KindleStore", usage)
+        if item:
+            return item_to_product_info(item, title, 'paapi_title')
+        # 2回目: タイトル短縮で再検索
+        short_title = title.split('：')[0].split(':')[0].split('、')[0].split('，')[0][:20]
+        if short_title != title:
+            if self.debug:
+                print(f"  タイトル短縮再検索: {short_title}")
+            item = self.search_first(short_title, "KindleStore", usage)
+            if item:
+                return item_to_product_info(item, short_title, 'paapi_short_title')
+        # 3回目: search_indexをAllにして再検索
+        if self.debug:
+            print(f"  search_index=Allで再検索: {title}")
+        item = self.search_first(title, "All", usage)
+        if item:
+            return item_to_product_info(item, title, 'paapi_all')
+        return None
+
+    def refresh_many(self, asins):
+        """
+        ASINが分かっている商品をGetItemsでまとめて再取得（最大10件/回）
+
+        Returns:
+            tuple: (ASIN -> 商品データ, 呼び出し回数)
+        """
+        items_by_asin = {}
+        calls = 0
+        for start in range(0, len(asins), GET_ITEMS_BATCH_SIZE):
+            self.acquire()
+            calls += 1
+            try:
+                items = self.amazon.get_items(asins[start:start + GET_ITEMS_BATCH_SIZE])
+            except ItemsNotFound:
+                items = []
+            except Exception as e:
+                print(f"PA-API GetItemsエラー: {e}")
+                items = []
+            items_by_asin.update((item.asin, item) for item in items)
+        return items_by_asin, calls
+
+
+def scraped_product_info(result, fallback_title):
+    """
+    検索結果ページから取り出した商品（asin_extractor の結果）を商品情報に変換
+    """
+    return {
+        'asin': result['asin'],
+        'title': result.get('title') or fallback_title,
+        'url': f"{AMAZON_BASE_URL}{result['path']}",
+        'price': result.get('price'),
+        'ku': result.get('ku', False),
+        'strategy': 'scraping'
+    }
+
+
+class ScrapingResolver(Backend):
+    name = 'scraping'
+    label = 'スクレイピング'
+    # 検索結果ページは数百KBあり、短時間に多く取得するとブロックされる
+    cost = 5.0
+    default_rate = 1.0
+    # 商品リンクのないページはCAPTCHAなどのブロックの可能性がある
+    empty_is_throttle = True
+
+    def __init__(self, session, base_url=AMAZON_BASE_URL, timeout=10, rate=None,
+                 async_scraper=None, prefer_ku=False, debug=False):
+        """
+        amazon.co.jp の検索結果ページから最初の商品（読み放題の商品を優先）を取得
+
+        Args:
+            session (requests.Session): HTTPセッション
+            base_url (str): 検索ページのベースURL
+            timeout (float): タイムアウト時間（秒）
+            rate (float): 1秒あたりのリクエスト数の上限
+            async_scraper (AsyncScraper): 非同期フェッチャー（指定した場合はまとめてスクレイピング）
+            prefer_ku (bool): 読み放題の商品を優先するかどうか（ない場合は最初のスポンサーでない商品）
+            debug (bool): 検索の経過を表示するかどうか
+        """
+        super().__init__(rate)
+        self.session = session
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.async_scraper = async_scraper
+        self.prefer_ku = prefer_ku
+        self.debug = debug
+        if async_scraper is not None:
+            async_scraper.prefer_ku = prefer_ku
+            if async_scraper.limiter is None:
+                async_scraper.limiter = self.limiter
+
+    def use_limiter(self, limiter):
+        if self.async_scraper is not None and self.async_scraper.limiter is self.limiter:
+            self.async_scraper.limiter = limiter
+        self.limiter = limiter
+
+    @property
+    def batched(self):
+        """
+        未解決のタイトルをまとめて検索するかどうか
+        """
+        return self.async_scraper is not None
+
+    def lookup(self, title, usage):
+        if self.debug:
+            print(f"  スクレイピング検索: {title}")
+        params = {
+            'k': title,
+            'i': 'digital-text',  # Kindleストア
+            'ref': 'sr_nr_i_0'
+        }
+        self.acquire(usage)
+        scanner = ResultScanner(prefer_ku=self.prefer_ku)
+        info = None
+        with self.session.get(f"{self.base_url}/s", params=params, timeout=self.timeout, stream=True) as response:
+            response.raise_for_status()
+            # ページ全体を文字列に変換せず、バイト列のまま最初のスポンサーでない結果（prefer_ku の場合は読み放題の結果）を探す
+            for chunk in response.iter_content(SCRAPING_CHUNK_SIZE):
+                info = scanner.feed(chunk)
+                if info:
+                    break
+            else:
+                info = scanner.close()
+
+        if not info:
+            return None
+        if self.debug:
+            print(f"  商品URL発見: {AMAZON_BASE_URL}{info['path']}"
+                  f"{'（読み放題）' if info['ku'] else ''} {scanner.bytes_read}バイト")
+        return scraped_product_info(info, title)
+
+    def lookup_many(self, titles, usages):
+        """
+        非同期フェッチャーでまとめて検索
+
+        Returns:
+            list: 入力順の商品情報（見つからない場合はNone、エラーの場合は例外）
+        """
+        results = []
+        for title, result, usage in zip(titles, self.async_scraper.search_many(titles), usages):
+            usage[self.name] += 1
+            if self.debug:
+                print(f"  スクレイピング: {title[:30]} {result['bytes']}バイト, {result['elapsed']:.2f}秒")
+            if result.get('error'):
+                self.report(error=result['error'])
+                results.append(result['error'])
+            elif result['asin']:
+                self.report(result)
+                results.append(scraped_product_info(result, title))
+            else:
+                self.report(None)
+                results.append(None)
+        return results
+
+
+class NoShortener(Backend):
+    name = 'none'
+    label = '短縮なし'
+    cost = 0.0
+
+    def shorten(self, url, usage=None):
+        return url
+
+
+class TinyURLShortener(Backend):
+    name = 'tinyurl'
+    label = 'TinyURL'
+    cost = 1.0
+    default_rate = 2.0
+    api_url = "http://tinyurl.com/api-create.php"
+
+    def __init__(self, session, timeout=10, rate=None):
+        super().__init__(rate)
+        self.session = session
+        self.timeout = timeout
+
+    def shorten(self, url, usage=None):
+        self.acquire(usage)
+        response = self.session.get(self.api_url, params={'url': url}, timeout=self.timeout)
+        response.raise_for_status()
+        return response.text
+
+
+class BitlyShortener(Backend):
+    name = 'bitly'
+    label = 'Bitly'
+    # 無料プランは1か月に作成できるリンク数に上限がある
+    cost = 2.0
+    default_rate = 2.0
+    api_url = "https://api-ssl.bitly.com/v4/shorten"
+
+    def __init__(self, session, token, timeout=10, rate=None):
+        super().__init__(rate)
+        self.session = session
+        self.token = token
+        self.timeout = timeout
+
+    def available(self):
+        return bool(self.token)
+
+    def shorten(self, url, usage=None):
+        headers = {
+            'Authorization': f'Bearer {self.token}',
+            'Content-Type': 'application/json'
+        }
+        self.acquire(usage)
+        response = self.session.post(self.api_url, headers=headers, json={'long_url': url}, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json().get('link', url)
+
+
+class LinkEngine:
+    def __init__(self, resolvers, shorteners=(), affiliate_tag="", title_cache=None, short_url_cache=None,
+                 max_workers=1, bulk_shorten=False, rate_store=None, debug=False):
+        """
+        リンク生成エンジンの初期化
+
+        Args:
+            resolvers (list): 検索のバックエンド（キャッシュは title_cache から自動で追加）
+            shorteners (list): 短縮のバックエンド（空の場合は短縮しない、複数の場合は失敗したら次を使う）
+            affiliate_tag (str): Amazonアソシエイトタグ
+            title_cache (TitleCache): タイトル→ASINキャッシュ（Noneでキャッシュ無効）
+            short_url_cache (ShortUrlCache): 長いURL→短縮URLの対応表（Noneで無効）
+            max_workers (int): 検索・URL短縮を並列実行するスレッド数
+            bulk_shorten (bool): 検索完了後に未短縮のURLだけをまとめて短縮するかどうか
+            rate_store (AdaptiveRateStore): 学習したレートの保存先（指定した場合は応答に合わせてレートを調整）
+            debug (bool): 処理の経過を表示するかどうか
+        """
+        self.affiliate_tag = affiliate_tag
+        self.max_workers = max(1, max_workers)
+        self.bulk_shorten = bulk_shorten
+        self.debug = debug
+        self.search_backends = list(resolvers)
+        self.rate_store = rate_store
+        self.set_shorteners(shorteners)
+        self.set_caches(title_cache, short_url_cache)
+        if rate_store:
+            for backend in self.search_backends:
+                self.adapt(backend)
+
+    def set_caches(self, title_cache, short_url_cache):
+        """
+        キャッシュを設定して検索の順序を決め直す
+        """
+        self.title_cache = title_cache
+        self.short_url_cache = short_url_cache
+        self.cache_resolver = TitleCacheResolver(title_cache) if title_cache else None
+        self.resolvers = plan_backends(([self.cache_resolver] if self.cache_resolver else []) + self.search_backends)
+
+    def set_shorteners(self, shorteners):
+        """
+        短縮のバックエンドを設定（コストの低い順に試す）
+        """
+        self.shorteners = plan_backends([self.adapt(shortener) for shortener in shorteners] or [NoShortener()])
+
+    def adapt(self, backend):
+        """
+        バックエンドのレート制限を学習したレートに差し替え（rate_store がない場合はそのまま）
+        """
+        if self.rate_store and backend.rate > 0:
+            backend.use_limiter(self.rate_store.limiter(backend.name, backend.rate))
+        return backend
+
+    def save_rates(self):
+        """
+        学習したレートを保存
+        """
+        if self.rate_store:
+            self.rate_store.save()
+
+    @property
+    def backends(self):
+        """
+        使用するすべてのバックエンド（呼び出す順）
+        """
+        return self.resolvers + self.shorteners
+
+    def describe_plan(self):
+        """
+        検索・短縮の順序（表示用）
+        """
+        def describe(backends):
+            return " → ".join(f"{backend.label}(コスト{backend.cost:g}"
+                              + (f", {backend.rate:g}回/秒" if backend.rate else "") + ")"
+                              for backend in backends)
+        return f"検索: {describe(self.resolvers)} / 短縮: {describe(self.shorteners)}"
+
+    def _lookup_chain(self, title, resolvers, usage):
+        """
+        バックエンドを順に呼び出し、最初に見つかった商品情報を返す
+
+        Returns:
+            tuple: (商品情報・NOT_FOUND・None, 見つけたバックエンド)
+        """
+        for resolver in resolvers:
+            try:
+                result = resolver.lookup(title, usage)
+            except Exception as e:
+                print(f"{resolver.label}検索エラー ({title}): {e}")
+                usage['errors'] += 1
+                resolver.report(error=e)
+                continue
+            resolver.report(result)
+            if result is not None:
+                return result, resolver
+            count_empty(resolver, usage)
+        return None, None
+
+    def _store(self, title, product_info, usage, source):
+        if self.cache_resolver and source is not self.cache_resolver:
+            # 通信エラー・制限の可能性がある空の結果（CAPTCHAなど）は「見つからない」としてキャッシュしない
+            self.cache_resolver.store(title, product_info, usage['errors'] > 0 or usage['throttled'] > 0)
+
+    def resolve(self, title):
+        """
+        1件のタイトルを検索（キャッシュ → コストの低い順のバックエンド）
+
+        Returns:
+            tuple: (商品情報（見つからない場合はNone）, バックエンドごとの呼び出し回数)
+        """
+        usage = Counter()
+        result, source = self._lookup_chain(title, self.resolvers, usage)
+        product_info = None if result is NOT_FOUND else result
+        self._store(title, product_info, usage, source)
+        return product_info, usage
+
+    def affiliate_link(self, product):
+        """
+        アソシエイトリンクを作成
+
+        Args:
+            product: 商品情報（dict）または商品URL（str）
+        """
+        url = product.get('url') if isinstance(product, dict) else product
+        if not url:
+            return None
+        separator = '&' if '?' in url else '?'
+        return f"{url}{separator}tag={self.affiliate_tag}"
+
+    def shorten(self, url, shorteners=None, usage=None):
+        """
+        URLを短縮（短縮済みのURLは再利用、失敗した場合は次のバックエンド、すべて失敗した場合は元のURL）
+
+        Args:
+            url (str): 短縮するURL
+            shorteners (list): 使用するバックエンド（省略時は設定したバックエンド、指定した場合はレート制限もそのまま使う）
+            usage (Counter): 呼び出し回数の加算先
+        """
+        shorteners = plan_backends(shorteners) if shorteners is not None else self.shorteners
+        if not shorteners or all(isinstance(shortener, NoShortener) for shortener in shorteners):
+            return url
+
+        if self.short_url_cache:
+            cached_url = self.short_url_cache.get(url)
+            if cached_url:
+                return cached_url
+
+        for shortener in shorteners:
+            try:
+                short_url = shortener.shorten(url, usage)
+            except Exception as e:
+                print(f"{shortener.label}短縮エラー: {e}")
+                shortener.report(error=e)
+                continue
+            shortener.report(short_url)
+            if self.debug:
+                print(f"  {shortener.label}短縮: {short_url}")
+            if self.short_url_cache:
+                self.short_url_cache.store(url, short_url, shortener.name)
+            return short_url
+        return url
+
+    def shorten_many(self, urls, shorteners=None, usages=None):
+        """
+        複数のURLをまとめて短縮（対応表にないURLだけを重複を除いて並列に短縮）
+
+        Args:
+            urls (list): 短縮するURLのリスト
+            shorteners (list): 使用するバックエンド（省略時は設定したバックエンド）
+            usages (dict): 長いURL -> 呼び出し回数の加算先（Counter）
+
+        Returns:
+            dict: 長いURL -> 短縮URL
+        """
+        usages = usages or {}
+        shortened = self.short_url_cache.get_many(urls) if self.short_url_cache else {}
+        new_urls = [url for url in dict.fromkeys(urls) if url not in shortened]
+        print(f"URL短縮: 短縮済み {len(shortened)}件, 新規 {len(new_urls)}件")
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            for url, short_url in zip(new_urls, pool.map(lambda url: self.shorten(url, shorteners, usages.get(url)), new_urls)):
+                shortened[url] = short_url
+        return shortened
+
+    def _segments(self):
+        """
+        キャッシュ以外の検索バックエンドを、1件ずつ順に呼び出す区間とまとめて呼び出すバックエンドに分ける
+        """
+        segments = []
+        for resolver in self.resolvers:
+            if resolver is self.cache_resolver:
+                continue
+            if getattr(resolver, 'batched', False):
+                segments.append([resolver])
+            elif segments and not getattr(segments[-1][0], 'batched', False):
+                segments[-1].append(resolver)
+            else:
+                segments.append([resolver])
+        return segments
+
+    def _refresh_stale(self, titles, pending, usages, finish):
+        """
+        有効期限が切れていてもASINが分かっているタイトルは、検索せずにGetItemsでまとめて再取得
+
+        Returns:
+            list: 検索が必要なインデックス
+        """
+        refresher = next((resolver for resolver in self.resolvers if hasattr(resolver, 'refresh_many')), None)
+        if refresher is None:
+            return pending
+
+        known = {}  # ASIN -> [(インデックス, キャッシュ済みの商品情報)]
+        unresolved = []
+        for index in pending:
+            stale_info = self.title_cache.lookup_stale(titles[index])
+            if stale_info:
+                known.setdefault(stale_info['asin'], []).append((index, stale_info))
+            else:
+                unresolved.append(index)
+        if not known:
+            return pending
+
+        asins = list(known)
+        items_by_asin, calls = refresher.refresh_many(asins)
+        print(f"GetItemsで再取得: {len(asins)}件（{calls}回の呼び出し）")
+        charged = 0
+        for asin, entries in known.items():
+            for index, stale_info in entries:
+                # 呼び出し回数は先頭の行から1回ずつ数える（合計が実際の呼び出し回数になる）
+                if charged < calls:
+                    usages[index][refresher.name] += 1
+                    charged += 1
+                item = items_by_asin.get(asin)
+                if not item:
+                    # 取り扱い終了などでASINが取得できない場合は検索し直す
+                    unresolved.append(index)
+                    continue
+                product_info = item_to_product_info(item, stale_info['title'], stale_info['strategy'])
+                finish(index, product_info, refresher)
+        return sorted(unresolved)
+
+    def process_titles(self, titles, on_result=None, shorteners=None, on_done=None):
+        """
+        タイトル一覧を並列パイプラインで処理
+        検索はバックエンドのコストの低い順に、未解決のタイトルだけを次のバックエンドに渡します
+        見つかったタイトルはすぐにアソシエイトリンクを作成し、URL短縮を別のスレッドで始めます
+
+        Args:
+            titles (list): 検索するタイトルのリスト
+            on_result: 検索が終わるたびに呼び出す関数 (インデックス, 結果の辞書)
+            shorteners (list): 使用する短縮のバックエンド（省略時は設定したバックエンド）
+            on_done: URL短縮まで終わるたびに呼び出す関数 (インデックス, 結果の辞書)（呼び出し元のスレッドで実行）
+
+        Returns:
+            list: 入力順の結果の辞書
+                  {'title', 'product_info', 'affiliate_url', 'short_url', 'usage'}（見つからない場合はNone）
+        """
+        total = len(titles)
+        results = [{'title': title, 'product_info': None, 'affiliate_url': None, 'short_url': None,
+                    'usage': Counter()} for title in titles]
+        usages = [result['usage'] for result in results]
+        affiliate_urls = {}
+        shorten_futures = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as search_pool, \
+                ThreadPoolExecutor(max_workers=self.max_workers) as shorten_pool:
+
+            def finish(index, product_info, source):
+                """
+                検索が終わったタイトルのキャッシュ保存・アソシエイトリンク作成・短縮の開始
+                """
+                if product_info is NOT_FOUND:
+                    product_info = None
+                title = titles[index]
+                self._store(title, product_info, usages[index], source)
+                result = results[index]
+                result['product_info'] = product_info
+                result['affiliate_url'] = self.affiliate_link(product_info) if product_info else None
+                if on_result:
+                    on_result(index, result)
+                if not result['affiliate_url']:
+                    if on_done:
+                        on_done(index, result)
+                    return
+                if self.short_url_cache:
+                    # 既存の出力CSVにあるタイトルは、その短縮URLを再利用する
+                    self.short_url_cache.seed_title(title, result['affiliate_url'])
+                if self.bulk_shorten:
+                    affiliate_urls[index] = result['affiliate_url']
+                else:
+                    future = shorten_pool.submit(self.shorten, result['affiliate_url'], shorteners, usages[index])
+                    shorten_futures[future] = index
+
+            # ステージ0: キャッシュ（有効期限切れでもASINが分かっていればまとめて再取得）
+            pending = list(range(total))
+            if self.cache_resolver:
+                unresolved = []
+                for index in pending:
+                    cached = self.cache_resolver.lookup(titles[index], usages[index])
+                    if cached is None:
+                        unresolved.append(index)
+                    else:
+                        finish(index, cached, self.cache_resolver)
+                pending = self._refresh_stale(titles, unresolved, usages, finish)
+
+            # ステージ1以降: コストの低い順に、未解決のタイトルだけを検索
+            for segment in self._segments():
+                if not pending:
+                    break
+                unresolved = []
+                if getattr(segment[0], 'batched', False):
+                    resolver = segment[0]
+                    found = resolver.lookup_many([titles[index] for index in pending],
+                                                 [usages[index] for index in pending])
+                    for index, result in zip(pending, found):
+                        if isinstance(result, Exception):
+                            print(f"{resolver.label}検索エラー ({titles[index]}): {result}")
+                            usages[index]['errors'] += 1
+                            unresolved.append(index)
+                        elif result is None:
+                            count_empty(resolver, usages[index])
+                            unresolved.append(index)
+                        else:
+                            finish(index, result, resolver)
+                else:
+                    futures = {search_pool.submit(self._lookup_chain, titles[index], segment, usages[index]): index
+                               for index in pending}
+                    for future in as_completed(futures):
+                        index = futures[future]
+                        result, source = future.result()
+                        if result is None:
+                            unresolved.append(index)
+                        else:
+                            finish(index, result, source)
+                pending = sorted(unresolved)
+
+            # どのバックエンドでも見つからなかったタイトル
+            for index in pending:
+                finish(index, None, None)
+
+            if affiliate_urls:
+                # 同じURLの短縮は1回なので、呼び出し回数は最初の行に数える
+                url_usages = {}
+                for index, affiliate_url in affiliate_urls.items():
+                    url_usages.setdefault(affiliate_url, usages[index])
+                shortened = self.shorten_many(list(affiliate_urls.values()), shorteners, url_usages)
+                for index, affiliate_url in affiliate_urls.items():
+                    results[index]['short_url'] = shortened.get(affiliate_url)
+                    if on_done:
+                        on_done(index, results[index])
+
+            for future in as_completed(shorten_futures):
+                index = shorten_futures[future]
+                try:
+                    results[index]['short_url'] = future.result()
+                except Exception as e:
+                    print(f"URL短縮エラー ({titles[index]}): {e}")
+                if on_done:
+                    on_done(index, results[index])
+
+        self.save_rates()
+        return results
+
+
+def summarize_usage(results):
+    """
+    バックエンドごとの呼び出し回数の合計
+    """
+    total = Counter()
+    for result in results:
+        total.update(result['usage'])
+    return total
@@ -0,0 +1,200 @@
+"""
+リンク生成ジャーナル（追記専用）
+1タイトルの処理が終わるたびに結果（ASIN・短縮URL、または失敗の理由と試行回数）を1行のJSONで追記します
+長時間の実行が途中で止まっても、ジャーナルを読み直せば処理済みの行を再処理せずに続きから再開できます
+
+使い方:
+    python link_journal.py                               # ジャーナルの概要を表示
+    python link_journal.py --file link_generation_journal.jsonl
+"""
+
+import argparse
+import json
+import os
+from datetime import datetime, timedelta
+
+from link_delta import title_hash
+
+# 失敗の理由
+REASON_NOT_FOUND = 'not_found'        # どのバックエンドでも見つからなかった
+REASON_SEARCH_ERROR = 'search_error'  # 通信エラー・制限（CAPTCHAなど）で検索できなかった
+REASON_NO_SHORT_URL = 'no_short_url'  # 見つかったが短縮URLを作成できなかった
+
+
+def parse_line(line):
+    """
+    ジャーナルの1行を解析（壊れた行・途中まで書かれた行はNone）
+    """
+    try:
+        entry = json.loads(line)
+    except ValueError:
+        return None
+    if not isinstance(entry, dict) or 'key' not in entry or 'status' not in entry:
+        return None
+    return entry
+
+
+def failure_reason(result):
+    """
+    リンク生成エンジンの結果から失敗の理由を判定（成功した場合はNone）
+    """
+    if result['product_info'] is None:
+        usage = result['usage']
+        return REASON_SEARCH_ERROR if usage['errors'] or usage['throttled'] else REASON_NOT_FOUND
+    if not result['short_url']:
+        return REASON_NO_SHORT_URL
+    return None
+
+
+class LinkJournal:
+    def __init__(self, journal_file):
+        """
+        リンク生成ジャーナルの初期化
+
+        Args:
+            journal_file (str): ジャーナルファイルパス（JSON Lines）
+        """
+        self.journal_file = journal_file
+        # タイトルハッシュ -> 最後の記録
+        self.entries = {}
+
+    def load(self):
+        """
+        ジャーナルを読み直して、タイトルごとの最後の記録を作成
+
+        Returns:
+            dict: タイトルハッシュ -> 最後の記録
+        """
+        self.entries = {}
+        if os.path.exists(self.journal_file):
+            with open(self.journal_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    entry = parse_line(line) if line.strip() else None
+                    if entry is not None:
+                        self.entries[entry['key']] = entry
+        return self.entries
+
+    def reset(self):
+        """
+        ジャーナルを空にする（最初から処理する場合）
+        """
+        if os.path.exists(self.journal_file):
+            os.remove(self.journal_file)
+        self.entries = {}
+
+    def get(self, title):
+        return self.entries.get(title_hash(title))
+
+    def pending(self, titles, retry_failed=False, cooldown=timedelta(0), now=None):
+        """
+        処理が必要なタイトルのインデックス
+
+        Args:
+            titles (list): タイトルのリスト
+            retry_failed (bool): 失敗したタイトルを再試行するかどうか（最後の試行から cooldown 経過したもののみ）
+            cooldown (timedelta): 失敗してから再試行するまでの時間
+            now (datetime): 現在時刻
+
+        Returns:
+            tuple: (ジャーナルにないインデックス, 再試行するインデックス, 待機中の失敗の件数)
+        """
+        now = now or datetime.now()
+        missing, retry, cooling = [], [], 0
+        seen = set()
+        for index, title in enumerate(titles):
+            # 重複したタイトルは1件として処理する
+            key = title_hash(title)
+            if key in seen:
+                continue
+            seen.add(key)
+            entry = self.entries.get(key)
+            if entry is None:
+                missing.append(index)
+            elif entry['status'] == 'failed' and retry_failed:
+                if datetime.fromisoformat(entry['ts']) + cooldown <= now:
+                    retry.append(index)
+                else:
+                    cooling += 1
+        return missing, retry, cooling
+
+    def _needs_newline(self):
+        """
+        ジャーナルの末尾が改行で終わっていないか（書き込み途中で止まった場合）
+        """
+        try:
+            with open(self.journal_file, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                return f.read(1) != b'\n'
+        except OSError:
+            return False
+
+    def record(self, title, result, when=None):
+        """
+        1タイトルの処理結果を追記
+
+        Args:
+            title (str): タイトル
+            result (dict): リンク生成エンジンの結果（'product_info', 'short_url', 'usage'）
+            when (datetime): 処理日時（Noneの場合は現在時刻）
+
+        Returns:
+            dict: 追記した行
+        """
+        key = title_hash(title)
+        previous = self.entries.get(key)
+        reason = failure_reason(result)
+        product_info = result['product_info']
+        entry = {
+            'ts': (when or datetime.now()).isoformat(timespec='seconds'),
+            'key': key,
+            'title': title,
+            'status': 'failed' if reason else 'ok',
+            'asin': product_info['asin'] if product_info else None,
+            'short_url': result['short_url'] if not reason else None,
+            'reason': reason,
+            'attempts': (previous['attempts'] if previous else 0) + 1
+        }
+
+        line = json.dumps(entry, ensure_ascii=False) + '\n'
+        if self._needs_newline():
+            line = '\n' + line
+        with open(self.journal_file, 'a', encoding='utf-8') as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+
+        self.entries[key] = entry
+        return entry
+
+    def summary(self):
+        """
+        状態・失敗の理由ごとの件数
+        """
+        counts = {}
+        for entry in self.entries.values():
+            label = entry['status'] if entry['status'] == 'ok' else f"failed:{entry['reason']}"
+            counts[label] = counts.get(label, 0) + 1
+        return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="リンク生成ジャーナル")
+    parser.add_argument('--file', default="link_generation_journal.jsonl", help="ジャーナルファイル")
+    args = parser.parse_args()
+
+    journal = LinkJournal(args.file)
+    entries = journal.load()
+    print(f"ジャーナル: {args.file}（{len(entries)}タイトル）")
+    print("-" * 60)
+    for label, count in sorted(journal.summary().items()):
+        print(f"{label}: {count}")
+
+    failed = [entry for entry in entries.values() if entry['status'] == 'failed']
+    if failed:
+        print("-" * 60)
+        for entry in sorted(failed, key=lambda entry: -entry['attempts'])[:20]:
+            print(f"{entry['attempts']}回 {entry['reason']} {entry['ts']} {entry['title'][:40]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+リンク生成のストリーミング処理ユーティリティ
+入力CSVを一定の行数ずつ読み込み、処理した行をすぐに出力CSVに追記します
+チャンクごとにチェックポイント（処理済みの入力行数・出力ファイルの大きさ）を保存するので、
+途中で停止した場合も次の実行で続きから再開できます（メモリ使用量はカタログの大きさによらず一定）
+"""
+
+import csv
+import json
+import os
+from datetime import datetime
+
+import pandas as pd
+
+DEFAULT_CHUNK_SIZE = 500
+
+
+def input_signature(input_file):
+    """
+    入力CSVの変更を検知するための大きさと更新日時
+    """
+    stat = os.stat(input_file)
+    return {'size': stat.st_size, 'mtime': stat.st_mtime}
+
+
+def load_checkpoint(checkpoint_file, input_file, output_file):
+    """
+    再開できるチェックポイントを読み込み
+
+    Returns:
+        dict: チェックポイント（ない場合、入力CSVが変更された場合、出力CSVが短くなっている場合はNone）
+    """
+    if not os.path.exists(checkpoint_file):
+        return None
+    try:
+        with open(checkpoint_file, 'r', encoding='utf-8') as f:
+            checkpoint = json.load(f)
+    except Exception as e:
+        print(f"チェックポイント読み込みエラー: {e}")
+        return None
+
+    if checkpoint.get('input_file') != input_file or checkpoint.get('output_file') != output_file:
+        return None
+    if checkpoint.get('input') != input_signature(input_file):
+        print("入力CSVが変更されているため、最初から処理します")
+        return None
+    if not os.path.exists(output_file) or os.path.getsize(output_file) < checkpoint['output_size']:
+        print("出力CSVがチェックポイントより短いため、最初から処理します")
+        return None
+    return checkpoint
+
+
+def save_checkpoint(checkpoint_file, checkpoint):
+    """
+    チェックポイントを保存（一時ファイルに書いてから置き換え）
+    """
+    checkpoint['updated_at'] = datetime.now().isoformat(timespec='seconds')
+    tmp_file = f"{checkpoint_file}.tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(checkpoint, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_file, checkpoint_file)
+
+
+def read_columns(input_file):
+    """
+    入力CSVの列名（ヘッダー行のみ読み込む）
+    """
+    return list(pd.read_csv(input_file, nrows=0).columns)
+
+
+def stream_csv(input_file, output_file, columns, process_chunk, checkpoint_file,
+               chunk_size=DEFAULT_CHUNK_SIZE, initial_state=None, resume=True):
+    """
+    入力CSVをチャンクごとに処理して出力CSVに追記
+
+    Args:
+        input_file (str): 入力CSVファイル
+        output_file (str): 出力CSVファイル
+        columns (list): 出力CSVの列名
+        process_chunk: チャンクを処理する関数 (入力行の辞書のリスト, 状態の辞書) -> 出力行の辞書のリスト
+                       状態の辞書（次のNoなど）はチェックポイントに保存され、再開時に引き継がれます
+        checkpoint_file (str): チェックポイントファイル
+        chunk_size (int): 1回に読み込む入力行数
+        initial_state (dict): 最初から処理する場合の状態
+        resume (bool): チェックポイントがあれば続きから再開するかどうか
+
+    Returns:
+        dict: {'input_rows': 処理した入力行数, 'output_rows': 出力行数, 'resumed_from': 再開した入力行数,
+               'state': 最後の状態}
+    """
+    checkpoint = load_checkpoint(checkpoint_file, input_file, output_file) if resume else None
+    if checkpoint:
+        # チェックポイントの後に途中まで書いた行は捨てる（再開後にもう一度書く）
+        with open(output_file, 'r+b') as f:
+            f.truncate(checkpoint['output_size'])
+        print(f"チェックポイントから再開: 入力 {checkpoint['offset']}行目の次から（出力済み {checkpoint['output_rows']}件）")
+    else:
+        with open(output_file, 'w', encoding='utf-8-sig', newline='') as f:
+            csv.writer(f, lineterminator='\n').writerow(columns)
+        checkpoint = {
+            'input_file': input_file,
+            'output_file': output_file,
+            'input': input_signature(input_file),
+            'offset': 0,
+            'output_rows': 0,
+            'output_size': os.path.getsize(output_file),
+            'state': dict(initial_state or {})
+        }
+        save_checkpoint(checkpoint_file, checkpoint)
+    resumed_from = checkpoint['offset']
+
+    # 処理済みの行はヘッダーの後から読み飛ばす（行番号の判定だけでメモリは使わない）
+    offset = checkpoint['offset']
+    reader = pd.read_csv(input_file, chunksize=max(1, chunk_size), dtype=str, keep_default_na=False,
+                         skiprows=lambda line: 0 < line <= offset)
+    for chunk in reader:
+        rows = chunk.to_dict('records')
+        output_rows = process_chunk(rows, checkpoint['state'])
+
+        # 出力をディスクに書き込んでからチェックポイントを進める
+        with open(output_file, 'a', encoding='utf-8-sig', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=columns, extrasaction='ignore', lineterminator='\n')
+            writer.writerows(output_rows)
+            f.flush()
+            os.fsync(f.fileno())
+
+        checkpoint['offset'] += len(rows)
+        checkpoint['output_rows'] += len(output_rows)
+        checkpoint['output_size'] = os.path.getsize(output_file)
+        save_checkpoint(checkpoint_file, checkpoint)
+        print(f"チェックポイント: 入力 {checkpoint['offset']}行, 出力 {checkpoint['output_rows']}件")
+
+    # 最後まで処理した場合は次回は最初から
+    os.remove(checkpoint_file)
+    return {
+        'input_rows': checkpoint['offset'],
+        'output_rows': checkpoint['output_rows'],
+        'resumed_from': resumed_from,
+        'state': checkpoint['state']
+    }
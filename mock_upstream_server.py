@@ -0,0 +1,582 @@
+"""
+ローカルの代替アップストリームサーバー（ベンチマーク用）
+リンク生成で使う次のアップストリームを模擬します
+
+- GET  /s                   amazon.co.jp の検索結果ページ（HTML）
+- POST /paapi5/searchitems  PA-API の SearchItems（JSON）
+- POST /paapi5/getitems     PA-API の GetItems（JSON）
+- GET  /api-create.php      TinyURL の短縮API（テキスト）
+- POST /v4/shorten          Bitly の短縮API（JSON）
+
+応答の遅延・5xxエラー・429（割合、またはエンドポイントごとの1秒あたりの上限）を設定できます
+また、実際のアップストリームの応答を記録し（--record）、記録した応答を返す（--replay）こともできます
+
+使い方:
+    python mock_upstream_server.py --port 8765
+    （config.py の AMAZON_BASE_URL を "http://127.0.0.1:8765" に変更して実行）
+    python mock_upstream_server.py --latency 0.2 --error-rate 0.05 --max-rps 1
+    python mock_upstream_server.py --record upstream_cassette.jsonl   # 実際のアップストリームに中継して記録
+    python mock_upstream_server.py --replay upstream_cassette.jsonl   # 記録した応答を返す
+"""
+
+import argparse
+import base64
+import hashlib
+import html
+import json
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs, parse_qsl, urlencode
+
+# 検索結果ページの既定値（実際のページは数百KBあり、最初の商品リンクは先頭から離れた位置にある）
+DEFAULT_PAGE_SIZE = 600_000
+DEFAULT_ASIN_OFFSET = 120_000
+CHUNK_SIZE = 16 * 1024
+
+# パス -> エンドポイント名（エラー・レート制限・呼び出し回数はエンドポイントごとに扱う）
+ENDPOINTS = {
+    '/s': 'search',
+    '/paapi5/searchitems': 'paapi',
+    '/paapi5/getitems': 'paapi',
+    '/api-create.php': 'tinyurl',
+    '/v4/shorten': 'bitly',
+}
+
+# 記録モードで中継する実際のアップストリーム
+UPSTREAM_BASE_URLS = {
+    'search': "https://www.amazon.co.jp",
+    'paapi': "https://webservices.amazon.co.jp",
+    'tinyurl': "https://tinyurl.com",
+    'bitly': "https://api-ssl.bitly.com",
+}
+
+# 記録モードで中継しないリクエストヘッダー（接続ごとのヘッダー・圧縮）
+HOP_BY_HOP_HEADERS = {'host', 'connection', 'content-length', 'accept-encoding', 'keep-alive'}
+
+FILLER = (
+    '<div class="a-section a-spacing-none s-padding-right-small">'
+    '<span class="a-size-base a-color-secondary">Kindle版</span></div>\n'
+)
+
+
+def asin_for_keyword(keyword):
+    """
+    キーワードから決まったASINを作成（同じキーワードには常に同じASINを返す）
+    """
+    digest = hashlib.md5(keyword.encode('utf-8')).hexdigest().upper()
+    return f"B0{digest[:8]}"
+
+
+def is_missing(keyword, not_found_rate):
+    """
+    検索で見つからないキーワードか（同じキーワードは常に同じ結果になる）
+    """
+    if not not_found_rate:
+        return False
+    digest = hashlib.md5(f"missing:{keyword}".encode('utf-8')).digest()
+    return int.from_bytes(digest[:4], 'big') / 2 ** 32 < not_found_rate
+
+
+def short_code(url, length):
+    """
+    URLから決まった短縮コードを作成
+    """
+    return hashlib.sha1(url.encode('utf-8')).hexdigest()[:length]
+
+
+def make_search_page(keyword, page_size=DEFAULT_PAGE_SIZE, asin_offset=DEFAULT_ASIN_OFFSET, found=True):
+    """
+    検索結果ページのHTMLを作成
+
+    Args:
+        keyword (str): 検索キーワード
+        page_size (int): ページ全体のバイト数
+        asin_offset (int): 最初の /dp/ASIN リンクまでのバイト数
+        found (bool): 商品リンクを含めるかどうか
+
+    Returns:
+        bytes: HTML
+    """
+    head = f'<!doctype html><html><head><title>Amazon.co.jp : {keyword}</title></head><body>\n'.encode('utf-8')
+    filler = FILLER.encode('utf-8')
+    asin = asin_for_keyword(keyword)
+    # 検索結果1件（タイトル・読み放題の表示）と、結果の終わりを示す次の結果の開始タグ
+    link = (
+        f'<div data-component-type="s-search-result" data-asin="{asin}">'
+        f'<a class="a-link-normal s-no-outline" href="/dp/{asin}/ref=sr_1_1">'
+        f'<h2 class="a-size-mini"><span>{html.escape(keyword)}</span></h2></a>'
+        f'<span class="a-size-small">Kindle Unlimited 読み放題</span></div>\n'
+        f'<div data-component-type="s-search-result" data-asin="">\n'
+    ).encode('utf-8') if found else b''
+
+    before = head + filler * max(0, (asin_offset - len(head)) // len(filler))
+    body = before + link
+    body += filler * max(0, (page_size - len(body)) // len(filler))
+    return body + b'</body></html>\n'
+
+
+def make_paapi_item(asin, title):
+    """
+    PA-APIの商品データ（ItemInfo.Title と Offers.Listings のみ）
+    """
+    return {
+        'ASIN': asin,
+        'DetailPageURL': f"https://www.amazon.co.jp/dp/{asin}",
+        'ItemInfo': {'Title': {'DisplayValue': title, 'Label': 'Title', 'Locale': 'ja_JP'}},
+        'Offers': {'Listings': [{'Price': {'Amount': 0.0, 'Currency': 'JPY', 'DisplayAmount': '￥0'}}]}
+    }
+
+
+def paapi_error(code, message):
+    return {'__type': 'com.amazon.paapi5#ErrorData',
+            'Errors': [{'__type': 'com.amazon.paapi5#ErrorData', 'Code': code, 'Message': message}]}
+
+
+class Cassette:
+    def __init__(self, cassette_file):
+        """
+        アップストリームの応答の記録（1行1件のJSON）
+
+        Args:
+            cassette_file (str): 記録ファイル
+        """
+        self.cassette_file = cassette_file
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def key(method, path, body):
+        """
+        リクエストのキー（メソッド・パス・並べ替えたクエリ・本文のハッシュ）
+        """
+        parsed = urlparse(path)
+        query = urlencode(sorted(parse_qsl(parsed.query, keep_blank_values=True)))
+        return f"{method} {parsed.path}?{query} {hashlib.sha1(body).hexdigest()[:16]}"
+
+    def load(self):
+        """
+        記録ファイルを読み込み（同じキーが複数ある場合は最後の記録）
+        """
+        with open(self.cassette_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                self.entries[entry['key']] = entry
+        return self
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def record(self, key, status, content_type, body, elapsed):
+        """
+        応答を記録（本文はUTF-8のテキストならそのまま、それ以外はBase64）
+        """
+        entry = {'key': key, 'status': status, 'content_type': content_type, 'elapsed': round(elapsed, 4)}
+        try:
+            entry['body'] = body.decode('utf-8')
+        except UnicodeDecodeError:
+            entry['body_b64'] = base64.b64encode(body).decode('ascii')
+        with self.lock:
+            self.entries[key] = entry
+            with open(self.cassette_file, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        return entry
+
+    @staticmethod
+    def body(entry):
+        if 'body_b64' in entry:
+            return base64.b64decode(entry['body_b64'])
+        return entry.get('body', '').encode('utf-8')
+
+
+class MockUpstreamHandler(BaseHTTPRequestHandler):
+    # keep-aliveで接続を使い回せるようにする
+    protocol_version = 'HTTP/1.1'
+    # ヘッダーと本文を別々に送るので、Nagleアルゴリズムによる遅延を避ける
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        # ベンチマークの出力を汚さないようにアクセスログは出さない
+        pass
+
+    def do_GET(self):
+        self.handle_upstream('GET')
+
+    def do_POST(self):
+        self.handle_upstream('POST')
+
+    def handle_upstream(self, method):
+        """
+        遅延・エラー・レート制限を適用して応答（記録・再生モードでは記録した応答を使う）
+        """
+        server = self.server
+        settings = server.settings
+        parsed = urlparse(self.path)
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+
+        endpoint = ENDPOINTS.get(parsed.path)
+        if endpoint is None:
+            self.send_body(404, b'Not Found', 'text/plain')
+            return
+        server.count(endpoint)
+
+        if not server.consume(endpoint):
+            self.send_fault(endpoint, 429, {'Retry-After': '1'})
+            return
+        fault = server.inject_fault()
+        if fault:
+            self.send_fault(endpoint, fault)
+            return
+
+        cassette = server.cassette
+        if cassette is not None:
+            key = Cassette.key(method, self.path, body)
+            if settings['record']:
+                entry = self.forward(endpoint, method, body, key)
+                if entry is None:
+                    return
+            else:
+                entry = cassette.get(key)
+            if entry is not None:
+                time.sleep(entry['elapsed'] if settings['replay_timing'] else settings['latency'])
+                server.count_status(endpoint, entry['status'])
+                self.send_body(entry['status'], Cassette.body(entry), entry['content_type'])
+                return
+            server.count('replay_misses')
+
+        if settings['latency']:
+            time.sleep(settings['latency'])
+        if endpoint == 'search':
+            keyword = parse_qs(parsed.query).get('k', [''])[0]
+            server.count_status(endpoint, 200)
+            self.send_search_page(keyword)
+        elif endpoint == 'paapi':
+            self.send_paapi(parsed.path, body)
+        elif endpoint == 'tinyurl':
+            url = parse_qs(parsed.query).get('url', [''])[0]
+            server.count_status(endpoint, 200)
+            self.send_body(200, f"https://tinyurl.com/{short_code(url, 8)}".encode('utf-8'), 'text/plain')
+        else:
+            self.send_bitly(body)
+
+    def forward(self, endpoint, method, body, key):
+        """
+        実際のアップストリームに中継して応答を記録
+        """
+        base_url = self.server.settings['upstream_base_url'] or UPSTREAM_BASE_URLS[endpoint]
+        headers = {name: value for name, value in self.headers.items() if name.lower() not in HOP_BY_HOP_HEADERS}
+        request = urllib.request.Request(base_url + self.path, data=body or None, headers=headers, method=method)
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                status, content_type, content = response.status, response.headers.get('Content-Type', ''), response.read()
+        except urllib.error.HTTPError as e:
+            status, content_type, content = e.code, e.headers.get('Content-Type', ''), e.read()
+        except OSError as e:
+            self.server.count('upstream_errors')
+            self.send_body(502, f"upstream error: {e}".encode('utf-8'), 'text/plain')
+            return None
+        return self.server.cassette.record(key, status, content_type, content, time.perf_counter() - started)
+
+    def send_paapi(self, path, body):
+        """
+        PA-APIの応答（見つからない場合は実際のPA-APIと同じく404 NoResults）
+        """
+        server = self.server
+        try:
+            payload = json.loads(body or b'{}')
+        except ValueError:
+            self.send_json('paapi', 400, paapi_error('InvalidParameterValue', 'Invalid JSON.'))
+            return
+
+        not_found_rate = server.settings['not_found_rate']
+        if path == '/paapi5/getitems':
+            items = [make_paapi_item(asin, f"商品 {asin}") for asin in payload.get('ItemIds', [])
+                     if not is_missing(asin, not_found_rate)]
+            result = {'ItemsResult': {'Items': items}} if items else None
+        else:
+            keywords = payload.get('Keywords', '')
+            found = not is_missing(keywords, not_found_rate)
+            result = {'SearchResult': {
+                'Items': [make_paapi_item(asin_for_keyword(keywords), keywords)],
+                'TotalResultCount': 1,
+                'SearchURL': f"https://www.amazon.co.jp/s?k={keywords}"
+            }} if found else None
+
+        if result is None:
+            self.send_json('paapi', 404, paapi_error('NoResults', 'No results found for your request.'))
+        else:
+            self.send_json('paapi', 200, result)
+
+    def send_bitly(self, body):
+        """
+        Bitlyの応答（新しく短縮した場合は201、短縮済みのURLは200）
+        """
+        try:
+            long_url = json.loads(body or b'{}')['long_url']
+        except (ValueError, KeyError, TypeError):
+            self.send_json('bitly', 400, {'message': 'INVALID_ARG_LONG_URL'})
+            return
+        link = f"https://bit.ly/{short_code(long_url, 7)}"
+        with self.server.lock:
+            created = long_url not in self.server.shortened
+            self.server.shortened.add(long_url)
+        self.send_json('bitly', 201 if created else 200,
+                       {'id': link[len('https://'):], 'link': link, 'long_url': long_url})
+
+    def send_fault(self, endpoint, status, headers=None):
+        """
+        429・5xxエラーをアップストリームと同じ形式で返す
+        """
+        if status == 429:
+            payloads = {
+                'paapi': paapi_error('TooManyRequests', 'The request was denied due to request throttling.'),
+                'bitly': {'message': 'RATE_LIMIT_EXCEEDED'},
+            }
+        else:
+            payloads = {
+                'paapi': paapi_error('InternalFailure', 'The request processing has failed.'),
+                'bitly': {'message': 'TEMPORARILY_UNAVAILABLE'},
+            }
+        if endpoint in payloads:
+            self.send_json(endpoint, status, payloads[endpoint], headers)
+        else:
+            self.server.count_status(endpoint, status)
+            self.send_body(status, b'Service Unavailable' if status != 429 else b'Too Many Requests',
+                           'text/plain', headers)
+
+    def send_json(self, endpoint, status, payload, headers=None):
+        self.server.count_status(endpoint, status)
+        self.send_body(status, json.dumps(payload, ensure_ascii=False).encode('utf-8'),
+                       'application/json', headers)
+
+    def send_body(self, status, body, content_type, headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+
+    def send_search_page(self, keyword):
+        """
+        検索結果ページをチャンクに分けて送信（クライアントが途中で切断したら送信をやめる）
+        """
+        settings = self.server.settings
+        body = make_search_page(keyword, settings['page_size'], settings['asin_offset'],
+                                found=not is_missing(keyword, settings['not_found_rate']))
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+
+        try:
+            for start in range(0, len(body), CHUNK_SIZE):
+                self.wfile.write(body[start:start + CHUNK_SIZE])
+                self.server.bytes_sent += min(CHUNK_SIZE, len(body) - start)
+                if settings['chunk_delay']:
+                    time.sleep(settings['chunk_delay'])
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+
+
+class MockHTTPServer(ThreadingHTTPServer):
+    # 同時接続数の多いベンチマークで接続待ちが溢れないようにする
+    request_queue_size = 128
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # 検索結果ページを途中で打ち切ったクライアントの切断は表示しない
+        if isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)):
+            return
+        super().handle_error(request, client_address)
+
+
+class UpstreamHTTPServer(MockHTTPServer):
+    def count(self, name):
+        with self.lock:
+            self.calls[name] += 1
+
+    def count_status(self, endpoint, status):
+        with self.lock:
+            self.statuses[f"{endpoint}:{status}"] += 1
+
+    def consume(self, endpoint):
+        """
+        エンドポイントごとの1秒あたりの上限を1回分消費（上限を超えた場合はFalse）
+        """
+        max_rps = self.settings['max_rps']
+        if not max_rps:
+            return True
+        now = time.monotonic()
+        with self.lock:
+            window = self.windows.setdefault(endpoint, deque())
+            while window and window[0] <= now - 1.0:
+                window.popleft()
+            if len(window) >= max_rps:
+                return False
+            window.append(now)
+        return True
+
+    def inject_fault(self):
+        """
+        設定した割合で429・503を返す
+
+        Returns:
+            int: 返すステータス（エラーにしない場合はNone）
+        """
+        with self.lock:
+            draw = self.rng.random()
+        if draw < self.settings['throttle_rate']:
+            return 429
+        if draw < self.settings['throttle_rate'] + self.settings['error_rate']:
+            return 503
+        return None
+
+
+class MockUpstreamServer:
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, chunk_delay=0.0,
+                 page_size=DEFAULT_PAGE_SIZE, asin_offset=DEFAULT_ASIN_OFFSET,
+                 error_rate=0.0, throttle_rate=0.0, max_rps=0, not_found_rate=0.0, seed=0,
+                 record_file=None, replay_file=None, replay_timing=True, upstream_base_url=None):
+        """
+        代替サーバーの初期化
+
+        Args:
+            host (str): 待ち受けアドレス
+            port (int): 待ち受けポート（0の場合は空いているポート）
+            latency (float): 応答開始までの遅延（秒）
+            chunk_delay (float): チャンクごとの送信遅延（秒、回線速度の模擬）
+            page_size (int): 検索結果ページのバイト数
+            asin_offset (int): 最初の商品リンクまでのバイト数
+            error_rate (float): 503エラーを返す割合（0〜1）
+            throttle_rate (float): 429を返す割合（0〜1）
+            max_rps (int): エンドポイントごとの1秒あたりのリクエスト数の上限（超えたら429、0の場合は制限なし）
+            not_found_rate (float): 検索で見つからないキーワードの割合（0〜1）
+            seed: エラーの乱数のシード
+            record_file (str): 実際のアップストリームに中継して応答を記録するファイル
+            replay_file (str): 記録した応答を返すファイル（記録にないリクエストは模擬した応答）
+            replay_timing (bool): 記録した応答を返すときに記録時の応答時間だけ待つかどうか
+                                  （Falseの場合は latency だけ待つ）
+            upstream_base_url (str): 記録モードの中継先（Noneの場合はエンドポイントごとの実際のアップストリーム）
+        """
+        self.httpd = UpstreamHTTPServer((host, port), MockUpstreamHandler)
+        self.httpd.settings = {
+            'latency': latency,
+            'chunk_delay': chunk_delay,
+            'page_size': page_size,
+            'asin_offset': asin_offset,
+            'error_rate': error_rate,
+            'throttle_rate': throttle_rate,
+            'max_rps': max_rps,
+            'not_found_rate': not_found_rate,
+            'record': bool(record_file),
+            'replay_timing': replay_timing,
+            'upstream_base_url': upstream_base_url
+        }
+        self.httpd.bytes_sent = 0
+        self.httpd.lock = threading.Lock()
+        self.httpd.rng = random.Random(seed)
+        self.httpd.windows = {}
+        self.httpd.shortened = set()
+        self.httpd.cassette = None
+        if record_file:
+            self.httpd.cassette = Cassette(record_file)
+        elif replay_file:
+            self.httpd.cassette = Cassette(replay_file).load()
+        self.reset_stats()
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def bytes_sent(self):
+        return self.httpd.bytes_sent
+
+    def reset_stats(self):
+        """
+        呼び出し回数・ステータスの集計を空にする
+        """
+        with self.httpd.lock:
+            self.httpd.calls = Counter()
+            self.httpd.statuses = Counter()
+
+    def stats(self):
+        """
+        エンドポイントごとの呼び出し回数（'search' など）と 'エンドポイント:ステータス' ごとの回数
+        """
+        with self.httpd.lock:
+            return {'calls': dict(self.httpd.calls), 'statuses': dict(self.httpd.statuses)}
+
+    def start(self):
+        """
+        バックグラウンドのスレッドでサーバーを起動
+        """
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """
+        サーバーを停止
+        """
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ローカルの代替アップストリームサーバー（ベンチマーク用）")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help="応答開始までの遅延（秒）")
+    parser.add_argument('--chunk-delay', type=float, default=0.0, help="16KBごとの送信遅延（秒）")
+    parser.add_argument('--page-size', type=int, default=DEFAULT_PAGE_SIZE, help="検索結果ページのバイト数")
+    parser.add_argument('--asin-offset', type=int, default=DEFAULT_ASIN_OFFSET, help="最初の商品リンクまでのバイト数")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="503エラーを返す割合（0〜1）")
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help="429を返す割合（0〜1）")
+    parser.add_argument('--max-rps', type=int, default=0, help="エンドポイントごとの1秒あたりのリクエスト数の上限")
+    parser.add_argument('--not-found-rate', type=float, default=0.0, help="検索で見つからないキーワードの割合（0〜1）")
+    parser.add_argument('--seed', type=int, default=0, help="エラーの乱数のシード")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--record', metavar='FILE', help="実際のアップストリームに中継して応答を記録")
+    group.add_argument('--replay', metavar='FILE', help="記録した応答を返す")
+    parser.add_argument('--upstream', help="記録モードの中継先（省略時は実際のアップストリーム）")
+    args = parser.parse_args()
+
+    server = MockUpstreamServer(args.host, args.port, args.latency, args.chunk_delay,
+                                args.page_size, args.asin_offset,
+                                error_rate=args.error_rate, throttle_rate=args.throttle_rate,
+                                max_rps=args.max_rps, not_found_rate=args.not_found_rate, seed=args.seed,
+                                record_file=args.record, replay_file=args.replay,
+                                upstream_base_url=args.upstream)
+    print(f"代替サーバー起動: {server.base_url}（Ctrl+Cで停止）")
+    if args.record:
+        print(f"応答を記録: {args.record}")
+    elif args.replay:
+        print(f"記録した応答を再生: {args.replay}（{len(server.httpd.cassette.entries)}件）")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        print("\n代替サーバーを停止します")
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""
+複数アカウントの投稿エンジン
+1つのプロセスで複数のアカウント（ジャンルごとのカタログ・履歴・テンプレート・投稿数）を扱います
+カタログの解析結果とX APIクライアントはアカウント間で共有し、投稿の予定は1つのイベントループで管理します
+
+アカウントは設定ファイルの ACCOUNT_PROFILES に追加します:
+    ACCOUNT_PROFILES = [
+        {'name': 'biz', 'env_prefix': 'X_BIZ_', 'CSV_FILE': 'kindle_unlimited_biz_10_with_links.csv'},
+        {'name': 'novel', 'env_prefix': 'X_NOVEL_', 'CSV_FILE': 'novel_with_links.csv', 'POSTS_PER_DAY': 5},
+    ]
+
+使い方:
+    python multi_account_engine.py            # 全アカウントの投稿判定を1回実行（GitHub Actions用）
+    python multi_account_engine.py --daemon   # 常駐モード
+"""
+
+import argparse
+import asyncio
+import signal
+import threading
+from datetime import datetime
+
+import x_posting_bot_advanced as bot_module
+from x_posting_bot_advanced import ACCOUNT_PROFILES, XPostingBotAdvanced, create_x_client
+from posting_planner import jst_now
+
+
+class XClientPool:
+    """
+    X APIクライアントのプール（同じ認証情報のアカウントは1つのクライアント・レート制限の記録を共有する）
+    """
+    def __init__(self):
+        self.clients = {}
+        self.lock = threading.Lock()
+
+    def get(self, credentials):
+        """
+        認証情報に対応するクライアントを取得（初回のみ作成、ネットワークにはアクセスしない）
+        """
+        with self.lock:
+            client = self.clients.get(credentials)
+            if client is None:
+                client = create_x_client(credentials)
+                self.clients[credentials] = client
+            return client
+
+
+class MultiAccountEngine:
+    def __init__(self, profiles=None):
+        """
+        複数アカウントの投稿エンジンの初期化
+
+        Args:
+            profiles (list): アカウント設定のリスト（Noneの場合は ACCOUNT_PROFILES、
+                             空の場合は設定ファイルの値だけを使う1アカウント）
+        """
+        profiles = ACCOUNT_PROFILES if profiles is None else profiles
+        self.client_pool = XClientPool()
+        self.bots = [XPostingBotAdvanced(profile, client_pool=self.client_pool)
+                     for profile in (profiles or [None])]
+        self.stop_event = None
+        self.reload_requested = False
+
+    async def run_once_async(self):
+        """
+        全アカウントの投稿判定・投稿を並行して1回実行
+        """
+        async def run_account(bot):
+            if await asyncio.to_thread(bot.should_post_now):
+                return await asyncio.to_thread(bot.schedule_random_posts)
+            bot_module.metrics.inc('skips')
+            return False
+
+        return await asyncio.gather(*(run_account(bot) for bot in self.bots))
+
+    def run_once(self):
+        """
+        全アカウントの投稿判定・投稿を1回実行（GitHub Actions用）
+
+        Returns:
+            list: アカウントごとの投稿結果
+        """
+        try:
+            results = asyncio.run(self.run_once_async())
+        finally:
+            bot_module.save_metrics()
+        for bot, posted in zip(self.bots, results):
+            print(f"{bot.account_name or 'default'}: {'投稿しました' if posted else '投稿スキップ'}")
+        return results
+
+    async def wait_until(self, target):
+        """
+        指定時刻（日本時間）まで待機（終了・再読み込みの要求で中断）
+
+        Returns:
+            bool: 指定時刻に達した場合True
+        """
+        while not (self.stop_event.is_set() or self.reload_requested):
+            remaining = (target - jst_now()).total_seconds()
+            if remaining <= 0:
+                return True
+            try:
+                await asyncio.wait_for(self.stop_event.wait(),
+                                       timeout=min(remaining, bot_module.DAEMON_MAX_SLEEP_SECONDS))
+            except asyncio.TimeoutError:
+                pass
+        return False
+
+    async def run_account(self, bot):
+        """
+        1アカウント分の常駐処理（予定時刻まで待機して投稿を繰り返す）
+        """
+        while not self.stop_event.is_set():
+            next_time = bot.get_next_posting_time(jst_now())
+            bot.logger.info("次の投稿予定: %s（日本時間）", next_time.strftime('%Y-%m-%d %H:%M'))
+
+            if await self.wait_until(next_time):
+                # 投稿（XPostClient.post）は内部で asyncio.run を使う同期呼び出しで、このイベントループ内では呼び出せないためスレッドで実行する
+                await asyncio.to_thread(bot.post_if_due, jst_now())
+                bot_module.save_metrics()
+            elif self.reload_requested:
+                # 再読み込みが終わるまで待つ
+                await asyncio.sleep(0.1)
+
+    async def reload(self):
+        """
+        設定ファイルを再読み込みして全アカウントに反映（アカウントの追加・削除は再起動が必要）
+        """
+        import importlib
+        import sys
+
+        try:
+            config = importlib.reload(sys.modules[bot_module.CONFIG_MODULE])
+            profiles = getattr(config, 'ACCOUNT_PROFILES', [])
+        except Exception as e:
+            print(f"設定ファイル再読み込みエラー: {e}")
+            profiles = []
+
+        by_name = {profile.get('name'): profile for profile in profiles}
+        for bot in self.bots:
+            await asyncio.to_thread(bot.reload_config, by_name.get(bot.account_name))
+        self.reload_requested = False
+
+    async def serve(self):
+        """
+        全アカウントを1つのイベントループで常駐実行
+        """
+        loop = asyncio.get_running_loop()
+        self.stop_event = asyncio.Event()
+
+        def request_reload():
+            self.reload_requested = True
+            loop.create_task(self.reload())
+
+        loop.add_signal_handler(signal.SIGTERM, self.stop_event.set)
+        loop.add_signal_handler(signal.SIGINT, self.stop_event.set)
+        if hasattr(signal, 'SIGHUP'):
+            loop.add_signal_handler(signal.SIGHUP, request_reload)
+
+        # 起動時に一度だけ認証とカタログの読み込みを行う（同じCSV・認証情報は共有される）
+        for bot in self.bots:
+            await asyncio.to_thread(bot.ensure_x_client)
+            await asyncio.to_thread(bot.load_csv_data)
+
+        print(f"複数アカウント常駐モード開始: {len(self.bots)}アカウント（SIGTERMで終了、SIGHUPで設定再読み込み）")
+        await asyncio.gather(*(self.run_account(bot) for bot in self.bots))
+
+        for bot in self.bots:
+            bot.print_stats()
+        bot_module.save_metrics()
+        print("複数アカウント常駐モード終了")
+
+    def run_daemon(self):
+        """
+        常駐モードで実行
+        """
+        asyncio.run(self.serve())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="複数アカウントの投稿エンジン")
+    parser.add_argument('--daemon', action='store_true', help="常駐モードで実行")
+    args = parser.parse_args()
+
+    print("X投稿BOT 複数アカウント版")
+    print("=" * 60)
+    print(f"実行時刻: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+
+    engine = MultiAccountEngine()
+    if args.daemon:
+        engine.run_daemon()
+    else:
+        engine.run_once()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,306 @@
+"""
+投稿台帳（追記専用）
+1投稿につき1行のJSON（JSON Lines）を追記し、ファイル全体の書き直しは行いません
+今日の投稿はファイル末尾から読み込んで、メモリ上の索引で判定します
+
+使い方:
+    python posting_ledger.py                   # 台帳の概要を表示
+    python posting_ledger.py --compact 400     # 400日より前の記録をアーカイブに移動
+"""
+
+import argparse
+import json
+import os
+from datetime import datetime, timedelta
+
+# 末尾から読み込むときのブロックサイズ
+READ_BLOCK_SIZE = 64 * 1024
+
+
+def today_str(now=None):
+    """
+    投稿履歴の日付（YYYY-MM-DD）
+    """
+    return (now or datetime.now()).strftime('%Y-%m-%d')
+
+
+def parse_line(line):
+    """
+    台帳の1行を解析（壊れた行・途中まで書かれた行はNone）
+    """
+    try:
+        entry = json.loads(line)
+    except ValueError:
+        return None
+    if not isinstance(entry, dict) or 'date' not in entry or 'no' not in entry:
+        return None
+    return entry
+
+
+class PostingLedger:
+    def __init__(self, ledger_file, legacy_history_file=None):
+        """
+        投稿台帳の初期化
+
+        Args:
+            ledger_file (str): 台帳ファイルパス（JSON Lines）
+            legacy_history_file (str): 従来の投稿履歴ファイル（posting_history.json）
+                                       指定した場合、台帳にない投稿を取り込む
+        """
+        self.ledger_file = ledger_file
+        self.legacy_history_file = legacy_history_file
+        # 日付ごとの投稿の索引（日付 -> {No -> 台帳の行}、読み込んだ日付のみ）
+        self.indexes = {}
+
+    def read_since(self, date):
+        """
+        指定日以降の記録を末尾から読み込む（台帳は日付順に追記されるので古い日付に達したら終了）
+
+        Args:
+            date (str): 日付（YYYY-MM-DD）
+
+        Returns:
+            list: 台帳の行（古い順）
+        """
+        if not os.path.exists(self.ledger_file):
+            return []
+
+        entries = []
+        with open(self.ledger_file, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            position = f.tell()
+            remainder = b''
+            done = False
+
+            while position > 0 and not done:
+                size = min(READ_BLOCK_SIZE, position)
+                position -= size
+                f.seek(position)
+                lines = (f.read(size) + remainder).split(b'\n')
+                # 先頭の行はブロックの途中から始まっている可能性があるので次のブロックに回す
+                remainder = lines.pop(0) if position > 0 else b''
+
+                for line in reversed(lines):
+                    entry = parse_line(line) if line.strip() else None
+                    if entry is None:
+                        continue
+                    if entry['date'] < date:
+                        done = True
+                        break
+                    entries.append(entry)
+
+        entries.reverse()
+        return entries
+
+    def iter_entries(self):
+        """
+        台帳のすべての記録を古い順に返す
+        """
+        if not os.path.exists(self.ledger_file):
+            return
+        with open(self.ledger_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                entry = parse_line(line) if line.strip() else None
+                if entry is not None:
+                    yield entry
+
+    def load(self, date=None):
+        """
+        指定日（省略時は今日）以降の投稿の索引を作成
+
+        Returns:
+            dict: 指定日の投稿（No -> 台帳の行）
+        """
+        date = date or today_str()
+        indexes = {date: {}}
+        for entry in self.read_since(date):
+            indexes.setdefault(entry['date'], {})[entry['no']] = entry
+        self.indexes.update(indexes)
+
+        if self.legacy_history_file:
+            self.import_legacy_history(date)
+        return self.indexes[date]
+
+    def posted_on(self, date=None):
+        """
+        指定日（省略時は今日）の投稿（索引がない日付の場合のみ台帳から読み込む）
+
+        Returns:
+            dict: No -> 台帳の行
+        """
+        date = date or today_str()
+        index = self.indexes.get(date)
+        if index is None:
+            index = self.load(date)
+        return index
+
+    def count_on(self, date=None):
+        """
+        指定日（省略時は今日）の投稿数
+        """
+        return len(self.posted_on(date))
+
+    def _needs_newline(self):
+        """
+        台帳の末尾が改行で終わっていないか（書き込み途中で止まった場合）
+        """
+        try:
+            with open(self.ledger_file, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                return f.read(1) != b'\n'
+        except OSError:
+            return False
+
+    def append(self, no, tweet_id=None, template=None, when=None, **extra):
+        """
+        投稿を台帳に追記（ファイル末尾に1行書くだけなので履歴の長さに関係なく一定の時間で終わる）
+
+        Args:
+            no (int): 投稿したカタログのNo
+            tweet_id (str): ツイートID（テストモードではNone）
+            template (int): 使用した投稿テンプレートの番号
+            when (datetime): 投稿日時（Noneの場合は現在時刻）
+            **extra: 追加で記録する項目
+
+        Returns:
+            dict: 追記した行
+        """
+        when = when or datetime.now()
+        entry = {
+            'ts': when.isoformat(timespec='seconds'),
+            'date': today_str(when),
+            'no': int(no),
+            'tweet_id': tweet_id,
+            'template': template
+        }
+        entry.update(extra)
+
+        line = json.dumps(entry, ensure_ascii=False) + '\n'
+        if self._needs_newline():
+            line = '\n' + line
+        with open(self.ledger_file, 'a', encoding='utf-8') as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+
+        # 読み込み済みの日付の索引だけを更新する（未読み込みの日付は posted_on() で台帳から読む）
+        index = self.indexes.get(entry['date'])
+        if index is not None:
+            index[entry['no']] = entry
+        return entry
+
+    def import_legacy_history(self, date):
+        """
+        従来の投稿履歴ファイルから、台帳にない投稿を取り込む
+        （台帳がまだない場合はすべて、ある場合は指定日の投稿のみ）
+
+        Returns:
+            int: 取り込んだ件数
+        """
+        if not os.path.exists(self.legacy_history_file):
+            return 0
+        try:
+            with open(self.legacy_history_file, 'r', encoding='utf-8') as f:
+                history = json.load(f)
+        except Exception:
+            return 0
+
+        first_import = not os.path.exists(self.ledger_file)
+        index = self.indexes.get(date, {})
+        imported = 0
+        for index_str, post_date in sorted(history.items(), key=lambda item: item[1]):
+            try:
+                no = int(index_str)
+            except ValueError:
+                continue
+            if not first_import and post_date != date:
+                continue
+            if post_date == date and no in index:
+                continue
+            when = datetime.strptime(post_date, '%Y-%m-%d')
+            self.append(no, when=when, migrated=True)
+            imported += 1
+        return imported
+
+    def remove_date(self, date):
+        """
+        指定日の記録を削除（投稿履歴のリセット用、台帳を書き直す）
+
+        Returns:
+            int: 削除した件数
+        """
+        if not os.path.exists(self.ledger_file):
+            return 0
+
+        removed = 0
+        tmp_file = f"{self.ledger_file}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as out:
+            for entry in self.iter_entries():
+                if entry['date'] == date:
+                    removed += 1
+                    continue
+                out.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        os.replace(tmp_file, self.ledger_file)
+
+        self.indexes.pop(date, None)
+        return removed
+
+    def compact(self, keep_days, archive_file=None, now=None):
+        """
+        台帳を圧縮（壊れた行を取り除き、keep_days日より前の記録をアーカイブに移動）
+
+        Args:
+            keep_days (int): 台帳に残す日数
+            archive_file (str): アーカイブファイル（Noneの場合は 台帳名 + .archive）
+
+        Returns:
+            dict: {'kept', 'archived', 'dropped'}
+        """
+        result = {'kept': 0, 'archived': 0, 'dropped': 0}
+        if not os.path.exists(self.ledger_file):
+            return result
+
+        archive_file = archive_file or f"{self.ledger_file}.archive"
+        cutoff = today_str((now or datetime.now()) - timedelta(days=keep_days))
+        tmp_file = f"{self.ledger_file}.tmp"
+
+        with open(self.ledger_file, 'r', encoding='utf-8') as f, \
+                open(tmp_file, 'w', encoding='utf-8') as out, \
+                open(archive_file, 'a', encoding='utf-8') as archive:
+            for line in f:
+                entry = parse_line(line) if line.strip() else None
+                if entry is None:
+                    result['dropped'] += bool(line.strip())
+                    continue
+                target = archive if entry['date'] < cutoff else out
+                target.write(json.dumps(entry, ensure_ascii=False) + '\n')
+                result['archived' if target is archive else 'kept'] += 1
+        os.replace(tmp_file, self.ledger_file)
+        return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="投稿台帳")
+    parser.add_argument('--file', default="posting_ledger.jsonl", help="台帳ファイル")
+    parser.add_argument('--compact', type=int, metavar='DAYS', help="指定日数より前の記録をアーカイブに移動")
+    args = parser.parse_args()
+
+    ledger = PostingLedger(args.file)
+    if args.compact is not None:
+        result = ledger.compact(args.compact)
+        print(f"台帳を圧縮しました: 残した記録 {result['kept']}件, "
+              f"アーカイブ {result['archived']}件, 壊れた行 {result['dropped']}件")
+        return
+
+    dates = {}
+    for entry in ledger.iter_entries():
+        dates[entry['date']] = dates.get(entry['date'], 0) + 1
+    print(f"台帳: {args.file}")
+    print(f"記録: {sum(dates.values())}件, {len(dates)}日分")
+    if dates:
+        print(f"期間: {min(dates)} 〜 {max(dates)}")
+    print(f"今日の投稿: {ledger.count_on()}件")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+"""
+1日の投稿計画
+投稿時間内に POSTS_PER_DAY 件の投稿時刻（スロット）を1日1回だけ作成して保存し、
+毎時の実行では「今の時刻までに未投稿のスロットがあるか」だけを判定します
+
+使い方:
+    python posting_planner.py                      # 今日の投稿計画を表示
+    python posting_planner.py --simulate 10000     # 確率判定との比較シミュレーション
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+from datetime import datetime, timedelta, timezone
+
+JST = timezone(timedelta(hours=9))
+
+PLAN_VERSION = 1
+
+
+def jst_now():
+    """
+    現在の日本時間（タイムゾーン情報なし）
+    """
+    return datetime.now(JST).replace(tzinfo=None)
+
+
+def plan_fingerprint(posting_hours, posts_per_day, interval_min, seed):
+    """
+    投稿計画の作成条件のハッシュ（設定が変わった場合に計画を作り直す）
+    """
+    key = json.dumps([PLAN_VERSION, list(posting_hours), posts_per_day, list(interval_min), seed])
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()[:12]
+
+
+def build_daily_plan(date_str, posting_hours, posts_per_day, interval_min, seed=""):
+    """
+    1日分の投稿スロットを作成（同じ日付・条件・シードからは常に同じ計画になる）
+
+    投稿時間は毎時実行（cron）で必ず拾えるように、開始時0分〜終了時0分の範囲に置く
+    スロットの間隔は POSTING_INTERVAL_MIN の範囲の乱数で、範囲に収まらない場合は
+    最小間隔を守ったまま詰める
+
+    Args:
+        date_str (str): 日付（YYYY-MM-DD、日本時間）
+        posting_hours (tuple): 投稿時間（開始時, 終了時）
+        posts_per_day (int): 1日の投稿数
+        interval_min (tuple): 投稿間隔（最小分, 最大分）
+        seed (str): シード
+
+    Returns:
+        dict: {'date', 'fingerprint', 'slots': 0時からの経過分のリスト（昇順）}
+    """
+    rng = random.Random(f"{seed}:{date_str}")
+    window_start = posting_hours[0] * 60
+    window = max(0, (posting_hours[1] - posting_hours[0]) * 60)
+    min_gap, max_gap = interval_min
+    slots = []
+
+    if posts_per_day > 0:
+        gaps_count = posts_per_day - 1
+        if gaps_count and gaps_count * min_gap > window:
+            # 最小間隔では収まらない場合は均等に並べる
+            min_gap = max_gap = window / gaps_count
+
+        gaps = [rng.uniform(min_gap, max_gap) for _ in range(gaps_count)]
+        total = sum(gaps)
+        if total > window:
+            # 最小間隔を超える部分だけを縮めて投稿時間内に収める
+            floor = gaps_count * min_gap
+            scale = (window - floor) / (total - floor) if total > floor else 0.0
+            gaps = [min_gap + (gap - min_gap) * scale for gap in gaps]
+            total = sum(gaps)
+
+        offset = window_start + rng.uniform(0, max(0.0, window - total))
+        slots.append(offset)
+        for gap in gaps:
+            slots.append(slots[-1] + gap)
+
+    return {
+        'date': date_str,
+        'fingerprint': plan_fingerprint(posting_hours, posts_per_day, interval_min, seed),
+        'slots': [min(window_start + window, int(slot)) for slot in slots]
+    }
+
+
+def load_daily_plan(plan_file, date_str, posting_hours, posts_per_day, interval_min, seed=""):
+    """
+    保存済みの投稿計画を読み込み（日付・条件が違う場合は作り直して保存）
+
+    Returns:
+        dict: 投稿計画
+    """
+    fingerprint = plan_fingerprint(posting_hours, posts_per_day, interval_min, seed)
+    if os.path.exists(plan_file):
+        try:
+            with open(plan_file, 'r', encoding='utf-8') as f:
+                plan = json.load(f)
+            if plan.get('date') == date_str and plan.get('fingerprint') == fingerprint:
+                return plan
+        except Exception:
+            pass
+
+    plan = build_daily_plan(date_str, posting_hours, posts_per_day, interval_min, seed)
+    save_daily_plan(plan_file, plan)
+    return plan
+
+
+def save_daily_plan(plan_file, plan):
+    """
+    投稿計画を保存（一時ファイルに書いてから置き換え）
+    """
+    tmp_file = f"{plan_file}.tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(plan, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_file, plan_file)
+
+
+def format_slot(minutes):
+    """
+    0時からの経過分を HH:MM に変換
+    """
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def decide_from_plan(plan, now_minutes, today_posts, posts_per_day):
+    """
+    投稿計画から今投稿するかどうかを判定（今日の投稿数番目のスロットだけを見るのでO(1)）
+
+    Args:
+        plan (dict): 投稿計画
+        now_minutes (int): 現在時刻（日本時間、0時からの経過分）
+        today_posts (int): 今日の投稿数
+        posts_per_day (int): 1日の投稿上限
+
+    Returns:
+        dict: x_posting_bot_advanced.decide_posting と同じ形式の判定結果
+            'reason' は 'limit' / 'plan'（'post' がFalseの場合は 'next_slot' に次の時刻）
+    """
+    slots = plan['slots']
+    decision = {
+        'post': False,
+        'reason': 'plan',
+        'jst_hour': now_minutes // 60,
+        'today_posts': today_posts,
+        'remaining_posts': max(0, posts_per_day - today_posts),
+        'probability': 0.0,
+        'next_slot': None
+    }
+
+    if today_posts >= posts_per_day or today_posts >= len(slots):
+        decision['reason'] = 'limit'
+        return decision
+
+    next_slot = slots[today_posts]
+    decision['next_slot'] = format_slot(next_slot)
+    decision['post'] = now_minutes >= next_slot
+    decision['probability'] = 1.0 if decision['post'] else 0.0
+    return decision
+
+
+def next_slot_time(plan, today_posts, now):
+    """
+    次に投稿するスロットの時刻（今日のスロットを使い切った場合はNone）
+
+    Args:
+        plan (dict): 投稿計画
+        today_posts (int): 今日の投稿数
+        now (datetime): 現在時刻（日本時間）
+    """
+    if today_posts >= len(plan['slots']):
+        return None
+    slot = plan['slots'][today_posts]
+    return now.replace(hour=slot // 60, minute=slot % 60, second=0, microsecond=0)
+
+
+def simulate(days, posting_hours, posts_per_day, interval_min,
+             min_probability, max_probability, seed="", run_minute=0):
+    """
+    毎時実行（cron）を想定して、投稿計画と確率判定の1日あたりの投稿数を比較
+
+    Args:
+        days (int): シミュレーションする日数
+        run_minute (int): 毎時の実行時刻（分）
+
+    Returns:
+        dict: 'plan' / 'probability' -> {'average', 'min', 'target_days', 'days'}
+    """
+    # 確率判定の計算は投稿BOTと同じものを使う（日本時間の時をUTCに戻して渡す）
+    from x_posting_bot_advanced import decide_posting
+
+    rng = random.Random(f"{seed}:simulate")
+    start = datetime(2000, 1, 1)
+    results = {'plan': [], 'probability': []}
+    run_hours = range(posting_hours[0], posting_hours[1] + 1)
+
+    for day in range(days):
+        date_str = (start + timedelta(days=day)).strftime('%Y-%m-%d')
+        plan = build_daily_plan(date_str, posting_hours, posts_per_day, interval_min, seed)
+
+        planned = 0
+        probabilistic = 0
+        for hour in run_hours:
+            if decide_from_plan(plan, hour * 60 + run_minute, planned, posts_per_day)['post']:
+                planned += 1
+            decision = decide_posting((hour - 9) % 24, posting_hours, posts_per_day, probabilistic,
+                                      min_probability, max_probability, roll=rng.random())
+            if decision['post']:
+                probabilistic += 1
+
+        results['plan'].append(planned)
+        results['probability'].append(probabilistic)
+
+    return {
+        name: {
+            'average': sum(counts) / len(counts),
+            'min': min(counts),
+            'target_days': sum(1 for count in counts if count >= posts_per_day),
+            'days': len(counts)
+        }
+        for name, counts in results.items()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="1日の投稿計画")
+    parser.add_argument('--simulate', type=int, metavar='DAYS', help="指定日数のシミュレーションを実行")
+    parser.add_argument('--date', help="投稿計画を表示する日付（YYYY-MM-DD、省略時は今日）")
+    args = parser.parse_args()
+
+    import x_posting_bot_advanced as bot
+
+    if args.simulate:
+        result = simulate(args.simulate, bot.POSTING_HOURS, bot.POSTS_PER_DAY, bot.POSTING_INTERVAL_MIN,
+                          bot.MIN_POSTING_PROBABILITY, bot.MAX_POSTING_PROBABILITY, bot.POSTING_PLAN_SEED)
+        print(f"シミュレーション: {args.simulate}日, 目標 {bot.POSTS_PER_DAY}件/日")
+        print("-" * 50)
+        for name, label in (('plan', '投稿計画'), ('probability', '確率判定')):
+            stats = result[name]
+            print(f"{label}: 平均 {stats['average']:.2f}件/日, 最少 {stats['min']}件, "
+                  f"目標達成 {stats['target_days']}/{stats['days']}日 ({stats['target_days'] / stats['days'] * 100:.1f}%)")
+        return
+
+    date_str = args.date or jst_now().strftime('%Y-%m-%d')
+    plan = build_daily_plan(date_str, bot.POSTING_HOURS, bot.POSTS_PER_DAY,
+                            bot.POSTING_INTERVAL_MIN, bot.POSTING_PLAN_SEED)
+    print(f"{date_str} の投稿計画（日本時間）:")
+    for number, slot in enumerate(plan['slots'], 1):
+        print(f"  {number}. {format_slot(slot)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+"""
+レート制限ユーティリティ
+アップストリーム（PA-API、スクレイピング、TinyURL、Bitly）ごとに
+トークンバケット方式でリクエスト数を制限します
+
+AdaptiveRateLimiter は応答に合わせて1秒あたりのリクエスト数を調整します（AIMD）
+- 成功が続いたら上げる（最初の制限に当たるまでは倍々、その後は一定量ずつ）
+- 429/503（CAPTCHAなどで商品リンクのないページも含む）が返ったら半分に下げる
+学習したレートは AdaptiveRateStore でファイルに保存し、次の実行で引き継ぎます
+"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity=1):
+        """
+        トークンバケットの初期化
+
+        Args:
+            rate (float): 1秒あたりに補充されるトークン数（リクエスト数/秒）
+            capacity (int): バケット容量（連続して送信できるリクエスト数）
+        """
+        self.rate = float(rate)
+        self.capacity = max(1, int(capacity))
+        self.tokens = float(self.capacity)
+        self.last_refill = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        """
+        経過時間に応じてトークンを補充（ロック取得済みで呼び出すこと）
+        """
+        now = time.monotonic()
+        elapsed = now - self.last_refill
+        self.last_refill = now
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+
+    def acquire(self, tokens=1):
+        """
+        トークンを取得できるまで待機
+
+        Args:
+            tokens (int): 消費するトークン数
+
+        Returns:
+            float: 待機した秒数
+        """
+        if self.rate <= 0:
+            return 0.0
+
+        waited = 0.0
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return waited
+                # 不足分が補充されるまでの時間
+                wait_time = (tokens - self.tokens) / self.rate
+
+            time.sleep(wait_time)
+            waited += wait_time
+
+    async def acquire_async(self, tokens=1):
+        """
+        トークンを取得できるまで待機（asyncio用、イベントループをブロックしない）
+
+        Args:
+            tokens (int): 消費するトークン数
+
+        Returns:
+            float: 待機した秒数
+        """
+        if self.rate <= 0:
+            return 0.0
+
+        waited = 0.0
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return waited
+                wait_time = (tokens - self.tokens) / self.rate
+
+            await asyncio.sleep(wait_time)
+            waited += wait_time
+
+    def record_success(self):
+        """
+        リクエストの成功を記録（固定レートでは何もしない）
+        """
+
+    def record_throttle(self):
+        """
+        アップストリームの制限（429/503など）を記録（固定レートでは何もしない）
+        """
+
+
+class AdaptiveRateLimiter(TokenBucket):
+    def __init__(self, rate, min_rate, max_rate, increase=None, decrease=0.5, success_window=5,
+                 slow_start=True, capacity=1):
+        """
+        応答に合わせてレートを調整するトークンバケットの初期化
+
+        Args:
+            rate (float): 最初の1秒あたりのリクエスト数
+            min_rate (float): 下げる場合の下限
+            max_rate (float): 上げる場合の上限
+            increase (float): 成功が続いた場合に上げる量（省略時は最初のレートの1/4）
+            decrease (float): 制限に当たった場合に掛ける係数
+            success_window (int): レートを上げるまでに続けて成功する回数
+            slow_start (bool): 最初の制限に当たるまで倍々で上げるかどうか
+            capacity (int): バケット容量
+        """
+        self.min_rate = float(min_rate)
+        self.max_rate = max(float(max_rate), self.min_rate)
+        super().__init__(min(max(float(rate), self.min_rate), self.max_rate), capacity)
+        self.increase = float(increase) if increase else self.rate / 4
+        self.decrease = decrease
+        self.success_window = max(1, int(success_window))
+        self.slow_start = slow_start
+        self.successes = 0
+        self.throttles = 0
+        # 下げた直後の応答（下げる前に送ったリクエスト）で続けて下げないようにする
+        self.last_decrease = 0.0
+
+    def record_success(self):
+        """
+        成功が success_window 回続いたらレートを上げる
+        """
+        with self.lock:
+            self.successes += 1
+            if self.successes < self.success_window:
+                return
+            self.successes = 0
+            self._refill()
+            if self.slow_start:
+                self.rate = min(self.max_rate, self.rate * 2)
+            else:
+                self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def record_throttle(self):
+        """
+        制限に当たったらレートを下げ、バケットを空にする
+        """
+        with self.lock:
+            self.throttles += 1
+            self.successes = 0
+            self.slow_start = False
+            now = time.monotonic()
+            if now - self.last_decrease < max(1.0, 1.0 / self.rate):
+                return
+            self.last_decrease = now
+            self._refill()
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+            self.tokens = min(self.tokens, 0.0)
+
+
+class AdaptiveRateStore:
+    def __init__(self, state_file, max_multiplier=10.0, min_rate=0.1):
+        """
+        学習したレートの保存先
+
+        Args:
+            state_file (str): 保存するファイル（JSON）
+            max_multiplier (float): 設定したレートの何倍まで上げるか
+            min_rate (float): 1秒あたりのリクエスト数の下限
+        """
+        self.state_file = state_file
+        self.max_multiplier = max_multiplier
+        self.min_rate = min_rate
+        self.limiters = {}
+        self.saved = {}
+        if os.path.exists(state_file):
+            try:
+                with open(state_file, 'r', encoding='utf-8') as f:
+                    self.saved = json.load(f)
+            except Exception as e:
+                print(f"レートの保存ファイル読み込みエラー: {e}")
+
+    def limiter(self, name, rate):
+        """
+        アップストリームのレート制限を作成（学習済みのレートがあればそこから始める）
+
+        Args:
+            name (str): アップストリーム名
+            rate (float): 設定した1秒あたりのリクエスト数（0以下の場合は制限なし）
+
+        Returns:
+            TokenBucket: レート制限
+        """
+        if rate <= 0:
+            return TokenBucket(0)
+        if name in self.limiters:
+            return self.limiters[name]
+        learned = self.saved.get(name, {}).get('rate')
+        limiter = AdaptiveRateLimiter(
+            learned or rate,
+            min_rate=min(self.min_rate, rate),
+            max_rate=rate * self.max_multiplier,
+            increase=rate / 4,
+            # 学習済みのレートから始める場合は一定量ずつ上げる
+            slow_start=learned is None
+        )
+        self.limiters[name] = limiter
+        return limiter
+
+    def rates(self):
+        """
+        アップストリームごとの現在のレート
+        """
+        return {name: limiter.rate for name, limiter in self.limiters.items()}
+
+    def save(self):
+        """
+        学習したレートを保存（一時ファイルに書いてから置き換え）
+        """
+        state = dict(self.saved)
+        for name, limiter in self.limiters.items():
+            state[name] = {
+                'rate': round(limiter.rate, 4),
+                'throttles': state.get(name, {}).get('throttles', 0) + limiter.throttles,
+                'updated_at': datetime.now().isoformat(timespec='seconds')
+            }
+            limiter.throttles = 0
+        self.saved = state
+        tmp_file = f"{self.state_file}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_file, self.state_file)
@@ -2,14 +2,20 @@
 """
 投稿履歴リセットスクリプト
 テスト用の投稿履歴をクリアして本番環境をクリーンにする
+（投稿台帳からは今日の記録だけを削除し、過去の記録は残す）
 """
 
 import json
 import os
+from datetime import datetime
+
+from posting_ledger import PostingLedger
 
 def reset_posting_history():
     """投稿履歴をリセット"""
     history_file = "posting_history.json"
+    ledger = PostingLedger("posting_ledger.jsonl")
+    today = datetime.now().strftime('%Y-%m-%d')
     
     # 現在の投稿履歴を確認
     if os.path.exists(history_file):
@@ -21,6 +27,9 @@ def reset_posting_history():
         print("投稿履歴ファイルが存在しません")
         current_history = {}
     
+    posted_today = ledger.posted_on(today)
+    print(f"投稿台帳の今日({today})の投稿: {len(posted_today)}件")
+    
     # 確認
     response = input("投稿履歴をリセットしますか？ (y/N): ")
     if response.lower() != 'y':
@@ -32,8 +41,12 @@ def reset_posting_history():
     with open(history_file, 'w', encoding='utf-8') as f:
         json.dump(empty_history, f, ensure_ascii=False, indent=2)
     
+    # 投稿台帳から今日の記録を削除
+    removed = ledger.remove_date(today)
+    
     print("✅ 投稿履歴をリセットしました")
     print(f"削除された投稿数: {len(current_history)}件")
+    print(f"投稿台帳から削除された今日の投稿数: {removed}件")
 
 if __name__ == "__main__":
     print("="*60)
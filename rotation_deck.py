@@ -0,0 +1,250 @@
+"""
+投稿ローテーション
+カタログの全件を並べた「山札」を作り、先頭から順に投稿します
+山札を一巡するまで同じ本は投稿されず、一巡したら最後に投稿した日時が古い順に並べ直します
+
+山札は No の配列（4バイト整数）としてファイルに保存し、位置（カーソル）から読むだけで次の本が決まります
+（カタログの件数に関係なく1回の選択は一定の時間で終わり、並べ直しは一巡に1回だけ）
+
+使い方:
+    python rotation_deck.py                      # 山札の状態を表示
+    python rotation_deck.py --simulate 365       # ランダム選択との比較シミュレーション
+"""
+
+import argparse
+import array
+import json
+import os
+import random
+
+# 山札ファイルの1件のサイズ（No を4バイト整数で保存）
+DECK_TYPECODE = 'i'
+# 山札から一度に読み込む件数
+READ_BATCH = 64
+
+
+class RotationDeck:
+    def __init__(self, deck_file, state_file, seed=None):
+        """
+        投稿ローテーションの初期化
+
+        Args:
+            deck_file (str): 山札ファイル（No の配列）
+            state_file (str): 状態ファイル（一巡の回数、カーソル位置、カタログのハッシュ）
+            seed: 並べ直しの乱数のシード（Noneの場合は毎回異なる）
+        """
+        self.deck_file = deck_file
+        self.state_file = state_file
+        self.rng = random.Random(seed)
+        self.itemsize = array.array(DECK_TYPECODE).itemsize
+        self.state = self.load_state()
+        # pick() で選んだ山札の位置（mark_posted() で確定する）
+        self.pending = None
+
+    def load_state(self):
+        """
+        状態ファイルを読み込み
+        """
+        state = {'epoch': 0, 'cursor': 0, 'size': 0, 'catalog': None}
+        if os.path.exists(self.state_file):
+            try:
+                with open(self.state_file, 'r', encoding='utf-8') as f:
+                    state.update(json.load(f))
+            except Exception:
+                pass
+        # 山札ファイルがない・大きさが合わない場合は作り直す
+        if not os.path.exists(self.deck_file) or \
+                os.path.getsize(self.deck_file) != state['size'] * self.itemsize:
+            state.update({'cursor': 0, 'size': 0, 'catalog': None})
+        return state
+
+    def save_state(self):
+        """
+        状態ファイルを保存（一時ファイルに書いてから置き換え）
+        """
+        tmp_file = f"{self.state_file}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_file, self.state_file)
+
+    def read_deck(self, start=0, count=None):
+        """
+        山札の start 番目から count 件を読み込む（Noneの場合は最後まで）
+        """
+        deck = array.array(DECK_TYPECODE)
+        if count is None:
+            count = self.state['size'] - start
+        count = max(0, min(count, self.state['size'] - start))
+        if count:
+            with open(self.deck_file, 'rb') as f:
+                f.seek(start * self.itemsize)
+                deck.frombytes(f.read(count * self.itemsize))
+        return deck
+
+    def write_deck(self, deck):
+        """
+        山札を保存（一時ファイルに書いてから置き換え）
+        """
+        tmp_file = f"{self.deck_file}.tmp"
+        with open(tmp_file, 'wb') as f:
+            deck.tofile(f)
+        os.replace(tmp_file, self.deck_file)
+        self.state['size'] = len(deck)
+
+    def new_epoch(self, catalog, last_posted):
+        """
+        山札を作り直す（最後に投稿した日時が古い順、一度も投稿していない本が先頭）
+
+        Args:
+            catalog (CatalogIndex): カタログ
+            last_posted (dict): No -> 最後に投稿した日時（ISO形式の文字列）
+        """
+        keyed = [(last_posted.get(record.index, ''), self.rng.random(), record.index)
+                 for record in catalog.postable]
+        keyed.sort()
+        self.write_deck(array.array(DECK_TYPECODE, (no for _, _, no in keyed)))
+        self.state['epoch'] += 1
+        self.state['cursor'] = 0
+        self.state['catalog'] = catalog.digest
+        self.save_state()
+
+    def reconcile(self, catalog):
+        """
+        カタログが変更された場合に山札を合わせる
+        削除された本は取り除き、追加された本は山札の残り（未投稿の部分）のランダムな位置に入れる
+        """
+        cursor = self.state['cursor']
+        deck = self.read_deck()
+        postable = {record.index for record in catalog.postable}
+
+        done = [no for no in deck[:cursor] if no in postable]
+        remaining = [no for no in deck[cursor:] if no in postable]
+        known = set(done) | set(remaining)
+        for record in catalog.postable:
+            if record.index not in known:
+                remaining.insert(self.rng.randint(0, len(remaining)), record.index)
+
+        self.write_deck(array.array(DECK_TYPECODE, done + remaining))
+        self.state['cursor'] = len(done)
+        self.state['catalog'] = catalog.digest
+        self.save_state()
+
+    def pick(self, catalog, excluded=(), last_posted=None):
+        """
+        次に投稿する本を選ぶ（カーソルは mark_posted() を呼ぶまで進めない）
+
+        Args:
+            catalog (CatalogIndex): カタログ
+            excluded (set): 選ばない No（今日投稿済みなど）
+            last_posted: 山札を作り直すときに呼び出す関数（No -> 最後に投稿した日時 の辞書を返す）
+
+        Returns:
+            CatalogRecord: 投稿する本（投稿できる本がない場合はNone）
+        """
+        if not catalog.postable:
+            return None
+
+        if self.state['size'] == 0:
+            self.new_epoch(catalog, last_posted() if last_posted else {})
+        elif self.state['catalog'] != catalog.digest:
+            self.reconcile(catalog)
+
+        # 除外された本しか残っていない場合に無限に回らないよう、一巡の作り直しは1回まで
+        rebuilt = False
+        position = self.state['cursor']
+        while True:
+            if position >= self.state['size']:
+                if rebuilt:
+                    return None
+                self.new_epoch(catalog, last_posted() if last_posted else {})
+                position = 0
+                rebuilt = True
+
+            for offset, no in enumerate(self.read_deck(position, READ_BATCH)):
+                record = catalog.by_no.get(no)
+                if record is not None and record.short_url and no not in excluded:
+                    self.pending = position + offset
+                    return record
+            position += READ_BATCH
+
+    def mark_posted(self, no):
+        """
+        pick() で選んだ本の投稿が完了したらカーソルを進める
+        （選んだ本より前にあった除外された本は、この一巡では投稿済みとして扱う）
+        """
+        if self.pending is None:
+            return
+        deck_no = self.read_deck(self.pending, 1)
+        if deck_no and deck_no[0] == no:
+            self.state['cursor'] = self.pending + 1
+            self.save_state()
+        self.pending = None
+
+
+def simulate(days, catalog_size, posts_per_day, seed=0):
+    """
+    山札による選択と、今日投稿していない本からのランダム選択の投稿回数の偏りを比較
+
+    Returns:
+        dict: 'deck' / 'random' -> {'min', 'max', 'never'}（1冊あたりの投稿回数）
+    """
+    import tempfile
+    from catalog_index import CatalogIndex, CatalogRecord
+
+    catalog = CatalogIndex([CatalogRecord(no, f"本{no}", "", "https://example.com")
+                            for no in range(1, catalog_size + 1)], digest='simulation')
+    rng = random.Random(seed)
+    counts = {'deck': dict.fromkeys(catalog.by_no, 0), 'random': dict.fromkeys(catalog.by_no, 0)}
+
+    with tempfile.TemporaryDirectory() as workdir:
+        deck = RotationDeck(os.path.join(workdir, 'deck.bin'), os.path.join(workdir, 'state.json'), seed)
+        for _ in range(days):
+            posted = {'deck': set(), 'random': set()}
+            for _ in range(posts_per_day):
+                record = deck.pick(catalog, posted['deck'])
+                deck.mark_posted(record.index)
+                posted['deck'].add(record.index)
+
+                record = rng.choice([r for r in catalog.postable if r.index not in posted['random']])
+                posted['random'].add(record.index)
+
+            for name in counts:
+                for no in posted[name]:
+                    counts[name][no] += 1
+
+    return {
+        name: {
+            'min': min(values.values()),
+            'max': max(values.values()),
+            'never': sum(1 for count in values.values() if count == 0)
+        }
+        for name, values in counts.items()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="投稿ローテーション")
+    parser.add_argument('--deck', default="rotation_deck.bin", help="山札ファイル")
+    parser.add_argument('--state', default="rotation_state.json", help="状態ファイル")
+    parser.add_argument('--simulate', type=int, metavar='DAYS', help="指定日数のシミュレーションを実行")
+    parser.add_argument('--catalog-size', type=int, default=190, help="シミュレーションのカタログ件数")
+    parser.add_argument('--posts-per-day', type=int, default=9, help="シミュレーションの1日の投稿数")
+    args = parser.parse_args()
+
+    if args.simulate:
+        result = simulate(args.simulate, args.catalog_size, args.posts_per_day)
+        print(f"シミュレーション: {args.simulate}日, {args.catalog_size}冊, 1日{args.posts_per_day}件")
+        print("-" * 50)
+        for name, label in (('deck', '山札'), ('random', 'ランダム')):
+            stats = result[name]
+            print(f"{label}: 1冊あたり最少 {stats['min']}回, 最多 {stats['max']}回, 一度も投稿されない本 {stats['never']}冊")
+        return
+
+    deck = RotationDeck(args.deck, args.state)
+    state = deck.state
+    print(f"山札: {args.deck}")
+    print(f"{state['epoch']}巡目, {state['cursor']}/{state['size']}件投稿済み")
+
+
+if __name__ == "__main__":
+    main()
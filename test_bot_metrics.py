@@ -0,0 +1,21 @@
+"""
+投稿BOTの計測のテスト
+常駐モードで何回保存しても実行回数は1回として数え、カウンターは二重に加算しないことを確認
+"""
+
+from bot_metrics import BotMetrics
+
+
+def test_runs_counted_once_per_process(tmp_path):
+    metrics_file = str(tmp_path / 'metrics.json')
+    metrics = BotMetrics(metrics_file)
+    for _ in range(3):
+        metrics.inc('posts')
+        data = metrics.save()
+    assert data['runs'] == 1
+    assert data['counters']['posts'] == 3
+
+    # 次の実行（新しいプロセス）では1回増える
+    data = BotMetrics(metrics_file).save()
+    assert data['runs'] == 2
+    assert data['counters']['posts'] == 3
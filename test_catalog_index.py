@@ -0,0 +1,88 @@
+"""
+投稿カタログのインデックスのテスト
+インデックスの再利用と、壊れた・途中で切れたインデックスを作り直すことを確認
+"""
+
+import os
+
+import pytest
+
+import catalog_index
+from catalog_index import default_index_file, load_catalog
+
+CSV_TEXT = "No,タイトル,一言紹介文,短縮URL\n1,本A,紹介A,https://tinyurl.com/a\n2,本B,紹介B,\n3.0,本C,紹介C,https://tinyurl.com/c\n"
+
+
+@pytest.fixture
+def csv_file(tmp_path, monkeypatch):
+    # 同じプロセス内のキャッシュを使わずにインデックスファイルから読み込む
+    monkeypatch.setattr(catalog_index, '_loaded_catalogs', {})
+    path = tmp_path / 'posts.csv'
+    path.write_text(CSV_TEXT, encoding='utf-8-sig')
+    return str(path)
+
+
+def reload(csv_file):
+    catalog_index._loaded_catalogs.clear()
+    return load_catalog(csv_file)
+
+
+def test_load_catalog_from_csv(csv_file):
+    catalog = load_catalog(csv_file)
+    assert len(catalog) == 3
+    assert [record.index for record in catalog.postable] == [1, 3]
+    assert catalog.get(2)['title'] == '本B'
+    assert os.path.exists(default_index_file(csv_file))
+
+
+def test_index_is_reused_without_parsing(csv_file, monkeypatch):
+    catalog = load_catalog(csv_file)
+
+    def fail(csv_file):
+        raise AssertionError("CSVを解析しました")
+
+    monkeypatch.setattr(catalog_index, 'parse_catalog_csv', fail)
+    reloaded = reload(csv_file)
+    assert [record.as_tuple() for record in reloaded.records] == [record.as_tuple() for record in catalog.records]
+    assert reloaded.digest == catalog.digest
+
+
+@pytest.mark.parametrize('damage', [
+    lambda data: data[:len(data) // 2],            # 途中で切れた
+    lambda data: data[:-1] + bytes([data[-1] ^ 1]),  # 本体が壊れた（チェックサムが合わない）
+    lambda data: b'',                              # 空
+    lambda data: b'\x80\x04garbage',               # 別の形式（古いpickle形式など）
+])
+def test_damaged_index_is_rebuilt(csv_file, damage):
+    catalog = load_catalog(csv_file)
+    index_file = default_index_file(csv_file)
+    with open(index_file, 'rb') as f:
+        data = f.read()
+    with open(index_file, 'wb') as f:
+        f.write(damage(data))
+
+    reloaded = reload(csv_file)
+    assert [record.as_tuple() for record in reloaded.records] == [record.as_tuple() for record in catalog.records]
+    # 作り直したインデックスは次回そのまま使える
+    assert catalog_index._read_index_file(index_file) is not None
+
+
+def test_changed_csv_is_parsed_again(csv_file):
+    load_catalog(csv_file)
+    with open(csv_file, 'a', encoding='utf-8') as f:
+        f.write("4,本D,紹介D,https://tinyurl.com/d\n")
+    assert len(reload(csv_file)) == 4
+
+
+@pytest.mark.parametrize('data', [
+    {'version': catalog_index.INDEX_VERSION},                         # 項目が足りない
+    {'version': catalog_index.INDEX_VERSION, 'mtime_ns': 0, 'size': 0, 'sha1': '', 'rows': [(1, '本A')]},
+])
+def test_mismatched_index_is_rebuilt(csv_file, data):
+    index_file = default_index_file(csv_file)
+    stat = os.stat(csv_file)
+    if 'rows' in data:
+        data.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+    catalog_index._write_index_file(index_file, data)
+
+    assert len(reload(csv_file)) == 3
@@ -0,0 +1,46 @@
+"""
+常駐モードの再試行のテスト
+投稿に失敗しても予定時刻を過ぎたまま連続で投稿し直さず、DAEMON_RETRY_SECONDS 以上空けて再試行することを確認
+"""
+
+from datetime import datetime, timedelta
+
+import x_posting_bot_advanced
+from x_posting_bot_advanced import DAEMON_RETRY_SECONDS, XPostingBotAdvanced
+
+
+def test_daemon_waits_before_retrying_failed_post(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv('TEST_MODE', raising=False)
+    clock = {'now': datetime(2024, 1, 1, 9, 0)}
+    monkeypatch.setattr(x_posting_bot_advanced, 'jst_now', lambda: clock['now'])
+    monkeypatch.setattr(x_posting_bot_advanced, 'save_metrics', lambda: None)
+
+    bot = XPostingBotAdvanced()
+    bot.posting_hours = (0, 23)
+    bot.use_posting_plan = True
+    attempts = []
+
+    def failing_post():
+        attempts.append(clock['now'])
+        if len(attempts) >= 5:
+            bot.daemon_stop = True
+        return False
+
+    def wait_until(target, now_func):
+        # 待機せずに予定時刻まで時計を進める（予定時刻が進まない場合は1秒ずつ）
+        clock['now'] = max(target, clock['now'] + timedelta(seconds=1))
+        return True
+
+    monkeypatch.setattr(bot, 'schedule_random_posts', failing_post)
+    monkeypatch.setattr(bot, 'wait_until', wait_until)
+    monkeypatch.setattr(bot, 'install_signal_handlers', lambda: None)
+    monkeypatch.setattr(bot, 'ensure_x_client', lambda: None)
+    monkeypatch.setattr(bot, 'load_csv_data', lambda: [])
+    monkeypatch.setattr(bot, 'print_stats', lambda: None)
+
+    bot.run_daemon()
+
+    assert len(attempts) == 5
+    for previous, current in zip(attempts, attempts[1:]):
+        assert current - previous >= timedelta(seconds=DAEMON_RETRY_SECONDS)
@@ -0,0 +1,84 @@
+"""
+リンク生成キャッシュのテスト
+タイトル→ASINキャッシュと、既存の出力CSVの短縮URLの再利用（初回の実行も含む）を確認
+"""
+
+import pytest
+
+from link_cache import ShortUrlCache, TitleCache
+from link_engine import Backend, LinkEngine
+
+PRODUCT = {'asin': 'B000000001', 'title': '本A', 'url': 'https://www.amazon.co.jp/dp/B000000001'}
+OUTPUT_CSV = "No,タイトル,一言紹介文,短縮URL\n1,本Ａ,紹介A,https://tinyurl.com/old-a\n"
+
+
+class FakeResolver(Backend):
+    name = 'fake'
+    label = 'テスト'
+
+    def lookup(self, title, usage):
+        self.acquire(usage)
+        return dict(PRODUCT) if title in ('本A', '本Ａ') else None
+
+
+class CountingShortener(Backend):
+    name = 'counting'
+    label = 'テスト短縮'
+
+    def __init__(self):
+        super().__init__(0)
+        self.calls = []
+
+    def shorten(self, url, usage=None):
+        self.calls.append(url)
+        return f"https://tinyurl.com/new-{len(self.calls)}"
+
+
+@pytest.fixture
+def caches(tmp_path):
+    db_file = str(tmp_path / 'cache.db')
+    title_cache, short_url_cache = TitleCache(db_file), ShortUrlCache(db_file)
+    yield title_cache, short_url_cache
+    title_cache.close()
+    short_url_cache.close()
+
+
+def test_title_cache_normalizes_titles(caches):
+    title_cache, _ = caches
+    assert title_cache.lookup('本A') == (False, None)
+    title_cache.store('本Ａ', PRODUCT)
+    cached, product_info = title_cache.lookup(' 本A ')
+    assert cached and product_info['asin'] == PRODUCT['asin']
+
+    title_cache.store_negative('本Z')
+    assert title_cache.lookup('本Z') == (True, None)
+
+
+def test_seed_with_title_cache(tmp_path, caches):
+    title_cache, short_url_cache = caches
+    title_cache.store('本A', PRODUCT)
+    output_file = tmp_path / 'output.csv'
+    output_file.write_text(OUTPUT_CSV, encoding='utf-8-sig')
+
+    assert short_url_cache.seed_from_csv(str(output_file), title_cache, 'tag-22') == 1
+    assert short_url_cache.get(f"{PRODUCT['url']}?tag=tag-22") == "https://tinyurl.com/old-a"
+
+
+def test_first_run_seeds_after_title_resolution(tmp_path, caches):
+    title_cache, short_url_cache = caches
+    output_file = tmp_path / 'output.csv'
+    output_file.write_text(OUTPUT_CSV, encoding='utf-8-sig')
+
+    # タイトルキャッシュが空でも、検索後に登録するタイトルとして読み込む
+    assert short_url_cache.seed_from_csv(str(output_file), title_cache, 'tag-22') == 1
+
+    shortener = CountingShortener()
+    engine = LinkEngine([FakeResolver(0)], [shortener], 'tag-22',
+                        title_cache=title_cache, short_url_cache=short_url_cache)
+    results = engine.process_titles(['本A', '本B'])
+
+    assert results[0]['short_url'] == "https://tinyurl.com/old-a"
+    assert results[1]['short_url'] is None
+    assert shortener.calls == []
+    # 登録した対応表は次回の実行でも使える
+    assert short_url_cache.get(results[0]['affiliate_url']) == "https://tinyurl.com/old-a"
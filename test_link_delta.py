@@ -0,0 +1,51 @@
+"""
+リンク生成の差分処理のテスト
+入力CSVと既存の出力CSVの比較と、失敗したタイトルの記録を確認
+"""
+
+from link_delta import (diff_catalog, load_generation_state, record_failures, save_generation_state,
+                        title_hash)
+
+
+def test_title_hash_ignores_width_case_and_spaces():
+    assert title_hash('ＡＢＣ  の本') == title_hash('abc の本 ')
+    assert title_hash('本A') != title_hash('本B')
+
+
+def test_diff_catalog():
+    output_rows = [
+        {'No': 1, 'タイトル': '本A', '一言紹介文': '紹介A', '短縮URL': 'https://tinyurl.com/a'},
+        {'No': 2, 'タイトル': '本B', '一言紹介文': '紹介B', '短縮URL': 'https://tinyurl.com/b'},
+        {'No': 3, 'タイトル': '本C', '一言紹介文': '紹介C', '短縮URL': 'https://tinyurl.com/c'},
+    ]
+    input_rows = [
+        {'タイトル': '本A', '一言紹介文': '紹介A'},
+        {'タイトル': '本B', '一言紹介文': '新しい紹介B'},
+        {'タイトル': '本D', '一言紹介文': '紹介D'},
+        {'タイトル': '本A', '一言紹介文': '重複'},
+    ]
+    delta = diff_catalog(input_rows, output_rows)
+
+    assert [row['No'] for row in delta['unchanged']] == [1]
+    assert [(row['No'], row['一言紹介文']) for row in delta['changed']] == [(2, '新しい紹介B')]
+    assert [row['タイトル'] for row in delta['added']] == ['本D']
+    assert [row['No'] for row in delta['removed']] == [3]
+    assert [row['一言紹介文'] for row in delta['duplicates']] == ['重複']
+    # 既存の出力行は変更しない
+    assert output_rows[1]['一言紹介文'] == '紹介B'
+
+
+def test_generation_state_roundtrip_and_failures(tmp_path):
+    state_file = str(tmp_path / 'state.json')
+    state = load_generation_state(state_file)
+    assert state == {'next_no': 1, 'failed': {}}
+
+    record_failures(state, ['本B'])
+    record_failures(state, ['本B', '本C'])
+    state['next_no'] = 5
+    save_generation_state(state_file, state)
+
+    state = load_generation_state(state_file)
+    assert state['next_no'] == 5
+    assert state['failed'][title_hash('本B')]['attempts'] == 2
+    assert state['failed'][title_hash('本C')]['attempts'] == 1
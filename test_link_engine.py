@@ -0,0 +1,68 @@
+"""
+リンク生成エンジンのテスト
+バックエンドの呼び出し回数が行ごとの usage に整数で数えられることを確認
+"""
+
+from collections import Counter
+
+from link_engine import Backend, LinkEngine
+
+PRODUCT_URL = "https://www.amazon.co.jp/dp/B000000001"
+
+
+class FakeResolver(Backend):
+    name = 'fake'
+    label = 'テスト'
+
+    def lookup(self, title, usage):
+        self.acquire(usage)
+        # 同じ商品が見つかるタイトル（同じURLの短縮は1回だけ）
+        return {'asin': 'B000000001', 'title': title, 'url': PRODUCT_URL}
+
+
+class CountingShortener(Backend):
+    name = 'counting'
+    label = 'テスト短縮'
+
+    def shorten(self, url, usage=None):
+        self.acquire(usage)
+        return "https://tinyurl.com/a"
+
+
+class FakeRefresher(Backend):
+    name = 'paapi'
+    label = 'テストGetItems'
+
+    def lookup(self, title, usage):
+        return None
+
+    def refresh_many(self, asins):
+        # 商品は取得できず、10件ごとに1回呼び出した
+        return {}, (len(asins) + 9) // 10
+
+
+class StaleCache:
+    def lookup_stale(self, title):
+        return {'asin': f"B{int(title):09d}", 'title': title, 'strategy': None}
+
+
+def test_bulk_shorten_counts_calls_per_row():
+    engine = LinkEngine([FakeResolver(0)], [CountingShortener(0)], 'tag-22', max_workers=2, bulk_shorten=True)
+    results = engine.process_titles(['本A', '本B', '本C'])
+
+    assert [result['short_url'] for result in results] == ["https://tinyurl.com/a"] * 3
+    assert sum(result['usage']['counting'] for result in results) == 1
+    assert all(result['usage']['fake'] == 1 for result in results)
+
+
+def test_refresh_stale_counts_whole_calls():
+    engine = LinkEngine([FakeRefresher(0)])
+    engine.title_cache = StaleCache()
+    titles = [str(number) for number in range(15)]
+    usages = [Counter() for _ in titles]
+
+    unresolved = engine._refresh_stale(titles, list(range(15)), usages, finish=None)
+
+    assert unresolved == list(range(15))
+    assert sum(usage['paapi'] for usage in usages) == 2
+    assert all(isinstance(usage['paapi'], int) for usage in usages)
@@ -0,0 +1,81 @@
+"""
+リンク生成ジャーナルのテスト
+失敗の理由・再開時に処理が必要なタイトル・再試行の待機時間・途中まで書かれた行を確認
+"""
+
+from collections import Counter
+from datetime import datetime, timedelta
+
+from link_journal import (REASON_NO_SHORT_URL, REASON_NOT_FOUND, REASON_SEARCH_ERROR, LinkJournal,
+                          failure_reason)
+
+
+def result(found=True, short_url="https://tinyurl.com/x", **usage):
+    return {
+        'product_info': {'asin': 'B000000000'} if found else None,
+        'short_url': short_url if found else None,
+        'usage': Counter(usage)
+    }
+
+
+def test_failure_reason():
+    assert failure_reason(result()) is None
+    assert failure_reason(result(found=False)) == REASON_NOT_FOUND
+    assert failure_reason(result(found=False, errors=1)) == REASON_SEARCH_ERROR
+    assert failure_reason(result(found=False, throttled=1)) == REASON_SEARCH_ERROR
+    assert failure_reason(result(short_url=None)) == REASON_NO_SHORT_URL
+
+
+def test_pending_after_resume(tmp_path):
+    journal_file = str(tmp_path / 'journal.jsonl')
+    titles = ['本A', '本B', '本C', '本A']
+    journal = LinkJournal(journal_file)
+    journal.record('本A', result())
+    journal.record('本B', result(found=False))
+
+    # 次の実行（途中で止まった後）はジャーナルを読み直して続きから
+    journal = LinkJournal(journal_file)
+    journal.load()
+    missing, retry, cooling = journal.pending(titles)
+    assert (missing, retry, cooling) == ([2], [], 0)
+
+    missing, retry, cooling = journal.pending(titles, retry_failed=True)
+    assert (missing, retry, cooling) == ([2], [1], 0)
+
+
+def test_retry_waits_for_cooldown(tmp_path):
+    journal = LinkJournal(str(tmp_path / 'journal.jsonl'))
+    failed_at = datetime(2024, 1, 2, 9, 0)
+    journal.record('本B', result(found=False), when=failed_at)
+    cooldown = timedelta(minutes=60)
+
+    assert journal.pending(['本B'], True, cooldown, now=failed_at + timedelta(minutes=30)) == ([], [], 1)
+    assert journal.pending(['本B'], True, cooldown, now=failed_at + timedelta(minutes=60)) == ([], [0], 0)
+
+
+def test_attempts_and_latest_entry(tmp_path):
+    journal_file = str(tmp_path / 'journal.jsonl')
+    journal = LinkJournal(journal_file)
+    journal.record('本B', result(found=False))
+    journal.record('本B', result())
+
+    journal = LinkJournal(journal_file)
+    entry = journal.load()[journal.get('本B')['key']]
+    assert entry['status'] == 'ok'
+    assert entry['attempts'] == 2
+    assert journal.summary() == {'ok': 1}
+
+
+def test_truncated_line_is_skipped(tmp_path):
+    journal_file = tmp_path / 'journal.jsonl'
+    journal = LinkJournal(str(journal_file))
+    journal.record('本A', result())
+    with open(journal_file, 'a', encoding='utf-8') as f:
+        f.write('{"key": "abc", "sta')
+    journal.record('本B', result())
+
+    journal = LinkJournal(str(journal_file))
+    journal.load()
+    assert journal.get('本A')['status'] == 'ok'
+    assert journal.get('本B')['status'] == 'ok'
+    assert len(journal.entries) == 2
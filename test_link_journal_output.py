@@ -0,0 +1,92 @@
+"""
+ジャーナルからの再開・再試行と出力CSVのテスト
+--retry-failed / --resume の結果が既存の出力CSVの行（No）を変更・削除せずに反映されることを確認
+"""
+
+from collections import Counter
+
+import pandas as pd
+import pytest
+
+import kindle_unlimited_link_generator_paapi as paapi_generator
+
+
+@pytest.fixture
+def generator(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(paapi_generator, 'INPUT_FILE', str(tmp_path / 'input.csv'))
+    monkeypatch.setattr(paapi_generator, 'OUTPUT_FILE', str(tmp_path / 'output.csv'))
+    monkeypatch.setattr(paapi_generator, 'STATE_FILE', str(tmp_path / 'state.json'))
+    monkeypatch.setattr(paapi_generator, 'JOURNAL_FILE', str(tmp_path / 'journal.jsonl'))
+    monkeypatch.setattr(paapi_generator, 'RETRY_COOLDOWN_MINUTES', 0)
+    pd.DataFrame({
+        'タイトル': ['本A', '本B', '本C'],
+        '一言紹介文': ['紹介A', '紹介B', '紹介C']
+    }).to_csv(paapi_generator.INPUT_FILE, index=False)
+
+    generator = paapi_generator.KindleUnlimitedLinkGeneratorPAAPI()
+    generator.engine.short_url_cache = None
+    generator.failing = set()
+
+    def resolve_titles(titles, on_done=None):
+        # 検索・短縮の代わりに、failing にないタイトルは成功した結果を返す
+        short_urls = []
+        for index, title in enumerate(titles):
+            ok = title not in generator.failing
+            short_url = f"https://tinyurl.com/{title}" if ok else None
+            on_done(index, {
+                'title': title,
+                'product_info': {'asin': 'B000000000'} if ok else None,
+                'affiliate_url': None,
+                'short_url': short_url,
+                'usage': Counter()
+            })
+            short_urls.append(short_url)
+        return short_urls
+
+    generator.resolve_titles = resolve_titles
+    return generator
+
+
+def read_output():
+    return pd.read_csv(paapi_generator.OUTPUT_FILE, keep_default_na=False).to_dict('records')
+
+
+def test_retry_failed_after_incremental_keeps_output(generator):
+    generator.failing = {'本B'}
+    generator.process_csv(incremental=True)
+    before = read_output()
+    assert [(row['No'], row['タイトル']) for row in before] == [(1, '本A'), (2, '本C')]
+
+    # 差分モードの実行後はジャーナルが空なので、再試行する行はなく出力もそのまま
+    generator.failing = set()
+    generator.process_csv(retry_failed=True)
+    assert read_output() == before
+
+
+def test_retry_failed_adds_rows_without_renumbering(generator):
+    generator.failing = {'本B'}
+    generator.process_csv(incremental=False)
+    assert [(row['No'], row['タイトル']) for row in read_output()] == [(1, '本A'), (2, '本C')]
+
+    generator.failing = set()
+    generator.process_csv(retry_failed=True)
+    rows = read_output()
+    assert [(row['No'], row['タイトル']) for row in rows] == [(1, '本A'), (2, '本C'), (3, '本B')]
+    assert rows[2]['短縮URL'] == "https://tinyurl.com/本B"
+
+
+def test_resume_keeps_rows_without_journal_entry(generator):
+    generator.process_csv(incremental=True)
+    before = read_output()
+
+    # 入力に行を追加して --resume（出力の既存の行はジャーナルにないが、削除も番号の振り直しもしない）
+    pd.DataFrame({
+        'タイトル': ['本A', '本B', '本C', '本D'],
+        '一言紹介文': ['紹介A', '紹介B', '紹介C', '紹介D']
+    }).to_csv(paapi_generator.INPUT_FILE, index=False)
+    generator.failing = {'本A', '本B', '本C'}
+    generator.process_csv(journal_resume=True)
+    rows = read_output()
+    assert rows[:3] == before
+    assert (rows[3]['No'], rows[3]['タイトル']) == (4, '本D')
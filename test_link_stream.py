@@ -0,0 +1,97 @@
+"""
+ストリーミング処理のテスト
+途中で停止した場合にチェックポイントから再開し、出力に行が重複・欠落しないことを確認
+"""
+
+import pandas as pd
+import pytest
+
+from link_stream import stream_csv
+
+COLUMNS = ['No', 'タイトル', '一言紹介文', '短縮URL']
+
+
+class Stop(Exception):
+    pass
+
+
+@pytest.fixture
+def files(tmp_path):
+    input_file = str(tmp_path / 'input.csv')
+    pd.DataFrame({
+        'タイトル': [f"本{i}" for i in range(10)],
+        '一言紹介文': [f"紹介{i}" for i in range(10)]
+    }).to_csv(input_file, index=False)
+    return input_file, str(tmp_path / 'output.csv'), str(tmp_path / 'checkpoint.json')
+
+
+def make_processor(stop_at=None):
+    calls = []
+
+    def process_chunk(rows, state):
+        calls.append([row['タイトル'] for row in rows])
+        if stop_at is not None and len(calls) == stop_at:
+            raise Stop()
+        output = []
+        for row in rows:
+            output.append({'No': state['next_no'], 'タイトル': row['タイトル'],
+                           '一言紹介文': row['一言紹介文'], '短縮URL': f"https://tinyurl.com/{row['タイトル']}"})
+            state['next_no'] += 1
+        return output
+
+    return process_chunk, calls
+
+
+def read_output(output_file):
+    return pd.read_csv(output_file, keep_default_na=False).to_dict('records')
+
+
+def test_resume_from_checkpoint(files):
+    input_file, output_file, checkpoint_file = files
+    process_chunk, _ = make_processor(stop_at=3)
+    with pytest.raises(Stop):
+        stream_csv(input_file, output_file, COLUMNS, process_chunk, checkpoint_file,
+                   chunk_size=3, initial_state={'next_no': 1})
+    assert len(read_output(output_file)) == 6
+
+    process_chunk, calls = make_processor()
+    summary = stream_csv(input_file, output_file, COLUMNS, process_chunk, checkpoint_file,
+                         chunk_size=3, initial_state={'next_no': 1})
+    assert calls[0] == ['本6', '本7', '本8']
+    assert summary['resumed_from'] == 6
+    assert summary['state'] == {'next_no': 11}
+
+    rows = read_output(output_file)
+    assert [row['No'] for row in rows] == list(range(1, 11))
+    assert [row['タイトル'] for row in rows] == [f"本{i}" for i in range(10)]
+
+
+def test_restart_ignores_checkpoint(files):
+    input_file, output_file, checkpoint_file = files
+    process_chunk, _ = make_processor(stop_at=2)
+    with pytest.raises(Stop):
+        stream_csv(input_file, output_file, COLUMNS, process_chunk, checkpoint_file,
+                   chunk_size=3, initial_state={'next_no': 1})
+
+    process_chunk, calls = make_processor()
+    summary = stream_csv(input_file, output_file, COLUMNS, process_chunk, checkpoint_file,
+                         chunk_size=3, initial_state={'next_no': 1}, resume=False)
+    assert summary['resumed_from'] == 0
+    assert calls[0] == ['本0', '本1', '本2']
+    assert [row['No'] for row in read_output(output_file)] == list(range(1, 11))
+
+
+def test_changed_input_starts_over(files):
+    input_file, output_file, checkpoint_file = files
+    process_chunk, _ = make_processor(stop_at=2)
+    with pytest.raises(Stop):
+        stream_csv(input_file, output_file, COLUMNS, process_chunk, checkpoint_file,
+                   chunk_size=3, initial_state={'next_no': 1})
+
+    with open(input_file, 'a', encoding='utf-8') as f:
+        f.write("本10,紹介10\n")
+    process_chunk, _ = make_processor()
+    summary = stream_csv(input_file, output_file, COLUMNS, process_chunk, checkpoint_file,
+                         chunk_size=3, initial_state={'next_no': 1})
+    assert summary['resumed_from'] == 0
+    assert len(read_output(output_file)) == 11
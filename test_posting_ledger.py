@@ -0,0 +1,72 @@
+"""
+投稿台帳のテスト
+日付ごとの投稿数・末尾からの読み込み・途中まで書かれた行・従来の投稿履歴の取り込みを確認
+"""
+
+import json
+from datetime import datetime
+
+import posting_ledger
+from posting_ledger import PostingLedger
+
+
+def test_count_on_counts_only_that_day(tmp_path):
+    ledger = PostingLedger(str(tmp_path / 'ledger.jsonl'))
+    ledger.append(1, when=datetime(2024, 1, 1, 9, 0))
+    ledger.append(2, when=datetime(2024, 1, 2, 9, 0))
+    ledger.append(3, when=datetime(2024, 1, 2, 12, 0))
+    # 同じ日の同じNoは1件として数える
+    ledger.append(3, when=datetime(2024, 1, 2, 15, 0))
+
+    assert ledger.count_on('2024-01-01') == 1
+    assert ledger.count_on('2024-01-02') == 2
+    assert ledger.count_on('2024-01-03') == 0
+
+    # 別のインスタンス（次回の実行）でも台帳から同じ件数になる
+    reopened = PostingLedger(str(tmp_path / 'ledger.jsonl'))
+    assert reopened.count_on('2024-01-02') == 2
+    assert set(reopened.posted_on('2024-01-02')) == {2, 3}
+
+
+def test_append_updates_loaded_day(tmp_path):
+    ledger = PostingLedger(str(tmp_path / 'ledger.jsonl'))
+    assert ledger.count_on('2024-01-02') == 0
+    ledger.append(5, when=datetime(2024, 1, 2, 9, 0))
+    assert ledger.count_on('2024-01-02') == 1
+
+
+def test_read_since_across_blocks(tmp_path, monkeypatch):
+    monkeypatch.setattr(posting_ledger, 'READ_BLOCK_SIZE', 64)
+    ledger = PostingLedger(str(tmp_path / 'ledger.jsonl'))
+    for day in range(1, 11):
+        for no in range(5):
+            ledger.append(day * 10 + no, when=datetime(2024, 1, day, 9, no))
+
+    entries = ledger.read_since('2024-01-09')
+    assert [entry['no'] for entry in entries] == [90, 91, 92, 93, 94, 100, 101, 102, 103, 104]
+
+
+def test_truncated_line_is_skipped(tmp_path):
+    ledger_file = tmp_path / 'ledger.jsonl'
+    ledger = PostingLedger(str(ledger_file))
+    ledger.append(1, when=datetime(2024, 1, 2, 9, 0))
+    # 書き込み途中で止まった行
+    with open(ledger_file, 'a', encoding='utf-8') as f:
+        f.write('{"ts": "2024-01-02T10:00:00", "date": "2024-01-02", "no"')
+
+    ledger = PostingLedger(str(ledger_file))
+    assert ledger.count_on('2024-01-02') == 1
+    ledger.append(2, when=datetime(2024, 1, 2, 11, 0))
+    assert PostingLedger(str(ledger_file)).count_on('2024-01-02') == 2
+
+
+def test_import_legacy_history(tmp_path):
+    history_file = tmp_path / 'posting_history.json'
+    history_file.write_text(json.dumps({'1': '2024-01-01', '2': '2024-01-02', '3': '2024-01-02'}), encoding='utf-8')
+    ledger = PostingLedger(str(tmp_path / 'ledger.jsonl'), str(history_file))
+
+    assert ledger.count_on('2024-01-02') == 2
+    assert all(entry.get('migrated') for entry in ledger.iter_entries())
+    # 取り込み済みの投稿は2回目以降は取り込まない
+    assert PostingLedger(str(tmp_path / 'ledger.jsonl'), str(history_file)).count_on('2024-01-02') == 2
+    assert len(list(ledger.iter_entries())) == 3
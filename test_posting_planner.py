@@ -0,0 +1,67 @@
+"""
+投稿計画のテスト
+スロットの作成・保存と、投稿に成功した場合だけスロットが消費されることを確認
+"""
+
+from datetime import datetime
+
+from posting_planner import build_daily_plan, decide_from_plan, load_daily_plan, next_slot_time
+
+HOURS = (7, 23)
+POSTS = 9
+INTERVAL = (60, 180)
+
+
+def test_build_daily_plan_is_deterministic_and_within_hours():
+    plan = build_daily_plan('2024-01-02', HOURS, POSTS, INTERVAL, seed="s")
+    assert plan == build_daily_plan('2024-01-02', HOURS, POSTS, INTERVAL, seed="s")
+    assert plan['slots'] != build_daily_plan('2024-01-03', HOURS, POSTS, INTERVAL, seed="s")['slots']
+
+    slots = plan['slots']
+    assert len(slots) == POSTS
+    assert HOURS[0] * 60 <= slots[0] and slots[-1] <= HOURS[1] * 60
+    # 整数に丸めるので1分の誤差は許容する
+    assert all(later - earlier >= INTERVAL[0] - 1 for earlier, later in zip(slots, slots[1:]))
+
+
+def test_load_daily_plan_keeps_saved_plan_until_settings_change(tmp_path):
+    plan_file = str(tmp_path / 'plan.json')
+    plan = load_daily_plan(plan_file, '2024-01-02', HOURS, POSTS, INTERVAL, seed="a")
+    assert load_daily_plan(plan_file, '2024-01-02', HOURS, POSTS, INTERVAL, seed="a") == plan
+
+    changed = load_daily_plan(plan_file, '2024-01-02', HOURS, 3, INTERVAL, seed="a")
+    assert len(changed['slots']) == 3
+    assert changed['fingerprint'] != plan['fingerprint']
+
+
+def test_slot_is_consumed_only_by_successful_post():
+    plan = build_daily_plan('2024-01-02', HOURS, POSTS, INTERVAL, seed="s")
+    first, second = plan['slots'][:2]
+
+    before = decide_from_plan(plan, first - 1, 0, POSTS)
+    assert not before['post']
+
+    due = decide_from_plan(plan, first, 0, POSTS)
+    assert due['post']
+
+    # 投稿に失敗した場合は今日の投稿数が増えないので、同じスロットが投稿予定のまま残る
+    after_failure = decide_from_plan(plan, first + 30, 0, POSTS)
+    assert after_failure['post']
+    assert after_failure['next_slot'] == due['next_slot']
+
+    # 投稿に成功した場合は次のスロットまで待つ
+    after_success = decide_from_plan(plan, first + 30, 1, POSTS)
+    assert after_success['post'] == (first + 30 >= second)
+    assert after_success['next_slot'] != due['next_slot']
+
+
+def test_limit_and_next_slot_time():
+    plan = build_daily_plan('2024-01-02', HOURS, POSTS, INTERVAL, seed="s")
+    now = datetime(2024, 1, 2, 23, 30)
+
+    assert decide_from_plan(plan, 23 * 60 + 30, POSTS, POSTS)['reason'] == 'limit'
+    assert next_slot_time(plan, POSTS, now) is None
+
+    slot = next_slot_time(plan, 0, now)
+    assert slot.date() == now.date()
+    assert slot.hour * 60 + slot.minute == plan['slots'][0]
@@ -0,0 +1,88 @@
+"""
+レート制限のテスト
+トークンバケットの待機時間、AIMDによるレートの調整、学習したレートの保存と引き継ぎを確認
+"""
+
+import asyncio
+import time
+
+from rate_limiter import AdaptiveRateLimiter, AdaptiveRateStore, TokenBucket
+
+
+def test_token_bucket_waits_for_refill():
+    bucket = TokenBucket(50, capacity=2)
+    started = time.monotonic()
+    for _ in range(7):
+        bucket.acquire()
+    # 最初の2回はバケットの分、残り5回は 1/50 秒ずつ
+    assert time.monotonic() - started >= 5 / 50 * 0.9
+
+
+def test_token_bucket_without_rate_does_not_wait():
+    bucket = TokenBucket(0)
+    assert all(bucket.acquire() == 0.0 for _ in range(100))
+    assert asyncio.run(bucket.acquire_async()) == 0.0
+
+
+def test_acquire_async_waits():
+    bucket = TokenBucket(50)
+    bucket.acquire()
+    assert asyncio.run(bucket.acquire_async()) > 0
+
+
+def test_slow_start_doubles_until_max():
+    limiter = AdaptiveRateLimiter(1, min_rate=0.5, max_rate=5, success_window=2)
+    for _ in range(2):
+        limiter.record_success()
+    assert limiter.rate == 2
+    for _ in range(2):
+        limiter.record_success()
+    assert limiter.rate == 4
+    for _ in range(2):
+        limiter.record_success()
+    assert limiter.rate == 5
+
+
+def test_throttle_halves_and_ends_slow_start():
+    limiter = AdaptiveRateLimiter(4, min_rate=0.5, max_rate=10, increase=1, success_window=1)
+    limiter.record_throttle()
+    assert limiter.rate == 2
+    assert not limiter.slow_start
+    # 下げた直後の制限（下げる前に送ったリクエストの応答）では続けて下げない
+    limiter.record_throttle()
+    assert limiter.rate == 2
+    assert limiter.throttles == 2
+
+    # その後は一定量ずつ上げる
+    limiter.record_success()
+    assert limiter.rate == 3
+
+
+def test_rate_does_not_go_below_min():
+    limiter = AdaptiveRateLimiter(1, min_rate=0.8, max_rate=10)
+    limiter.record_throttle()
+    assert limiter.rate == 0.8
+
+
+def test_store_persists_learned_rate(tmp_path):
+    state_file = str(tmp_path / 'rates.json')
+    store = AdaptiveRateStore(state_file)
+    limiter = store.limiter('scraping', 1)
+    assert store.limiter('scraping', 1) is limiter
+    limiter.rate = 3.5
+    limiter.record_throttle()
+    store.save()
+
+    store = AdaptiveRateStore(state_file)
+    limiter = store.limiter('scraping', 1)
+    assert limiter.rate == 1.75
+    # 学習済みのレートから始める場合は倍々では上げない
+    assert not limiter.slow_start
+    assert store.saved['scraping']['throttles'] == 1
+
+
+def test_store_without_rate_is_unlimited(tmp_path):
+    store = AdaptiveRateStore(str(tmp_path / 'rates.json'))
+    limiter = store.limiter('bitly', 0)
+    assert not isinstance(limiter, AdaptiveRateLimiter)
+    assert limiter.acquire() == 0.0
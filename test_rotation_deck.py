@@ -0,0 +1,75 @@
+"""
+投稿ローテーションのテスト
+山札を一巡するまで同じ本を投稿しないこと・カーソルが次回の実行に引き継がれること・カタログの変更に合わせることを確認
+"""
+
+from catalog_index import CatalogIndex, CatalogRecord
+from rotation_deck import RotationDeck
+
+
+def make_catalog(numbers, digest):
+    return CatalogIndex([CatalogRecord(no, f"本{no}", "", "https://example.com") for no in numbers], digest=digest)
+
+
+def open_deck(tmp_path, seed=0):
+    return RotationDeck(str(tmp_path / 'deck.bin'), str(tmp_path / 'state.json'), seed)
+
+
+def post_next(deck, catalog, excluded=()):
+    record = deck.pick(catalog, excluded)
+    deck.mark_posted(record.index)
+    return record.index
+
+
+def test_one_epoch_posts_every_book_once(tmp_path):
+    catalog = make_catalog(range(1, 11), 'v1')
+    deck = open_deck(tmp_path)
+    posted = [post_next(deck, catalog) for _ in range(10)]
+    assert sorted(posted) == list(range(1, 11))
+    assert deck.state['epoch'] == 1
+
+    # 一巡したら山札を作り直す
+    post_next(deck, catalog)
+    assert deck.state['epoch'] == 2
+
+
+def test_cursor_persists_across_runs(tmp_path):
+    catalog = make_catalog(range(1, 11), 'v1')
+    posted = []
+    # 毎時実行と同じく、1投稿ごとに読み込み直す
+    for _ in range(10):
+        posted.append(post_next(open_deck(tmp_path), catalog))
+    assert sorted(posted) == list(range(1, 11))
+
+    deck = open_deck(tmp_path)
+    assert deck.state['epoch'] == 1
+    assert deck.state['cursor'] == 10
+
+
+def test_pick_without_mark_posted_does_not_advance(tmp_path):
+    catalog = make_catalog(range(1, 6), 'v1')
+    deck = open_deck(tmp_path)
+    first = deck.pick(catalog).index
+    # 投稿に失敗した場合（mark_posted を呼ばない）は次回も同じ本を選ぶ
+    assert open_deck(tmp_path).pick(catalog).index == first
+
+
+def test_excluded_books_are_skipped(tmp_path):
+    catalog = make_catalog(range(1, 6), 'v1')
+    deck = open_deck(tmp_path)
+    first = deck.pick(catalog).index
+    assert deck.pick(catalog, excluded={first}).index != first
+
+
+def test_reconcile_after_catalog_change(tmp_path):
+    deck = open_deck(tmp_path)
+    catalog = make_catalog(range(1, 11), 'v1')
+    posted = [post_next(deck, catalog) for _ in range(4)]
+
+    # 投稿済みの1冊を削除し、2冊を追加
+    removed = posted[0]
+    changed = make_catalog([no for no in range(1, 13) if no != removed], 'v2')
+    deck = open_deck(tmp_path)
+    rest = [post_next(deck, changed) for _ in range(len(changed) - 3)]
+    assert sorted(posted[1:] + rest) == sorted(record.index for record in changed.postable)
+    assert deck.state['epoch'] == 1
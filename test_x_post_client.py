@@ -0,0 +1,127 @@
+"""
+X投稿クライアントの再試行のテスト
+投稿（POST /2/tweets）が重複投稿にならないように、投稿されたかどうかわからない場合は再試行しないことを確認
+"""
+
+import asyncio
+import json
+import threading
+
+import httpx
+
+from x_post_client import PostDeferred, RateLimitBudget, XPostClient, XPostError
+
+CREDENTIALS = ("key", "secret", "token", "token-secret", None)
+DUPLICATE = {'title': 'Forbidden', 'detail': 'You are not allowed to create a Tweet with duplicate content.'}
+
+
+async def no_sleep(seconds):
+    pass
+
+
+def post_with(responses):
+    """
+    responses の順に応答する（例外の場合は送出する）HTTPクライアントで投稿
+
+    Returns:
+        tuple: ((ツイートID, 再試行回数)または送出された例外, リクエスト数)
+    """
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        response = responses[len(calls) - 1]
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    async def run():
+        client = XPostClient(CREDENTIALS, base_url="https://api.test", max_retries=3, sleep=no_sleep)
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as http:
+            try:
+                return await client.create_tweet_async("本文", http)
+            except (PostDeferred, XPostError) as e:
+                return e
+
+    return asyncio.run(run()), len(calls)
+
+
+def test_post_is_not_retried_after_read_timeout():
+    result, calls = post_with([httpx.ReadTimeout("timed out"), httpx.Response(201, json={'data': {'id': '1'}})])
+    assert isinstance(result, PostDeferred)
+    assert calls == 1
+
+
+def test_post_is_retried_after_connect_error():
+    result, calls = post_with([httpx.ConnectError("refused"), httpx.Response(201, json={'data': {'id': '1'}})])
+    assert result == ('1', 1)
+    assert calls == 2
+
+
+def test_duplicate_after_5xx_retry_counts_as_posted():
+    result, calls = post_with([httpx.Response(503), httpx.Response(403, json=DUPLICATE)])
+    assert result == (None, 1)
+    assert calls == 2
+
+
+def test_duplicate_on_first_attempt_is_an_error():
+    result, calls = post_with([httpx.Response(403, json=DUPLICATE)])
+    assert isinstance(result, XPostError)
+    assert result.status == 403
+    assert calls == 1
+
+
+def test_5xx_is_deferred_after_retries():
+    result, calls = post_with([httpx.Response(503)] * 4)
+    assert isinstance(result, PostDeferred)
+    assert result.retries == 3
+    assert calls == 4
+
+
+def test_retries_are_returned_per_call_on_shared_client():
+    # 共有プールと同じく、複数のスレッドから同じクライアントで投稿しても再試行回数が混ざらない
+    client = XPostClient(CREDENTIALS, base_url="https://api.test", max_retries=3, sleep=no_sleep)
+    failures = {}
+    lock = threading.Lock()
+
+    def handler(request):
+        # 本文「再試行回数-番号」の回数だけ503を返す
+        text = json.loads(request.content)['text']
+        with lock:
+            failures[text] = failures.get(text, 0) + 1
+            failed = failures[text] <= int(text.split('-')[0])
+        return httpx.Response(503) if failed else httpx.Response(201, json={'data': {'id': text}})
+
+    results = {}
+
+    def post(text):
+        async def run():
+            async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as http:
+                return await client.create_tweet_async(text, http)
+        results[text] = asyncio.run(run())
+
+    texts = [f"{retries}-{number}" for retries in range(4) for number in range(5)]
+    threads = [threading.Thread(target=post, args=(text,)) for text in texts]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == {text: (text, int(text.split('-')[0])) for text in texts}
+
+
+def test_budget_save_keeps_other_accounts(tmp_path):
+    budget_file = str(tmp_path / 'rate_limits.json')
+    budgets = [RateLimitBudget(budget_file, f"account{number}") for number in range(8)]
+    headers = {'x-rate-limit-limit': '100', 'x-rate-limit-remaining': '50', 'x-rate-limit-reset': '2000000000'}
+
+    def update(budget):
+        for _ in range(20):
+            budget.update('POST /2/tweets', headers)
+
+    threads = [threading.Thread(target=update, args=(budget,)) for budget in budgets]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    with open(budget_file, 'r', encoding='utf-8') as f:
+        assert sorted(json.load(f)) == sorted(budget.key for budget in budgets)
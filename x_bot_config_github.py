@@ -18,7 +18,28 @@ TEST_POSTS_PER_DAY = 999  # テスト用: 大量の投稿制限
 
 # ファイル設定
 CSV_FILE = "kindle_unlimited_biz_10_with_links.csv"  # 新しい出力ファイル名
-POSTING_HISTORY_FILE = "posting_history.json"
+POSTING_HISTORY_FILE = "posting_history.json"  # 従来の投稿履歴（投稿台帳に取り込み済み）
+POSTING_LEDGER_FILE = "posting_ledger.jsonl"  # 投稿台帳（1投稿1行の追記専用）
+POSTING_PLAN_FILE = "posting_plan.json"  # 1日の投稿計画（自動生成）
+
+# 投稿計画設定
+USE_POSTING_PLAN = True  # True: 1日の投稿時刻を事前に決める, False: 毎時の確率判定
+POSTING_PLAN_SEED = ""  # 投稿計画のシード（同じ日付・シードからは同じ計画になる）
+
+# 投稿ローテーション設定
+USE_ROTATION_DECK = True  # True: 全件を一巡するまで同じ本を投稿しない, False: 今日未投稿の本からランダム
+ROTATION_DECK_FILE = "rotation_deck.bin"  # 山札（自動生成）
+ROTATION_STATE_FILE = "rotation_state.json"  # 山札の状態（自動生成）
+
+# 複数アカウント設定（multi_account_engine.py で使用、空の場合は上の設定で1アカウント）
+# name: アカウント名（投稿台帳・投稿計画・山札のファイル名に付く）
+# env_prefix: 認証情報の環境変数の接頭辞（例: X_BIZ_API_KEY, X_BIZ_API_SECRET, ...）
+# その他の項目（CSV_FILE, POSTS_PER_DAY, POST_TEMPLATES など）は上の設定を上書きする
+ACCOUNT_PROFILES = []
+# ACCOUNT_PROFILES = [
+#     {'name': 'biz', 'env_prefix': 'X_BIZ_', 'CSV_FILE': "kindle_unlimited_biz_10_with_links.csv"},
+#     {'name': 'novel', 'env_prefix': 'X_NOVEL_', 'CSV_FILE': "kindle_unlimited_novel_with_links.csv", 'POSTS_PER_DAY': 5},
+# ]
 
 # テスト設定
 TEST_MODE = False  # False: 実際のX投稿を有効にする
@@ -30,6 +51,17 @@ X_ACCESS_TOKEN = os.getenv('X_ACCESS_TOKEN', "your-x-access-token")
 X_ACCESS_TOKEN_SECRET = os.getenv('X_ACCESS_TOKEN_SECRET', "your-x-access-token-secret")
 X_BEARER_TOKEN = os.getenv('X_BEARER_TOKEN', "your-x-bearer-token")
 
+# X API投稿設定
+X_API_BASE_URL = "https://api.x.com"  # X APIのベースURL（動作確認時は fake_x_api_server.py のURL）
+X_POST_MAX_RETRIES = 3  # 5xx・通信エラーの再試行回数（レート制限では待機せず次のスロットに延期）
+X_POST_BACKOFF_SECONDS = 1.0  # 再試行の待機時間の基準（秒、1回ごとに2倍・ジッター付き）
+X_RATE_LIMIT_FILE = "x_rate_limit.json"  # レート制限の残り回数（自動生成）
+X_IDENTITY_CACHE_FILE = "x_identity_cache.json"  # 認証したユーザーのキャッシュ（自動生成、起動時の認証確認を省略）
+
+# 計測設定
+METRICS_FILE = "bot_metrics.json"  # 処理時間・投稿数などの累計と直近の実行（自動生成、CIでアップロード）
+METRICS_PROM_FILE = "bot_metrics.prom"  # Prometheusのテキスト形式（自動生成）
+
 # 投稿テンプレート
 POST_TEMPLATES = [
     "{introduction}\n\n{short_url}\n\n#KUおすすめリスト",
@@ -44,4 +76,9 @@ POST_TEMPLATES = [
 
 # エラー通知設定
 ERROR_NOTIFICATION = True  # エラー時の通知
-LOG_FILE = "x_bot.log"  # ログファイル 
\ No newline at end of file
+LOG_FILE = "x_bot.log"  # ログファイル（1行1件のJSON）
+LOG_LEVEL = "INFO"  # ログファイルに出力するレベル（DEBUGにすると投稿済みアイテムの一覧なども出力）
+LOG_CONSOLE_LEVEL = "WARNING"  # ターミナルに出力するレベル（投稿の判定・結果は常に表示）
+LOG_MAX_BYTES = 1_000_000  # ログファイルの上限（バイト、超えたら x_bot.log.1 に移動）
+LOG_BACKUP_COUNT = 3  # 残す古いログファイルの数
+LOG_JSON_LINES = True  # True: JSON Lines, False: 従来のテキスト形式
\ No newline at end of file
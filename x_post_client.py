@@ -0,0 +1,499 @@
+"""
+X API v2 の非同期投稿クライアント
+asyncio + httpx で投稿し、レスポンスのレート制限ヘッダーからエンドポイントごとの残り回数を記録します
+
+- 429（レート制限）や残り回数が0の場合は待機せずに PostDeferred を送出する（次のスロットで投稿）
+- 5xx・通信エラーはジッター付きの指数バックオフで再試行し、上限に達したら PostDeferred を送出する
+  （投稿は接続後の通信エラー（読み込みのタイムアウトなど）では再試行しない、
+  5xxの後の再試行が重複投稿の403になった場合は最初の投稿が成功していたとみなす）
+- その他の4xx（重複投稿・権限エラーなど）は XPostError を送出する（再試行しない）
+
+認証したユーザーは認証情報のハッシュをキーにキャッシュし、起動時には確認しません
+（確認は投稿が401になった場合と、まだキャッシュがない場合の投稿後だけ）
+
+使い方:
+    client = XPostClient(credentials, identity_cache=IdentityCache("x_identity_cache.json"))
+    tweet_id = client.post("本文")   # 同期コードから呼び出す
+"""
+
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import os
+import random
+import secrets
+import threading
+import time
+from urllib.parse import quote
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+DEFAULT_BASE_URL = "https://api.x.com"
+
+# レート制限の記録に使うエンドポイント名
+TWEETS_ENDPOINT = "POST /2/tweets"
+USERS_ME_ENDPOINT = "GET /2/users/me"
+
+# 再試行するHTTPステータス（サーバー側の一時的なエラー）
+RETRY_STATUSES = {500, 502, 503, 504}
+
+# レート制限の保存先ごとのロック（複数のアカウントが同じファイルを読み込み・更新・置き換えするため）
+_budget_file_locks = {}
+_budget_file_locks_lock = threading.Lock()
+
+
+def budget_file_lock(budget_file):
+    """
+    レート制限の保存先のロック（同じパスには同じロックを返す）
+    """
+    path = os.path.abspath(budget_file)
+    with _budget_file_locks_lock:
+        return _budget_file_locks.setdefault(path, threading.Lock())
+
+
+def is_available():
+    """
+    非同期投稿クライアントが使用可能か（httpxがインストールされているか）
+    """
+    return httpx is not None
+
+
+class XPostError(Exception):
+    """
+    再試行しても成功しない投稿エラー（重複投稿・権限エラーなど）
+    """
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+        # 失敗するまでの再試行回数（ログ・ベンチマーク用）
+        self.retries = 0
+
+
+class XAuthError(XPostError):
+    """
+    認証エラー（401、認証情報が無効・取り消された場合）
+    """
+
+
+class PostDeferred(Exception):
+    """
+    今は投稿できないエラー（レート制限・サーバーの一時的なエラー）
+    投稿は失敗扱いにせず、次のスロットで投稿し直す
+    """
+    def __init__(self, message, retry_at=None, status=None):
+        super().__init__(message)
+        # 投稿できるようになる時刻（UNIX時間、不明な場合はNone）
+        self.retry_at = retry_at
+        self.status = status
+        # 延期するまでの再試行回数（ログ・ベンチマーク用）
+        self.retries = 0
+
+
+def is_duplicate_error(response):
+    """
+    重複投稿のエラー（403 "duplicate content"）か
+    """
+    return response.status_code == 403 and 'duplicate' in response.text
+
+
+def credential_fingerprint(credentials):
+    """
+    認証情報を識別するハッシュ（レート制限の記録などのキーに使う、認証情報そのものは保存しない）
+    """
+    return hashlib.sha256("\0".join(str(value) for value in credentials).encode('utf-8')).hexdigest()[:16]
+
+
+def _percent_encode(value):
+    return quote(str(value), safe='~-._')
+
+
+def oauth1_header(method, url, credentials, params=None, nonce=None, timestamp=None):
+    """
+    OAuth 1.0a（HMAC-SHA1）の Authorization ヘッダーを作成
+    JSON本文は署名に含めないので、署名の対象はクエリパラメータのみ
+
+    Args:
+        method (str): HTTPメソッド
+        url (str): クエリを含まないURL
+        credentials (tuple): (API Key, API Secret, Access Token, Access Token Secret, Bearer Token)
+        params (dict): クエリパラメータ
+    """
+    api_key, api_secret, access_token, access_token_secret = credentials[:4]
+    oauth = {
+        'oauth_consumer_key': api_key,
+        'oauth_nonce': nonce or secrets.token_hex(16),
+        'oauth_signature_method': 'HMAC-SHA1',
+        'oauth_timestamp': str(int(timestamp if timestamp is not None else time.time())),
+        'oauth_token': access_token,
+        'oauth_version': '1.0'
+    }
+
+    pairs = sorted((_percent_encode(k), _percent_encode(v)) for k, v in {**(params or {}), **oauth}.items())
+    parameter_string = '&'.join(f"{k}={v}" for k, v in pairs)
+    base_string = '&'.join([method.upper(), _percent_encode(url), _percent_encode(parameter_string)])
+    signing_key = f"{_percent_encode(api_secret)}&{_percent_encode(access_token_secret)}"
+    signature = hmac.new(signing_key.encode('utf-8'), base_string.encode('utf-8'), hashlib.sha1).digest()
+    oauth['oauth_signature'] = base64.b64encode(signature).decode('ascii')
+
+    return 'OAuth ' + ', '.join(f'{_percent_encode(k)}="{_percent_encode(v)}"' for k, v in sorted(oauth.items()))
+
+
+class RateLimitBudget:
+    def __init__(self, budget_file=None, key=""):
+        """
+        エンドポイントごとのレート制限の残り回数（x-rate-limit-* ヘッダーの値）
+
+        Args:
+            budget_file (str): 保存先（Noneの場合は保存しない、毎時実行でも前回の残り回数を使えるようにする）
+            key (str): 認証情報のハッシュ（同じファイルを複数のアカウントで使う場合の区別）
+        """
+        self.budget_file = budget_file
+        self.key = key
+        self.lock = threading.Lock()
+        self.limits = {}
+        if budget_file and os.path.exists(budget_file):
+            try:
+                with open(budget_file, 'r', encoding='utf-8') as f:
+                    self.limits = json.load(f).get(key, {})
+            except Exception:
+                self.limits = {}
+
+    def wait_seconds(self, endpoint, now=None):
+        """
+        エンドポイントの残り回数が0の場合、リセットまでの秒数（投稿できる場合は0）
+        """
+        now = now if now is not None else time.time()
+        with self.lock:
+            limit = self.limits.get(endpoint)
+            if not limit or limit['remaining'] > 0 or limit['reset'] <= now:
+                return 0.0
+            return limit['reset'] - now
+
+    def reset_at(self, endpoint):
+        """
+        エンドポイントのレート制限がリセットされる時刻（UNIX時間、不明な場合はNone）
+        """
+        limit = self.limits.get(endpoint)
+        return limit['reset'] if limit else None
+
+    def update(self, endpoint, headers, now=None):
+        """
+        レスポンスのヘッダーから残り回数を記録
+
+        Returns:
+            bool: レート制限のヘッダーがあった場合True
+        """
+        try:
+            limit = {
+                'limit': int(headers['x-rate-limit-limit']),
+                'remaining': int(headers['x-rate-limit-remaining']),
+                'reset': int(headers['x-rate-limit-reset'])
+            }
+        except (KeyError, TypeError, ValueError):
+            return False
+
+        with self.lock:
+            self.limits[endpoint] = limit
+            self.save()
+        return True
+
+    def exhaust(self, endpoint, reset):
+        """
+        残り回数を0にする（ヘッダーのない429の場合）
+        """
+        with self.lock:
+            self.limits[endpoint] = {'limit': 0, 'remaining': 0, 'reset': int(reset)}
+            self.save()
+
+    def save(self):
+        """
+        残り回数を保存（一時ファイルに書いてから置き換え、他のアカウントの記録は残す）
+        読み込みから置き換えまでをファイルごとのロックで囲み、他のアカウントの更新を上書きしない
+        """
+        if not self.budget_file:
+            return
+        with budget_file_lock(self.budget_file):
+            data = {}
+            if os.path.exists(self.budget_file):
+                try:
+                    with open(self.budget_file, 'r', encoding='utf-8') as f:
+                        data = json.load(f)
+                except Exception:
+                    data = {}
+            data[self.key] = self.limits
+            tmp_file = f"{self.budget_file}.tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_file, self.budget_file)
+
+
+class IdentityCache:
+    def __init__(self, cache_file):
+        """
+        認証したユーザー（ID・ユーザー名）のキャッシュ
+        認証情報のハッシュをキーにするので、認証情報が変わった場合は自動的に無効になる
+
+        Args:
+            cache_file (str): キャッシュファイル（Noneの場合はプロセス内のみ）
+        """
+        self.cache_file = cache_file
+        self.lock = threading.Lock()
+        self.identities = {}
+        if cache_file and os.path.exists(cache_file):
+            try:
+                with open(cache_file, 'r', encoding='utf-8') as f:
+                    self.identities = json.load(f)
+            except Exception:
+                self.identities = {}
+
+    def get(self, credentials):
+        """
+        キャッシュしたユーザー（{'id', 'username', 'verified_at'}、ない場合はNone）
+        """
+        return self.identities.get(credential_fingerprint(credentials))
+
+    def put(self, credentials, user):
+        """
+        get_me の結果をキャッシュ
+        """
+        identity = {
+            'id': user.get('id'),
+            'username': user.get('username'),
+            'verified_at': int(time.time())
+        }
+        with self.lock:
+            self.identities[credential_fingerprint(credentials)] = identity
+            self.save()
+        return identity
+
+    def forget(self, credentials):
+        """
+        キャッシュを削除（認証エラーになった場合）
+        """
+        with self.lock:
+            if self.identities.pop(credential_fingerprint(credentials), None) is not None:
+                self.save()
+
+    def save(self):
+        """
+        キャッシュを保存（一時ファイルに書いてから置き換え）
+        """
+        if not self.cache_file:
+            return
+        tmp_file = f"{self.cache_file}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(self.identities, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_file, self.cache_file)
+
+
+class XPostClient:
+    def __init__(self, credentials, base_url=DEFAULT_BASE_URL, timeout=10, max_retries=3,
+                 backoff_seconds=1.0, max_backoff_seconds=30.0, budget_file=None,
+                 identity_cache=None, sleep=None):
+        """
+        非同期投稿クライアントの初期化
+
+        Args:
+            credentials (tuple): (API Key, API Secret, Access Token, Access Token Secret, Bearer Token)
+            base_url (str): X APIのベースURL（ベンチマーク時はローカルの代替サーバー）
+            timeout (float): タイムアウト時間（秒）
+            max_retries (int): 5xx・通信エラーの再試行回数
+            backoff_seconds (float): 再試行の待機時間の基準（1回ごとに2倍、0〜上限のランダム）
+            max_backoff_seconds (float): 再試行の待機時間の上限（秒）
+            budget_file (str): レート制限の残り回数の保存先
+            identity_cache (IdentityCache): 認証したユーザーのキャッシュ（Noneの場合はプロセス内のみ）
+            sleep: 再試行の待機に使う関数（ベンチマーク用、Noneの場合は asyncio.sleep）
+        """
+        if httpx is None:
+            raise ImportError("httpx がインストールされていません（pip install 'httpx[http2]'）")
+
+        self.credentials = credentials
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.max_retries = max(0, max_retries)
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.budget = RateLimitBudget(budget_file, credential_fingerprint(credentials))
+        self.identity_cache = identity_cache or IdentityCache(None)
+        self.sleep = sleep or asyncio.sleep
+        self.rng = random.Random()
+
+    def backoff(self, attempt):
+        """
+        再試行までの待機時間（フルジッター: 0〜基準×2^attempt のランダム）
+        """
+        return self.rng.uniform(0, min(self.max_backoff_seconds, self.backoff_seconds * (2 ** attempt)))
+
+    async def request(self, http, method, path, endpoint, json_body=None):
+        """
+        署名付きのリクエストを送信（5xx・通信エラーは再試行）
+
+        Args:
+            http (httpx.AsyncClient): HTTPクライアント
+            endpoint (str): レート制限の記録に使うエンドポイント名
+
+        Returns:
+            tuple: (レスポンスのJSON, 再試行回数)
+            （共有プールでは複数のスレッドが同じクライアントを使うので、クライアントの属性にはしない）
+
+        Raises:
+            PostDeferred: レート制限中、または再試行しても一時的なエラーが続いた場合
+            XPostError: その他のエラー
+            （どちらも retries 属性にそれまでの再試行回数を入れる）
+        """
+        wait = self.budget.wait_seconds(endpoint)
+        if wait > 0:
+            raise PostDeferred(f"レート制限中です（{endpoint}、あと{int(wait)}秒）",
+                               retry_at=self.budget.reset_at(endpoint), status=429)
+
+        url = f"{self.base_url}{path}"
+        attempt = 0
+        try:
+            for attempt in range(self.max_retries + 1):
+                headers = {'Authorization': oauth1_header(method, url, self.credentials)}
+                try:
+                    response = await http.request(method, url, json=json_body, headers=headers)
+                except httpx.TransportError as e:
+                    sent = not isinstance(e, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout))
+                    if method == 'POST' and sent:
+                        # 接続後のエラーは投稿されたかどうかわからないので再試行しない（重複投稿になる）
+                        raise PostDeferred(f"通信エラー（投稿されたかどうか不明）: {e}")
+                    error = PostDeferred(f"通信エラー: {e}")
+                else:
+                    self.budget.update(endpoint, response.headers)
+                    if response.status_code < 300:
+                        return response.json(), attempt
+                    if method == 'POST' and attempt > 0 and is_duplicate_error(response):
+                        # 5xxを返した最初の投稿が実際には成功していた（ツイートIDは不明）
+                        return {'data': {'id': None}}, attempt
+                    if response.status_code == 429:
+                        reset = self.budget.reset_at(endpoint)
+                        if reset is None or reset <= time.time():
+                            # リセット時刻がわからない場合は15分後（X APIのレート制限の単位）
+                            reset = time.time() + 15 * 60
+                            self.budget.exhaust(endpoint, reset)
+                        raise PostDeferred(f"レート制限に達しました（{endpoint}）", retry_at=reset, status=429)
+                    if response.status_code == 401:
+                        raise XAuthError(f"X API認証エラー: {response.text[:200]}", status=401)
+                    if response.status_code not in RETRY_STATUSES:
+                        raise XPostError(f"X APIエラー {response.status_code}: {response.text[:200]}",
+                                         status=response.status_code)
+                    error = PostDeferred(f"X APIの一時的なエラー {response.status_code}", status=response.status_code)
+
+                if attempt < self.max_retries:
+                    await self.sleep(self.backoff(attempt))
+            raise error
+        except (PostDeferred, XPostError) as e:
+            # 再試行した回数（最初のリクエストは数えない）
+            e.retries = attempt
+            raise
+
+    def _create_client(self):
+        return httpx.AsyncClient(timeout=self.timeout)
+
+    async def create_tweet_async(self, text, http=None):
+        """
+        投稿（http を渡した場合はその接続を使い回す）
+
+        Returns:
+            tuple: (ツイートID, 再試行回数)
+        """
+        if http is None:
+            async with self._create_client() as http:
+                return await self.create_tweet_async(text, http)
+        data, retries = await self.request(http, 'POST', '/2/tweets', TWEETS_ENDPOINT, {'text': text})
+        return data['data']['id'], retries
+
+    async def get_me_async(self, http=None):
+        """
+        認証したユーザーの情報を取得
+
+        Returns:
+            dict: {'id', 'name', 'username'}
+        """
+        if http is None:
+            async with self._create_client() as http:
+                return await self.get_me_async(http)
+        data, _ = await self.request(http, 'GET', '/2/users/me', USERS_ME_ENDPOINT)
+        return data['data']
+
+    @property
+    def identity(self):
+        """
+        キャッシュした認証ユーザー（未確認の場合はNone、ネットワークにはアクセスしない）
+        """
+        return self.identity_cache.get(self.credentials)
+
+    async def verify_async(self, http=None):
+        """
+        get_me で認証を確認してキャッシュを更新（認証エラーの場合はキャッシュを削除）
+
+        Returns:
+            dict: キャッシュした認証ユーザー
+        """
+        try:
+            user = await self.get_me_async(http)
+        except XAuthError:
+            self.identity_cache.forget(self.credentials)
+            raise
+        return self.identity_cache.put(self.credentials, user)
+
+    async def post_async(self, text):
+        """
+        投稿（認証の確認は投稿が認証エラーになった場合と、認証ユーザーが未確認の場合だけ行う）
+
+        Returns:
+            tuple: (ツイートID, 再試行回数)
+
+        Raises:
+            XAuthError: 認証を確認し直しても認証エラーになる場合
+        """
+        async with self._create_client() as http:
+            try:
+                tweet_id, retries = await self.create_tweet_async(text, http)
+            except XAuthError as e:
+                # 認証情報が本当に無効かを確認してから1回だけ投稿し直す
+                await self.verify_async(http)
+                try:
+                    tweet_id, retries = await self.create_tweet_async(text, http)
+                except (XPostError, PostDeferred) as retry_error:
+                    retry_error.retries += e.retries
+                    raise
+                retries += e.retries
+
+            if self.identity is None:
+                try:
+                    await self.verify_async(http)
+                except (XPostError, PostDeferred):
+                    # 投稿は成功しているので、確認は次の投稿時に行う
+                    pass
+            return tweet_id, retries
+
+    def post(self, text):
+        """
+        投稿（同期コードから呼び出す）
+
+        Returns:
+            tuple: (ツイートID, 再試行回数)
+        """
+        return asyncio.run(self.post_async(text))
+
+    def create_tweet(self, text):
+        """
+        投稿（同期コードから呼び出す、認証の確認は行わない）
+
+        Returns:
+            tuple: (ツイートID, 再試行回数)
+        """
+        return asyncio.run(self.create_tweet_async(text))
+
+    def get_me(self):
+        """
+        認証したユーザーの情報を取得（同期コードから呼び出す）
+        """
+        return asyncio.run(self.get_me_async())
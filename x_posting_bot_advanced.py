@@ -1,26 +1,47 @@
-import pandas as pd
-import random
 import time
-import json
+_IMPORT_STARTED = time.perf_counter()
+
+import argparse
+import random
 import os
+import sys
+import signal
 import logging
-from datetime import datetime, timedelta
-import schedule
+import importlib
 import threading
-import tweepy
+from datetime import datetime, timedelta
+
+from bot_logging import AccountLogAdapter, setup_bot_logging
+from bot_metrics import BotMetrics
+from catalog_index import load_catalog
+from posting_ledger import PostingLedger
+from rotation_deck import RotationDeck
+from posting_planner import (JST, build_daily_plan, decide_from_plan, jst_now,
+                             load_daily_plan, next_slot_time)
 
 # 設定ファイルの読み込み（GitHub Actions対応版を優先）
+_CONFIG_STARTED = time.perf_counter()
 try:
     from x_bot_config_github import *
+    CONFIG_MODULE = 'x_bot_config_github'
     print("GitHub Actions用設定ファイルを使用")
 except ImportError:
     try:
         from x_bot_config import *
+        CONFIG_MODULE = 'x_bot_config'
         print("通常の設定ファイルを使用")
     except ImportError:
         print("設定ファイルが見つかりません。")
         exit(1)
 
+
+def config_value(name, default):
+    """
+    選択した設定ファイル（CONFIG_MODULE）の値（設定ファイルにない場合は既定値）
+    """
+    return getattr(sys.modules[CONFIG_MODULE], name, default)
+
+
 # テスト用設定のインポート
 try:
     from x_bot_config_github import TEST_POSTING_HOURS, TEST_POSTS_PER_DAY
@@ -28,13 +49,281 @@ except ImportError:
     TEST_POSTING_HOURS = (0, 23)
     TEST_POSTS_PER_DAY = 999
 
+# 投稿台帳の設定
+POSTING_LEDGER_FILE = config_value('POSTING_LEDGER_FILE', "posting_ledger.jsonl")
+
+# 投稿ローテーションの設定
+USE_ROTATION_DECK = config_value('USE_ROTATION_DECK', True)
+ROTATION_DECK_FILE = config_value('ROTATION_DECK_FILE', "rotation_deck.bin")
+ROTATION_STATE_FILE = config_value('ROTATION_STATE_FILE', "rotation_state.json")
+
+# 投稿計画の設定
+USE_POSTING_PLAN = config_value('USE_POSTING_PLAN', True)
+POSTING_PLAN_FILE = config_value('POSTING_PLAN_FILE', "posting_plan.json")
+POSTING_PLAN_SEED = config_value('POSTING_PLAN_SEED', "")
+
+# 常駐モードの設定
+# 待機中に時刻を確認し直す間隔（秒）
+DAEMON_MAX_SLEEP_SECONDS = config_value('DAEMON_MAX_SLEEP_SECONDS', 60)
+# 投稿に失敗した場合に再試行するまでの最小間隔（秒）
+DAEMON_RETRY_SECONDS = config_value('DAEMON_RETRY_SECONDS', 300)
+
+# X API投稿設定
+X_API_BASE_URL = config_value('X_API_BASE_URL', "https://api.x.com")
+X_POST_MAX_RETRIES = config_value('X_POST_MAX_RETRIES', 3)
+X_POST_BACKOFF_SECONDS = config_value('X_POST_BACKOFF_SECONDS', 1.0)
+X_RATE_LIMIT_FILE = config_value('X_RATE_LIMIT_FILE', "x_rate_limit.json")
+X_IDENTITY_CACHE_FILE = config_value('X_IDENTITY_CACHE_FILE', "x_identity_cache.json")
+
+# ログ設定
+LOG_LEVEL = config_value('LOG_LEVEL', "INFO")
+LOG_CONSOLE_LEVEL = config_value('LOG_CONSOLE_LEVEL', "WARNING")
+LOG_MAX_BYTES = config_value('LOG_MAX_BYTES', 1_000_000)
+LOG_BACKUP_COUNT = config_value('LOG_BACKUP_COUNT', 3)
+LOG_JSON_LINES = config_value('LOG_JSON_LINES', True)
+
+# 複数アカウントの設定（multi_account_engine.py）
+ACCOUNT_PROFILES = config_value('ACCOUNT_PROFILES', [])
+
+# 計測の設定
+METRICS_FILE = config_value('METRICS_FILE', "bot_metrics.json")
+METRICS_PROM_FILE = config_value('METRICS_PROM_FILE', "bot_metrics.prom")
+
+# 設定ファイルの読み込みにかかった時間
+CONFIG_SECONDS = time.perf_counter() - _CONFIG_STARTED
+
+# モジュールの読み込みにかかった時間（httpx等の重いライブラリは投稿時まで読み込まない）
+IMPORT_SECONDS = time.perf_counter() - _IMPORT_STARTED
+
+# 処理ごとの時間・投稿数などの計測（プロセス内で共有し、終了時に累計に加算して保存）
+metrics = BotMetrics(METRICS_FILE, METRICS_PROM_FILE)
+metrics.record('config_load', CONFIG_SECONDS)
+metrics.record('import', IMPORT_SECONDS - CONFIG_SECONDS)
+
+
+def save_metrics():
+    """
+    計測を保存（保存に失敗しても投稿処理には影響させない）
+    """
+    try:
+        metrics.save()
+    except Exception as e:
+        logging.getLogger(__name__).warning("計測の保存エラー: %s", e)
+
+
+def is_test_mode_env():
+    """
+    環境変数 TEST_MODE でテストモードが指定されているか
+    """
+    return os.getenv('TEST_MODE', 'false').lower() == 'true'
+
+
+def count_posted_today(ledger_file, legacy_history_file=None):
+    """
+    投稿台帳から今日の投稿数を数える（台帳の末尾の今日の分だけを読み込む）
+    """
+    try:
+        return PostingLedger(ledger_file, legacy_history_file).count_on()
+    except Exception:
+        return 0
+
+
+def decide_posting(current_hour, posting_hours, posts_per_day, today_posts,
+                   min_probability, max_probability, roll=None):
+    """
+    投稿するかどうかを判定（標準ライブラリのみで計算する）
+
+    Args:
+        current_hour (int): 現在の時（UTC）
+        posting_hours (tuple): 投稿時間（日本時間の開始時, 終了時）
+        posts_per_day (int): 1日の投稿上限
+        today_posts (int): 今日の投稿数
+        min_probability (float): 最小投稿確率
+        max_probability (float): 最大投稿確率
+        roll (float): 乱数（Noneの場合は random.random()）
+
+    Returns:
+        dict: 判定結果
+            'post': 投稿するかどうか
+            'reason': 'outside_hours' / 'limit' / 'probability'
+            'jst_hour', 'today_posts', 'remaining_posts', 'probability'
+    """
+    # GitHub ActionsはUTC時間で動作するため、日本時間に変換
+    jst_hour = (current_hour + 9) % 24
+    decision = {
+        'post': False,
+        'reason': 'probability',
+        'jst_hour': jst_hour,
+        'today_posts': today_posts,
+        'remaining_posts': max(0, posts_per_day - today_posts),
+        'probability': 0.0
+    }
+
+    # 投稿時間外の場合は投稿しない（日本時間で判定）
+    if not (posting_hours[0] <= jst_hour <= posting_hours[1]):
+        decision['reason'] = 'outside_hours'
+        return decision
+
+    # 今日の上限に達している場合は投稿しない
+    if today_posts >= posts_per_day:
+        decision['reason'] = 'limit'
+        return decision
+
+    # 残り時間と残り投稿回数で確率を調整（日本時間で計算）
+    remaining_hours = posting_hours[1] - jst_hour + 1
+    remaining_posts = posts_per_day - today_posts
+
+    # 効率的な投稿確率計算
+    if remaining_posts >= remaining_hours:
+        # 残り投稿数が残り時間より多い場合、高確率で投稿
+        probability = max_probability
+    else:
+        # 残り投稿数が少ない場合、確率を調整
+        base_probability = remaining_posts / remaining_hours
+        probability = max(min_probability,
+                          min(max_probability, base_probability * 0.8))
+
+    # ランダム判定
+    if roll is None:
+        roll = random.random()
+    decision['probability'] = probability
+    decision['post'] = roll < probability
+    return decision
+
+
+def decide_by_plan(posting_hours, posts_per_day, interval_min, today_posts, now=None,
+                   plan_file=None, plan_seed=None):
+    """
+    1日の投稿計画で投稿するかどうかを判定（計画は1日1回だけ作成して保存）
+
+    Args:
+        now (datetime): 現在時刻（日本時間、Noneの場合は現在時刻）
+        plan_file (str): 投稿計画ファイル（Noneの場合は POSTING_PLAN_FILE）
+        plan_seed (str): 投稿計画のシード（Noneの場合は POSTING_PLAN_SEED）
+
+    Returns:
+        dict: decide_posting と同じ形式の判定結果
+    """
+    now = now or jst_now()
+    if not (posting_hours[0] <= now.hour <= posting_hours[1]):
+        return {
+            'post': False,
+            'reason': 'outside_hours',
+            'jst_hour': now.hour,
+            'today_posts': today_posts,
+            'remaining_posts': max(0, posts_per_day - today_posts),
+            'probability': 0.0
+        }
+
+    plan = load_daily_plan(plan_file or POSTING_PLAN_FILE, now.strftime('%Y-%m-%d'), posting_hours,
+                           posts_per_day, interval_min,
+                           POSTING_PLAN_SEED if plan_seed is None else plan_seed)
+    return decide_from_plan(plan, now.hour * 60 + now.minute, today_posts, posts_per_day)
+
+
+def decide_first():
+    """
+    BOTを初期化する前に、投稿時間と今日の投稿数だけで投稿するかどうかを判定
+    （スキップする実行ではX APIの認証やCSVの読み込みを行わない）
+    """
+    posting_hours = TEST_POSTING_HOURS if is_test_mode_env() else POSTING_HOURS
+    if USE_POSTING_PLAN:
+        return decide_by_plan(posting_hours, POSTS_PER_DAY, POSTING_INTERVAL_MIN,
+                              count_posted_today(POSTING_LEDGER_FILE, POSTING_HISTORY_FILE))
+    return decide_posting(
+        datetime.now().hour,
+        posting_hours,
+        POSTS_PER_DAY,
+        count_posted_today(POSTING_LEDGER_FILE, POSTING_HISTORY_FILE),
+        MIN_POSTING_PROBABILITY,
+        MAX_POSTING_PROBABILITY
+    )
+
+
+# アカウント設定（プロファイル）で上書きできる設定 -> 属性名
+PROFILE_SETTINGS = {
+    'CSV_FILE': 'csv_file',
+    'POSTING_HISTORY_FILE': 'posting_history_file',
+    'POSTING_LEDGER_FILE': 'posting_ledger_file',
+    'POSTING_PLAN_FILE': 'posting_plan_file',
+    'POSTING_PLAN_SEED': 'posting_plan_seed',
+    'USE_POSTING_PLAN': 'use_posting_plan',
+    'USE_ROTATION_DECK': 'use_rotation_deck',
+    'ROTATION_DECK_FILE': 'rotation_deck_file',
+    'ROTATION_STATE_FILE': 'rotation_state_file',
+    'POSTING_HOURS': 'posting_hours',
+    'POSTS_PER_DAY': 'posts_per_day',
+    'POSTING_INTERVAL_MIN': 'posting_interval_min',
+    'POST_TEMPLATES': 'post_templates',
+    'MIN_POSTING_PROBABILITY': 'min_posting_probability',
+    'MAX_POSTING_PROBABILITY': 'max_posting_probability',
+    'TEST_MODE': 'test_mode',
+    'X_API_KEY': 'x_api_key',
+    'X_API_SECRET': 'x_api_secret',
+    'X_ACCESS_TOKEN': 'x_access_token',
+    'X_ACCESS_TOKEN_SECRET': 'x_access_token_secret',
+    'X_BEARER_TOKEN': 'x_bearer_token',
+}
+
+# アカウント名から自動で決めるファイル名（アカウントごとに履歴・計画・山札を分ける）
+PROFILE_FILE_PATTERNS = {
+    'posting_ledger_file': "posting_ledger_{name}.jsonl",
+    'posting_plan_file': "posting_plan_{name}.json",
+    'rotation_deck_file': "rotation_deck_{name}.bin",
+    'rotation_state_file': "rotation_state_{name}.json",
+}
+
+
+def create_x_client(credentials):
+    """
+    X APIの投稿クライアントを作成
+    レート制限では待機せずに PostDeferred を送出し、5xxはジッター付きのバックオフで再試行する
+
+    Args:
+        credentials (tuple): (API Key, API Secret, Access Token, Access Token Secret, Bearer Token)
+    """
+    # httpxは読み込みに時間がかかるため、投稿するときだけ読み込む
+    from x_post_client import IdentityCache, XPostClient
+    
+    return XPostClient(
+        credentials,
+        base_url=X_API_BASE_URL,
+        max_retries=X_POST_MAX_RETRIES,
+        backoff_seconds=X_POST_BACKOFF_SECONDS,
+        budget_file=X_RATE_LIMIT_FILE,
+        identity_cache=IdentityCache(X_IDENTITY_CACHE_FILE)
+    )
+
+
 class XPostingBotAdvanced:
-    def __init__(self):
+    def __init__(self, profile=None, client_pool=None):
         """
         X投稿BOTの初期化（GitHub Actions対応版）
+        
+        Args:
+            profile (dict): アカウント設定（Noneの場合は設定ファイルの値のみを使用）
+                'name': アカウント名、'env_prefix': 認証情報の環境変数の接頭辞、
+                その他 PROFILE_SETTINGS のキーで設定ファイルの値を上書き
+            client_pool: X APIクライアントの共有プール（multi_account_engine.XClientPool）
         """
+        self.profile = profile or {}
+        self.account_name = self.profile.get('name')
+        self.client_pool = client_pool
+        
         self.csv_file = CSV_FILE
         self.posting_history_file = POSTING_HISTORY_FILE
+        self.posting_ledger_file = POSTING_LEDGER_FILE
+        self.posting_plan_file = POSTING_PLAN_FILE
+        self.posting_plan_seed = POSTING_PLAN_SEED
+        self.use_rotation_deck = USE_ROTATION_DECK
+        self.rotation_deck_file = ROTATION_DECK_FILE
+        self.rotation_state_file = ROTATION_STATE_FILE
+        self.last_template_index = None
+        self.catalog = None
+        # 常駐モードで最後に投稿した時刻（日本時間）
+        self.daemon_last_post = None
+        # レート制限などで投稿を延期した場合、次に投稿できる時刻（日本時間）
+        self.deferred_until = None
         
         # 設定を読み込み
         self.posting_hours = POSTING_HOURS
@@ -49,227 +338,269 @@ class XPostingBotAdvanced:
         self.github_actions_mode = GITHUB_ACTIONS_MODE
         self.min_posting_probability = MIN_POSTING_PROBABILITY
         self.max_posting_probability = MAX_POSTING_PROBABILITY
+        self.use_posting_plan = USE_POSTING_PLAN
+        
+        # X API設定
+        self.x_api_key = X_API_KEY
+        self.x_api_secret = X_API_SECRET
+        self.x_access_token = X_ACCESS_TOKEN
+        self.x_access_token_secret = X_ACCESS_TOKEN_SECRET
+        self.x_bearer_token = X_BEARER_TOKEN
+        
+        # アカウント設定で上書き
+        self.apply_profile(self.profile)
         
         # 先にログ設定
         self.setup_logging()
         
         # テスト用設定の確認
-        test_mode_env = os.getenv('TEST_MODE', 'false').lower()
-        if test_mode_env == 'true':
+        if is_test_mode_env():
             # テストモードでは投稿時間制限を外す
             self.posting_hours = TEST_POSTING_HOURS
             self.posts_per_day = POSTS_PER_DAY  # 本番と同じ9回制限
             self.test_mode = True
             self.logger.info("テストモードが有効です（投稿時間制限なし、9回制限あり）")
         
-        # 投稿履歴を読み込み
-        self.posting_history = self.load_posting_history()
+        # 投稿台帳（従来の投稿履歴 posting_history.json にある投稿は台帳に取り込む）
+        self.ledger = PostingLedger(self.posting_ledger_file, self.posting_history_file)
         
-        # X API設定
-        self.x_api_key = X_API_KEY
-        self.x_api_secret = X_API_SECRET
-        self.x_access_token = X_ACCESS_TOKEN
-        self.x_access_token_secret = X_ACCESS_TOKEN_SECRET
-        self.x_bearer_token = X_BEARER_TOKEN
+        # 投稿ローテーション（山札を一巡するまで同じ本は投稿しない）
+        self.rotation_deck = (RotationDeck(self.rotation_deck_file, self.rotation_state_file)
+                              if self.use_rotation_deck else None)
         
-        # X APIクライアントの初期化
+        # 投稿履歴を読み込み
+        self.load_posting_history()
+        
+        # X APIクライアントは実際に投稿するときに初期化する（ensure_x_client）
         self.x_client = None
-        if not self.test_mode:
-            self.setup_x_api()
         
         # 統計情報
         self.stats = {
             'total_posts': 0,
             'successful_posts': 0,
             'failed_posts': 0,
+            'deferred_posts': 0,
             'last_post_time': None
         }
         
         self.logger.info("X投稿BOT初期化完了（GitHub Actions対応版）")
-        self.logger.info(f"投稿時間: {self.posting_hours[0]}:00-{self.posting_hours[1]}:00")
-        self.logger.info(f"投稿頻度: 1日に{self.posts_per_day}件")
-        self.logger.info(f"GitHub Actionsモード: {'有効' if self.github_actions_mode else '無効'}")
-        self.logger.info(f"テストモード: {'有効' if self.test_mode else '無効'}")
+        self.logger.info("投稿時間: %s:00-%s:00", self.posting_hours[0], self.posting_hours[1])
+        self.logger.info("投稿頻度: 1日に%s件", self.posts_per_day)
+        self.logger.info("GitHub Actionsモード: %s", '有効' if self.github_actions_mode else '無効')
+        self.logger.info("テストモード: %s", '有効' if self.test_mode else '無効')
+    
+    def apply_profile(self, profile):
+        """
+        アカウント設定で設定ファイルの値を上書き
+        """
+        name = profile.get('name')
+        if name:
+            # 履歴・計画・山札はアカウントごとのファイルにする（従来の投稿履歴は取り込まない）
+            self.posting_history_file = None
+            for attribute, pattern in PROFILE_FILE_PATTERNS.items():
+                setattr(self, attribute, pattern.format(name=name))
+        
+        prefix = profile.get('env_prefix')
+        if prefix:
+            # 認証情報は環境変数から取得（例: X_BIZ_API_KEY）
+            self.x_api_key = os.getenv(f"{prefix}API_KEY", self.x_api_key)
+            self.x_api_secret = os.getenv(f"{prefix}API_SECRET", self.x_api_secret)
+            self.x_access_token = os.getenv(f"{prefix}ACCESS_TOKEN", self.x_access_token)
+            self.x_access_token_secret = os.getenv(f"{prefix}ACCESS_TOKEN_SECRET", self.x_access_token_secret)
+            self.x_bearer_token = os.getenv(f"{prefix}BEARER_TOKEN", self.x_bearer_token)
+        
+        for key, attribute in PROFILE_SETTINGS.items():
+            if key in profile:
+                setattr(self, attribute, profile[key])
+    
+    @property
+    def credentials(self):
+        """
+        X APIの認証情報
+        """
+        return (self.x_api_key, self.x_api_secret, self.x_access_token,
+                self.x_access_token_secret, self.x_bearer_token)
     
     def setup_x_api(self):
         """
-        X（Twitter）APIクライアントを初期化
+        X（Twitter）APIクライアントを初期化（ネットワークにはアクセスしない）
+        認証の確認は投稿が認証エラーになった場合だけ行い、認証したユーザーはキャッシュを表示する
         """
         try:
-            # OAuth 1.0a User Context認証
-            auth = tweepy.OAuthHandler(self.x_api_key, self.x_api_secret)
-            auth.set_access_token(self.x_access_token, self.x_access_token_secret)
-            
-            # API v2クライアント
-            self.x_client = tweepy.Client(
-                bearer_token=self.x_bearer_token,
-                consumer_key=self.x_api_key,
-                consumer_secret=self.x_api_secret,
-                access_token=self.x_access_token,
-                access_token_secret=self.x_access_token_secret,
-                wait_on_rate_limit=True
-            )
+            if self.client_pool is not None:
+                # 同じ認証情報のクライアントはプロセス内で共有する
+                self.x_client = self.client_pool.get(self.credentials)
+            else:
+                self.x_client = create_x_client(self.credentials)
             
-            # 認証テスト
-            me = self.x_client.get_me()
-            self.logger.info(f"X API認証成功: @{me.data.username}")
+            identity = self.x_client.identity
+            if identity:
+                self.logger.info("X APIクライアント準備完了: @%s（認証確認済み）", identity['username'])
+            else:
+                self.logger.info("X APIクライアント準備完了（認証は初回の投稿時に確認）")
             
         except Exception as e:
-            self.logger.error(f"X API初期化エラー: {e}")
+            self.logger.error("X API初期化エラー: %s", e)
             print(f"X API初期化エラー: {e}")
             print("テストモードに切り替えます")
             self.test_mode = True
             self.x_client = None
     
+    def ensure_x_client(self):
+        """
+        X APIクライアントが未初期化なら初期化（テストモードでは何もしない）
+        """
+        if not self.test_mode and self.x_client is None:
+            self.setup_x_api()
+        return self.x_client
+    
     def setup_logging(self):
         """
-        ログ設定を初期化
+        ログ設定を初期化（ファイルへの書き込みは別スレッドで行い、サイズの上限でローテーション）
         """
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler(self.log_file, encoding='utf-8'),
-                logging.StreamHandler()
-            ]
-        )
+        setup_bot_logging(self.log_file, LOG_LEVEL, LOG_CONSOLE_LEVEL,
+                          LOG_MAX_BYTES, LOG_BACKUP_COUNT, LOG_JSON_LINES)
         self.logger = logging.getLogger(__name__)
+        if self.account_name:
+            self.logger = AccountLogAdapter(self.logger, {'account': self.account_name})
     
-    def load_posting_history(self):
+    @property
+    def posting_history(self):
         """
-        投稿履歴を読み込み
+        今日の投稿（No -> 投稿台帳の行）
+        日付ごとの索引を使うので、履歴が何日分あっても参照は一定の時間で終わる
         """
-        if os.path.exists(self.posting_history_file):
-            try:
-                with open(self.posting_history_file, 'r', encoding='utf-8') as f:
-                    history = json.load(f)
-                
-                # 日付が変わった場合、古い投稿履歴を自動削除
-                today = datetime.now().strftime('%Y-%m-%d')
-                cleaned_history = {}
-                for index_str, post_date in history.items():
-                    if post_date == today:
-                        cleaned_history[index_str] = post_date
-                
-                # 古い履歴が削除された場合、ファイルを更新
-                if len(cleaned_history) != len(history):
-                    with open(self.posting_history_file, 'w', encoding='utf-8') as f:
-                        json.dump(cleaned_history, f, ensure_ascii=False, indent=2)
-                    self.logger.info(f"古い投稿履歴を自動削除しました (削除前: {len(history)}件 → 削除後: {len(cleaned_history)}件)")
-                else:
-                    self.logger.info(f"投稿履歴読み込み完了: {len(cleaned_history)}件")
-                
-                return cleaned_history
-                
-            except Exception as e:
-                self.logger.error(f"投稿履歴読み込みエラー: {e}")
-                return {}
-        return {}
+        return self.ledger.posted_on()
     
-    def save_posting_history(self):
+    def load_posting_history(self):
         """
-        投稿履歴を保存
+        投稿履歴を読み込み（投稿台帳から今日の投稿だけを読み込む）
+        
+        Returns:
+            dict: No -> 投稿台帳の行
         """
         try:
-            with open(self.posting_history_file, 'w', encoding='utf-8') as f:
-                json.dump(self.posting_history, f, ensure_ascii=False, indent=2)
-            self.logger.info(f"投稿履歴を保存しました: {len(self.posting_history)}件")
+            with metrics.timer('history_load'):
+                history = self.ledger.load()
+            self.logger.info("投稿履歴読み込み完了: %d件", len(history))
+            return history
         except Exception as e:
-            self.logger.error(f"投稿履歴保存エラー: {e}")
+            self.logger.error("投稿履歴読み込みエラー: %s", e)
+            return {}
     
-    def add_to_posting_history(self, post_data):
+    def add_to_posting_history(self, post_data, tweet_id=None, template=None):
         """
-        投稿履歴に追加
+        投稿履歴に追加（投稿台帳に1行追記する）
+        
+        Args:
+            post_data: 投稿データ
+            tweet_id (str): ツイートID（テストモードではNone）
+            template (int): 使用した投稿テンプレートの番号
         """
         today = datetime.now().strftime('%Y-%m-%d')
-        index_str = str(post_data['index'])
+        no = int(post_data['index'])
         
         # 重複チェック
-        if index_str in self.posting_history and self.posting_history[index_str] == today:
-            self.logger.warning(f"重複投稿を防ぎました: {index_str} (今日既に投稿済み)")
+        if no in self.ledger.posted_on(today):
+            self.logger.warning("重複投稿を防ぎました: %s (今日既に投稿済み)", no)
             return False
         
-        # 投稿履歴に追加
-        self.posting_history[index_str] = today
-        self.save_posting_history()
+        # 投稿台帳に追記（今日の投稿の索引も更新される）
+        try:
+            self.ledger.append(no, tweet_id=tweet_id, template=template)
+        except Exception as e:
+            self.logger.error("投稿台帳書き込みエラー: %s", e)
+            # 書き込めなかった場合も、このプロセス内では重複投稿しないようにする
+            self.ledger.posted_on(today)[no] = {'date': today, 'no': no}
         
-        self.logger.info(f"投稿履歴に追加: {index_str} -> {today}")
+        self.logger.info("投稿履歴に追加: %s -> %s", no, today)
         return True
     
     def load_csv_data(self):
         """
         CSVファイルから投稿データを読み込み
+        （カタログインデックスを使用し、CSVが変更された場合のみ解析し直す）
         """
         try:
             if not os.path.exists(self.csv_file):
-                self.logger.error(f"CSVファイルが見つかりません: {self.csv_file}")
+                self.logger.error("CSVファイルが見つかりません: %s", self.csv_file)
                 return []
             
-            df = pd.read_csv(self.csv_file)
-            available_posts = []
-            
-            for index, row in df.iterrows():
-                # 短縮URLがある行のみ対象
-                if pd.notna(row['短縮URL']) and row['短縮URL'] != '':
-                    post_data = {
-                        'index': row['No'],  # No列を使用
-                        'title': row['タイトル'],
-                        'introduction': row['一言紹介文'],
-                        'short_url': row['短縮URL']
-                    }
-                    available_posts.append(post_data)
+            # 短縮URLがある行のみ対象
+            with metrics.timer('csv_load'):
+                self.catalog = load_catalog(self.csv_file, logger=self.logger)
+            available_posts = self.catalog.postable
             
-            self.logger.info(f"投稿可能データ: {len(available_posts)}件")
+            self.logger.info("投稿可能データ: %s件", len(available_posts))
             return available_posts
             
         except Exception as e:
-            self.logger.error(f"CSV読み込みエラー: {e}")
+            self.logger.error("CSV読み込みエラー: %s", e)
             return []
     
     def get_posted_today_count(self):
         """
         今日の投稿数を取得（統一されたカウント処理）
         """
-        today = datetime.now().strftime('%Y-%m-%d')
-        posted_today = len([k for k, v in self.posting_history.items() if v == today])
+        posted_today = self.posting_history
+        
+        # デバッグ情報（投稿済みアイテムの一覧はDEBUGレベルの場合のみ作成）
+        self.logger.info("今日の投稿数: %d件", len(posted_today))
+        if posted_today and self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug("投稿済みアイテム: %s", sorted(posted_today))
+        
+        return len(posted_today)
+    
+    def last_posted_times(self):
+        """
+        投稿台帳から本ごとの最後の投稿日時を取得（山札を作り直すときだけ呼び出す）
         
-        # デバッグ情報を追加
-        self.logger.info(f"今日({today})の投稿数: {posted_today}件")
-        if posted_today > 0:
-            posted_items = [k for k, v in self.posting_history.items() if v == today]
-            self.logger.info(f"投稿済みアイテム: {posted_items}")
+        Returns:
+            dict: No -> 最後に投稿した日時（ISO形式の文字列）
+        """
+        return {entry['no']: entry.get('ts', entry['date']) for entry in self.ledger.iter_entries()}
+    
+    def pick_from_rotation(self):
+        """
+        山札から次に投稿する本を選ぶ（今日投稿済みの本は選ばない）
+        """
+        posted_count = self.get_posted_today_count()
+        if posted_count >= self.posts_per_day:
+            self.logger.info("今日の投稿制限(%s件)に達しました", self.posts_per_day)
+            return None
         
-        return posted_today
+        post_data = self.rotation_deck.pick(self.catalog, self.posting_history, self.last_posted_times)
+        if post_data is not None:
+            state = self.rotation_deck.state
+            self.logger.info("山札から選択: %s巡目 %s/%s件目 (今日の投稿数: %s/%s)",
+                             state['epoch'], self.rotation_deck.pending + 1, state['size'],
+                             posted_count, self.posts_per_day)
+        return post_data
     
     def get_available_posts(self, available_posts):
         """
         今日まだ投稿していない投稿データを取得
         """
-        today = datetime.now().strftime('%Y-%m-%d')
-        posted_today = set()
-        
-        # 今日投稿済みのインデックスを取得
-        for index_str, post_date in self.posting_history.items():
-            if post_date == today:
-                posted_today.add(int(index_str))
-        
-        # 今日投稿していないデータをフィルタ
-        available_today = [post for post in available_posts if post['index'] not in posted_today]
-        
-        # 1日の投稿制限をチェック
+        # 1日の投稿制限をチェック（制限に達している場合は絞り込みを行わない）
         posted_count = self.get_posted_today_count()
         if posted_count >= self.posts_per_day:
-            self.logger.info(f"今日の投稿制限({self.posts_per_day}件)に達しました")
+            self.logger.info("今日の投稿制限(%s件)に達しました", self.posts_per_day)
             return []
         
-        self.logger.info(f"今日投稿可能: {len(available_today)}件 (今日の投稿数: {posted_count}/{self.posts_per_day})")
+        # 今日投稿していないデータをフィルタ（今日投稿済みのNoの索引を参照）
+        posted_today = self.posting_history
+        available_today = [post for post in available_posts if post['index'] not in posted_today]
+        
+        self.logger.info("今日投稿可能: %s件 (今日の投稿数: %s/%s)", len(available_today), posted_count, self.posts_per_day)
         return available_today
     
     def create_post_content(self, post_data):
         """
         投稿内容を作成
         """
-        template = random.choice(self.post_templates)
+        # 使用したテンプレートは投稿台帳に記録する
+        self.last_template_index = random.randrange(len(self.post_templates))
+        template = self.post_templates[self.last_template_index]
         content = template.format(
             introduction=post_data['introduction'],
             short_url=post_data['short_url']
@@ -282,8 +613,12 @@ class XPostingBotAdvanced:
         Xに投稿（テストモードではターミナルに表示、実際の投稿も実行）
         """
         current_time = datetime.now()
+        tweet_id = None
         
         try:
+            # 認証に失敗した場合はテストモードに切り替わる
+            self.ensure_x_client()
+            
             if self.test_mode:
                 # テストモード：ターミナルに表示
                 print("\n" + "="*60)
@@ -296,15 +631,27 @@ class XPostingBotAdvanced:
                 print(f"   タイトル: {post_data['title']}")
                 print("="*60)
                 
-                self.logger.info(f"テスト投稿成功: {post_data['title'][:30]}...")
+                self.logger.info("テスト投稿成功: %s...", post_data['title'][:30])
             else:
                 # 実際のX投稿処理
                 if self.x_client:
-                    # 投稿実行
-                    response = self.x_client.create_tweet(text=content)
-                    tweet_id = response.data['id']
+                    from x_post_client import PostDeferred, XPostError
                     
-                    self.logger.info(f"X投稿成功: Tweet ID {tweet_id}")
+                    # 投稿実行（レート制限・一時的なエラーの場合は待機せずに次のスロットに延期、
+                    # 認証エラーの場合は認証を確認し直してから1回だけ投稿し直す）
+                    try:
+                        with metrics.timer('api_call'):
+                            tweet_id, retries = self.x_client.post(content)
+                    except PostDeferred as e:
+                        metrics.inc('retries', e.retries)
+                        self.defer_post(e)
+                        return False
+                    except XPostError as e:
+                        metrics.inc('retries', e.retries)
+                        raise
+                    metrics.inc('retries', retries)
+                    
+                    self.logger.info("X投稿成功: Tweet ID %s", tweet_id)
                     print(f"✅ X投稿成功: {post_data['title'][:30]}...")
                     print(f"   Tweet ID: {tweet_id}")
                 else:
@@ -313,23 +660,43 @@ class XPostingBotAdvanced:
                     return False
             
             # 新しい履歴管理機能を使用
-            if not self.add_to_posting_history(post_data):
+            with metrics.timer('history_save'):
+                added = self.add_to_posting_history(post_data, tweet_id=tweet_id, template=self.last_template_index)
+            if not added:
                 self.logger.warning("重複投稿を防ぎました")
                 return False
             
             # 統計情報を更新
             self.stats['total_posts'] += 1
             self.stats['successful_posts'] += 1
+            metrics.inc('posts')
             self.stats['last_post_time'] = current_time.strftime('%Y-%m-%d %H:%M:%S')
             
             return True
             
         except Exception as e:
-            self.logger.error(f"投稿エラー: {e}")
+            self.logger.error("投稿エラー: %s", e)
             print(f"❌ 投稿エラー: {e}")
             self.stats['failed_posts'] += 1
+            metrics.inc('failures')
             return False
     
+    def defer_post(self, error):
+        """
+        投稿を次のスロットに延期（失敗扱いにせず、投稿履歴・山札も進めない）
+        
+        Args:
+            error (PostDeferred): 延期の理由（retry_at があればその時刻まで投稿しない）
+        """
+        if error.retry_at:
+            self.deferred_until = datetime.fromtimestamp(error.retry_at, JST).replace(tzinfo=None)
+        else:
+            self.deferred_until = jst_now() + timedelta(minutes=self.posting_interval_min[0])
+        self.logger.warning("投稿を延期します: %s（日本時間%s以降に投稿）", error, self.deferred_until.strftime('%H:%M'))
+        print(f"⏸️ 投稿を延期します: {error}")
+        self.stats['deferred_posts'] += 1
+        metrics.inc('deferrals')
+    
     def schedule_random_posts(self):
         """
         ランダムな時間に投稿をスケジュール
@@ -340,32 +707,42 @@ class XPostingBotAdvanced:
                 self.logger.warning("投稿可能なデータがありません")
                 return False
             
-            available_today = self.get_available_posts(available_posts)
+            if self.rotation_deck is not None:
+                # 山札の順に投稿データを選択
+                post_data = self.pick_from_rotation()
+                available_today = [post_data] if post_data is not None else []
+            else:
+                available_today = self.get_available_posts(available_posts)
+            
             if not available_today:
                 posted_count = self.get_posted_today_count()
                 if posted_count >= self.posts_per_day:
-                    self.logger.warning(f"今日の投稿制限({self.posts_per_day}件)に達しました")
+                    self.logger.warning("今日の投稿制限(%s件)に達しました", self.posts_per_day)
                     print(f"今日の投稿制限({self.posts_per_day}件)に達しました")
                 else:
                     self.logger.warning("今日投稿可能なデータがありません")
                 return False
             
-            # ランダムに投稿データを選択
-            post_data = random.choice(available_today)
-            content = self.create_post_content(post_data)
+            if self.rotation_deck is None:
+                # ランダムに投稿データを選択
+                post_data = random.choice(available_today)
+            with metrics.timer('template_render'):
+                content = self.create_post_content(post_data)
             
             # 投稿実行
             success = self.post_to_x(content, post_data)
             
             if success:
-                self.logger.info(f"投稿成功: {post_data['title'][:30]}...")
+                if self.rotation_deck is not None:
+                    self.rotation_deck.mark_posted(post_data['index'])
+                self.logger.info("投稿成功: %s...", post_data['title'][:30])
             else:
-                self.logger.error(f"投稿失敗: {post_data['title'][:30]}...")
+                self.logger.error("投稿失敗: %s...", post_data['title'][:30])
             
             return success
             
         except Exception as e:
-            self.logger.error(f"投稿スケジュールエラー: {e}")
+            self.logger.error("投稿スケジュールエラー: %s", e)
             return False
     
     def should_post_now(self):
@@ -373,46 +750,63 @@ class XPostingBotAdvanced:
         GitHub Actions対応の投稿判定ロジック
         現在が投稿時間内で、ランダム確率で投稿するかどうかを判定
         """
+        if self.use_posting_plan:
+            with metrics.timer('decision'):
+                decision = decide_by_plan(self.posting_hours, self.posts_per_day,
+                                          self.posting_interval_min, self.get_posted_today_count(),
+                                          plan_file=self.posting_plan_file, plan_seed=self.posting_plan_seed)
+            return self.report_decision(decision)
+        
         # GitHub ActionsはUTC時間で動作するため、日本時間に変換
         current_hour = datetime.now().hour
-        jst_hour = (current_hour + 9) % 24  # UTC+9で日本時間
+        with metrics.timer('decision'):
+            decision = decide_posting(
+                current_hour,
+                self.posting_hours,
+                self.posts_per_day,
+                self.get_posted_today_count(),
+                self.min_posting_probability,
+                self.max_posting_probability
+            )
+        return self.report_decision(decision, current_hour)
+    
+    def report_decision(self, decision, current_hour=None):
+        """
+        投稿判定の結果をログとターミナルに出力
+        """
+        jst_hour = decision['jst_hour']
+        today_posts = decision['today_posts']
+        remaining_posts = decision['remaining_posts']
+        probability = decision['probability']
         
-        self.logger.info(f"UTC時間: {current_hour}時, 日本時間: {jst_hour}時")
+        if current_hour is not None:
+            self.logger.info("UTC時間: %s時, 日本時間: %s時", current_hour, jst_hour)
         
-        # 投稿時間外の場合は投稿しない（日本時間で判定）
-        if not (self.posting_hours[0] <= jst_hour <= self.posting_hours[1]):
-            self.logger.info(f"投稿時間外です（日本時間: {jst_hour}時、投稿時間: {self.posting_hours[0]}-{self.posting_hours[1]}時）")
+        if decision['reason'] == 'outside_hours':
+            self.logger.info("投稿時間外です（日本時間: %s時、投稿時間: %s-%s時）",
+                             jst_hour, self.posting_hours[0], self.posting_hours[1])
             print(f"⏭️ 投稿時間外（日本時間: {jst_hour}時）")
             return False
         
-        # 今日の投稿回数をチェック
-        today_posts = self.get_posted_today_count()
-        
-        # 今日の上限に達している場合は投稿しない
-        if today_posts >= self.posts_per_day:
-            self.logger.info(f"今日の投稿制限に達しています（{today_posts}/{self.posts_per_day}件）")
+        if decision['reason'] == 'limit':
+            self.logger.info("今日の投稿制限に達しています（%s/%s件）", today_posts, self.posts_per_day)
             print(f"⏭️ 今日の投稿制限に達しています（{today_posts}/{self.posts_per_day}件）")
             return False
         
-        # 残り時間と残り投稿回数で確率を調整（日本時間で計算）
-        remaining_hours = self.posting_hours[1] - jst_hour + 1
-        remaining_posts = self.posts_per_day - today_posts
-        
-        # 効率的な投稿確率計算
-        if remaining_posts >= remaining_hours:
-            # 残り投稿数が残り時間より多い場合、高確率で投稿
-            probability = self.max_posting_probability
-        else:
-            # 残り投稿数が少ない場合、確率を調整
-            base_probability = remaining_posts / remaining_hours
-            probability = max(self.min_posting_probability, 
-                            min(self.max_posting_probability, base_probability * 0.8))
-        
-        # ランダム判定
-        should_post = random.random() < probability
+        should_post = decision['post']
+        if decision['reason'] == 'plan':
+            self.logger.info("投稿計画: 日本時間%s時, 今日%s/%s件, 予定時刻%s, 結果%s",
+                             jst_hour, today_posts, self.posts_per_day, decision['next_slot'],
+                             '投稿' if should_post else 'スキップ')
+            if should_post:
+                print(f"✅ 投稿計画: 予定時刻{decision['next_slot']}, 今日{today_posts}/{self.posts_per_day}件")
+            else:
+                print(f"⏭️ 投稿スキップ: 次の予定時刻{decision['next_slot']}（日本時間）, 今日{today_posts}/{self.posts_per_day}件")
+            return should_post
         
-        self.logger.info(f"投稿判定: 日本時間{jst_hour}時, 今日{today_posts}/{self.posts_per_day}件, "
-                        f"残り{remaining_posts}件, 確率{probability:.2f}, 結果{'投稿' if should_post else 'スキップ'}")
+        self.logger.info("投稿判定: 日本時間%s時, 今日%s/%s件, 残り%s件, 確率%.2f, 結果%s",
+                         jst_hour, today_posts, self.posts_per_day, remaining_posts, probability,
+                         '投稿' if should_post else 'スキップ')
         
         if should_post:
             print(f"✅ 投稿判定: 日本時間{jst_hour}時, 今日{today_posts}/{self.posts_per_day}件, 残り{remaining_posts}件, 確率{probability:.2f}")
@@ -421,28 +815,43 @@ class XPostingBotAdvanced:
         
         return should_post
     
-    def get_next_posting_time(self):
+    def get_next_posting_time(self, now=None):
         """
         次の投稿時間を計算（1日の投稿制限を考慮）
+        
+        Args:
+            now (datetime): 基準時刻（Noneの場合は現在時刻、戻り値も同じ基準）
         """
+        now = now or datetime.now()
+        if self.deferred_until is not None and now < self.deferred_until:
+            # レート制限などで延期した場合は、投稿できる時刻まで待つ
+            return self.deferred_until
+        start_hour, end_hour = self.posting_hours
         posted_today = self.get_posted_today_count()
         
+        if self.use_posting_plan:
+            return self.get_next_planned_time(now, posted_today)
+        
         if posted_today >= self.posts_per_day:
             # 今日の投稿制限に達した場合、明日まで待機
-            tomorrow = datetime.now() + timedelta(days=1)
-            return tomorrow.replace(hour=8, minute=0, second=0, microsecond=0)
+            tomorrow = now + timedelta(days=1)
+            return tomorrow.replace(hour=start_hour, minute=0, second=0, microsecond=0)
+        
+        # 投稿時間の開始前の場合、開始時刻まで待機
+        start_time = now.replace(hour=start_hour, minute=0, second=0, microsecond=0)
+        if now < start_time:
+            return start_time
         
         # 残り投稿可能件数
         remaining_posts = self.posts_per_day - posted_today
         
-        # 残り時間を計算（現在時刻から22:00まで）
-        now = datetime.now()
-        end_time = now.replace(hour=22, minute=0, second=0, microsecond=0)
+        # 残り時間を計算（現在時刻から投稿時間の終了まで）
+        end_time = now.replace(hour=end_hour, minute=0, second=0, microsecond=0)
         
         if now >= end_time:
-            # 22:00を過ぎている場合、明日まで待機
+            # 終了時刻を過ぎている場合、明日まで待機
             tomorrow = now + timedelta(days=1)
-            return tomorrow.replace(hour=8, minute=0, second=0, microsecond=0)
+            return tomorrow.replace(hour=start_hour, minute=0, second=0, microsecond=0)
         
         # 残り時間を残り投稿数で割って、適切な間隔を計算
         remaining_minutes = (end_time - now).total_seconds() / 60
@@ -458,6 +867,25 @@ class XPostingBotAdvanced:
         
         return now + timedelta(minutes=interval_minutes)
     
+    def get_next_planned_time(self, now, posted_today):
+        """
+        投稿計画の次のスロットの時刻（今日のスロットを使い切った場合は明日の最初のスロット）
+        """
+        plan = load_daily_plan(self.posting_plan_file, now.strftime('%Y-%m-%d'), self.posting_hours,
+                               self.posts_per_day, self.posting_interval_min, self.posting_plan_seed)
+        slot_time = next_slot_time(plan, min(posted_today, self.posts_per_day), now)
+        if slot_time is not None and posted_today < self.posts_per_day and now.hour <= self.posting_hours[1]:
+            # 予定時刻を過ぎている場合はすぐに投稿する（常駐モードでは直前の投稿から最小間隔を空ける）
+            if self.daemon_last_post is not None:
+                slot_time = max(slot_time, self.daemon_last_post + timedelta(minutes=self.posting_interval_min[0]))
+            return max(slot_time, now)
+        
+        tomorrow = now + timedelta(days=1)
+        plan = build_daily_plan(tomorrow.strftime('%Y-%m-%d'), self.posting_hours,
+                                self.posts_per_day, self.posting_interval_min, self.posting_plan_seed)
+        return next_slot_time(plan, 0, tomorrow) or tomorrow.replace(
+            hour=self.posting_hours[0], minute=0, second=0, microsecond=0)
+    
     def print_stats(self):
         """
         統計情報を表示
@@ -468,19 +896,179 @@ class XPostingBotAdvanced:
         print(f"総投稿数: {self.stats['total_posts']}")
         print(f"成功投稿数: {self.stats['successful_posts']}")
         print(f"失敗投稿数: {self.stats['failed_posts']}")
+        print(f"延期投稿数: {self.stats['deferred_posts']}")
         print(f"成功率: {self.stats['successful_posts']/max(1, self.stats['total_posts'])*100:.1f}%")
         print(f"最後の投稿: {self.stats['last_post_time'] or 'なし'}")
         print("="*50)
     
-    def run_bot(self):
+    def reload_config(self, profile=None):
+        """
+        設定ファイルを読み込み直して投稿設定を更新（常駐モードのSIGHUP）
+        
+        Args:
+            profile (dict): 新しいアカウント設定（Noneの場合は現在のアカウント設定を使う）
+        """
+        try:
+            config = importlib.reload(sys.modules[CONFIG_MODULE])
+        except Exception as e:
+            self.logger.error("設定ファイル再読み込みエラー: %s", e)
+            return False
+        
+        previous_credentials = self.credentials
+        self.csv_file = config.CSV_FILE
+        self.posting_hours = config.POSTING_HOURS
+        self.posts_per_day = config.POSTS_PER_DAY
+        self.posting_interval_min = config.POSTING_INTERVAL_MIN
+        self.post_templates = config.POST_TEMPLATES
+        self.min_posting_probability = config.MIN_POSTING_PROBABILITY
+        self.max_posting_probability = config.MAX_POSTING_PROBABILITY
+        self.use_posting_plan = getattr(config, 'USE_POSTING_PLAN', self.use_posting_plan)
+        (self.x_api_key, self.x_api_secret, self.x_access_token,
+         self.x_access_token_secret, self.x_bearer_token) = (
+            config.X_API_KEY, config.X_API_SECRET, config.X_ACCESS_TOKEN,
+            config.X_ACCESS_TOKEN_SECRET, config.X_BEARER_TOKEN)
+        
+        if profile is not None:
+            self.profile = profile
+        self.apply_profile(self.profile)
+        if is_test_mode_env():
+            self.posting_hours = TEST_POSTING_HOURS
+        
+        # 認証情報が変わった場合は次の投稿時にクライアントを作り直す
+        if self.credentials != previous_credentials:
+            self.x_client = None
+        
+        # 投稿履歴も読み込み直す（CSVは変更されていればload_csv_dataで読み込み直される）
+        self.load_posting_history()
+        
+        self.logger.info("設定ファイルを再読み込みしました: %s", CONFIG_MODULE)
+        self.logger.info("投稿時間: %s:00-%s:00, 投稿頻度: 1日に%s件",
+                         self.posting_hours[0], self.posting_hours[1], self.posts_per_day)
+        return True
+    
+    def install_signal_handlers(self):
+        """
+        常駐モードのシグナルハンドラを設定
+        SIGTERM/SIGINT: 待機中なら即座に、投稿中なら投稿完了後に終了
+        SIGHUP: 設定ファイルを再読み込み
+        """
+        def request_stop(signum, frame):
+            self.logger.info("終了シグナルを受信しました (%s)", signal.Signals(signum).name)
+            self.daemon_stop = True
+            self.daemon_wakeup.set()
+        
+        def request_reload(signum, frame):
+            self.logger.info("再読み込みシグナルを受信しました (SIGHUP)")
+            self.daemon_reload = True
+            self.daemon_wakeup.set()
+        
+        signal.signal(signal.SIGTERM, request_stop)
+        signal.signal(signal.SIGINT, request_stop)
+        # SIGHUPはWindowsにはない
+        if hasattr(signal, 'SIGHUP'):
+            signal.signal(signal.SIGHUP, request_reload)
+    
+    def wait_until(self, target, now_func):
+        """
+        指定時刻まで待機（終了・再読み込みのシグナルで中断、スリープ復帰に備えて定期的に時刻を確認）
+        
+        Returns:
+            bool: 指定時刻に達した場合True、シグナルで中断された場合False
+        """
+        while not (self.daemon_stop or self.daemon_reload):
+            remaining = (target - now_func()).total_seconds()
+            if remaining <= 0:
+                return True
+            self.daemon_wakeup.wait(min(remaining, DAEMON_MAX_SLEEP_SECONDS))
+            self.daemon_wakeup.clear()
+        return False
+    
+    def post_if_due(self, now):
+        """
+        予定時刻に達したときの投稿処理（投稿時間内で今日の投稿制限に達していなければ投稿）
+        
+        Args:
+            now (datetime): 現在時刻（日本時間）
+        
+        Returns:
+            bool: 投稿した場合True
+        """
+        if not (self.posting_hours[0] <= now.hour <= self.posting_hours[1]):
+            self.logger.info("投稿時間外です（日本時間: %s時）", now.hour)
+            metrics.inc('skips')
+            return False
+        if self.get_posted_today_count() >= self.posts_per_day:
+            self.logger.info("今日の投稿制限に達しています（%s件）", self.posts_per_day)
+            metrics.inc('skips')
+            return False
+        if self.schedule_random_posts():
+            self.daemon_last_post = now
+            return True
+        # 失敗した場合は予定時刻を過ぎたままになるので、最小間隔を空けてから再試行する
+        retry_at = now + timedelta(seconds=DAEMON_RETRY_SECONDS)
+        if self.deferred_until is None or self.deferred_until < retry_at:
+            self.deferred_until = retry_at
+        return False
+    
+    def run_daemon(self):
+        """
+        常駐モードでBOTを実行
+        get_next_posting_time で計算した時刻まで待機して投稿し、
+        カタログ・投稿履歴・X APIクライアントはプロセス内で使い回す
+        """
+        self.daemon_stop = False
+        self.daemon_reload = False
+        self.daemon_wakeup = threading.Event()
+        self.install_signal_handlers()
+        
+        self.logger.info("X投稿BOT常駐モード開始")
+        print("X投稿BOT常駐モード開始（SIGTERMで終了、SIGHUPで設定再読み込み）")
+        
+        # 起動時に一度だけ認証とカタログの読み込みを行う
+        self.ensure_x_client()
+        self.load_csv_data()
+        
+        # 投稿時間は日本時間で判定する（実行環境のタイムゾーンに依存しない）
+        next_time = self.get_next_posting_time(jst_now())
+        while not self.daemon_stop:
+            self.logger.info("次の投稿予定: %s（日本時間）", next_time.strftime('%Y-%m-%d %H:%M'))
+            print(f"次の投稿予定: {next_time.strftime('%Y-%m-%d %H:%M')}（日本時間）")
+            
+            reached = self.wait_until(next_time, jst_now)
+            if self.daemon_stop:
+                break
+            
+            if self.daemon_reload:
+                self.daemon_reload = False
+                self.reload_config()
+            elif reached:
+                self.post_if_due(jst_now())
+                save_metrics()
+            
+            next_time = self.get_next_posting_time(jst_now())
+        
+        self.print_stats()
+        save_metrics()
+        self.logger.info("X投稿BOT常駐モード終了")
+        print("X投稿BOT常駐モード終了")
+    
+    def run_bot(self, decision=None):
         """
         GitHub Actions対応のBOT実行（単発実行）
+        
+        Args:
+            decision (dict): decide_first() の判定結果（Noneの場合はここで判定する）
         """
         self.logger.info("X投稿BOT開始（GitHub Actions対応版）")
         print("X投稿BOT開始（GitHub Actions対応版）")
         
-        # 投稿判定を実行
-        if self.should_post_now():
+        # 投稿判定を実行（判定済みの場合は乱数を引き直さない）
+        if decision is not None:
+            should_post = self.report_decision(decision)
+        else:
+            should_post = self.should_post_now()
+        
+        if should_post:
             success = self.schedule_random_posts()
             
             if success:
@@ -492,6 +1080,7 @@ class XPostingBotAdvanced:
         else:
             self.logger.info("投稿スキップ（条件不適合）")
             print("⏭️ 投稿スキップ（条件不適合）")
+            metrics.inc('skips')
         
         # 統計情報を表示
         self.print_stats()
@@ -499,10 +1088,60 @@ class XPostingBotAdvanced:
         self.logger.info("X投稿BOT終了")
         print("X投稿BOT終了")
 
-def main():
+def main(argv=None):
+    """
+    Args:
+        argv (list): コマンドライン引数（Noneの場合は引数なしの単発実行）
+    """
+    parser = argparse.ArgumentParser(description="X投稿BOT GitHub Actions対応版")
+    parser.add_argument('--daemon', action='store_true',
+                        help="常駐モードで実行（次の投稿時刻まで待機して投稿を繰り返す）")
+    args = parser.parse_args(argv or [])
+    
     print("X投稿BOT GitHub Actions対応版")
     print("="*60)
     
+    if args.daemon:
+        bot = XPostingBotAdvanced()
+        bot.run_daemon()
+        return
+    
+    try:
+        run_once()
+    finally:
+        # 毎時実行でも累計が残るように、スキップした実行も含めて計測を保存する
+        save_metrics()
+
+
+def run_once():
+    """
+    単発実行（GitHub Actions用）
+    """
+    # BOTを初期化する前に投稿するかどうかを判定
+    started = time.perf_counter()
+    decision = decide_first()
+    decision_seconds = time.perf_counter() - started
+    metrics.record('decision', decision_seconds)
+    print(f"起動時間: 読み込み {IMPORT_SECONDS * 1000:.1f}ms, 投稿判定 {decision_seconds * 1000:.1f}ms")
+    
+    current_time = datetime.now()
+    print(f"実行時刻: {current_time.strftime('%Y-%m-%d %H:%M:%S')}")
+    print(f"今日({current_time.strftime('%Y-%m-%d')})の投稿数: {decision['today_posts']}/{POSTS_PER_DAY}件 (残り{decision['remaining_posts']}件)")
+    
+    if not decision['post']:
+        # スキップする場合はX APIの認証・CSVの読み込みを行わずに終了
+        if decision['reason'] == 'outside_hours':
+            print(f"⏭️ 投稿時間外（日本時間: {decision['jst_hour']}時）")
+        elif decision['reason'] == 'limit':
+            print(f"⏭️ 今日の投稿制限に達しています（{decision['today_posts']}/{POSTS_PER_DAY}件）")
+        elif decision['reason'] == 'plan':
+            print(f"⏭️ 投稿スキップ: 次の予定時刻{decision['next_slot']}（日本時間）")
+        else:
+            print(f"⏭️ 投稿スキップ: 日本時間{decision['jst_hour']}時, 確率{decision['probability']:.2f}")
+        metrics.inc('skips')
+        print("X投稿BOT終了")
+        return
+    
     # X API設定の確認
     if not TEST_MODE:
         if (X_API_KEY == "your-x-api-key" or X_API_SECRET == "your-x-api-secret" or 
@@ -518,18 +1157,8 @@ def main():
     # BOT初期化
     bot = XPostingBotAdvanced()
     
-    # 今日の投稿履歴を確認
-    today = datetime.now().strftime('%Y-%m-%d')
-    posted_today = bot.get_posted_today_count()
-    remaining_posts = bot.posts_per_day - posted_today
-    
-    # 現在時刻の情報を表示
-    current_time = datetime.now()
-    print(f"実行時刻: {current_time.strftime('%Y-%m-%d %H:%M:%S')}")
-    print(f"今日({today})の投稿数: {posted_today}/{bot.posts_per_day}件 (残り{remaining_posts}件)")
-    
     # BOT実行
-    bot.run_bot()
+    bot.run_bot(decision)
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main(sys.argv[1:]) 
\ No newline at end of file